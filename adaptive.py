@@ -0,0 +1,256 @@
+"""
+Adaptive test duration.
+
+Instead of a fixed `iperf -t 10` / `ping -c 20`, a test is started with
+its maximum duration and its interval output is read while it runs.  As
+soon as the confidence interval of the target metric (throughput for
+iperf, RTT for ping) is narrower than the requested relative width - and
+the minimum duration has passed - the process gets SIGINT, which makes
+both iperf and ping print their normal summary, so the saved logs parse
+exactly like fixed-length ones.
+
+Every test is recorded in adaptive_savings.json next to the logs;
+`python3 adaptive.py --log-dir .` prints how much time was saved.
+
+run_test() is also the streaming runner of live mode (see live.py).
+"""
+import argparse
+import json
+import math
+import os
+import re
+import select
+import signal
+import statistics
+import subprocess
+import time
+
+from analyze_logs import parse_iperf_interval_line
+from live import FileTail, LiveStats, record_abort
+
+SAVINGS_FILE = "adaptive_savings.json"
+
+# two-sided Student t critical values, 95% confidence, df = 1..30
+_T95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+_PING_TIME_RE = re.compile(r'time=([\d\.]+)\s*ms')
+
+
+def ci_halfwidth(samples):
+    "Half-width of the 95% confidence interval of the mean of samples."
+    n = len(samples)
+    if n < 2:
+        return math.inf
+    t = _T95[n - 2] if n - 2 < len(_T95) else 1.96
+    return t * statistics.stdev(samples) / math.sqrt(n)
+
+
+def adaptive_from_args(args):
+    "Adaptive settings from the --adaptive/--min-duration/--max-duration options, or None."
+    if not args.adaptive:
+        return None
+    return Adaptive(args.adaptive, args.min_duration, args.max_duration)
+
+
+class Adaptive(object):
+    """
+    Stopping rule of adaptive tests:
+    - rel_ci: stop once CI half-width / mean <= rel_ci (e.g. 0.05 = +-5%)
+    - min_s / max_s: bounds on the test duration
+    """
+
+    def __init__(self, rel_ci=0.05, min_s=3, max_s=20, min_samples=3):
+        self.rel_ci = rel_ci
+        self.min_s = min_s
+        self.max_s = max_s
+        self.min_samples = min_samples
+
+    def converged(self, samples, elapsed):
+        if elapsed < self.min_s or len(samples) < self.min_samples:
+            return False
+        mean = statistics.fmean(samples)
+        if mean <= 0:
+            return False
+        return ci_halfwidth(samples) / mean <= self.rel_ci
+
+
+def iperf_sample(line, streams=1):
+    "Throughput sample (Mbps) of one iperf interval line, or None."
+    parsed = parse_iperf_interval_line(line)
+    if not parsed:
+        return None
+    sid, start, end, mbps = parsed
+    # 多 stream 时只看 [SUM]；summary 行 (0.0-T, T > 1.5s) 不是样本
+    if (streams > 1) != (sid == "SUM") or end - start > 1.5 or math.isnan(mbps):
+        return None
+    return mbps
+
+
+def ping_sample(line, streams=1):
+    "RTT sample (ms) of one ping reply line, or None."
+    m = _PING_TIME_RE.search(line)
+    return float(m.group(1)) if m else None
+
+
+def read_lines(proc, timeout=0.5):
+    """
+    Yield the output lines of proc as they are produced; yields None every
+    `timeout` seconds without output so callers can check the clock.
+    """
+    fd = proc.stdout.fileno()
+    buf = b''
+    while True:
+        ready, _, _ = select.select([fd], [], [], timeout)
+        if not ready:
+            yield None
+            continue
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            break
+        buf += chunk
+        *lines, buf = buf.split(b'\n')
+        for line in lines:
+            yield line.decode(errors='replace') + '\n'
+    if buf:
+        yield buf.decode(errors='replace')
+
+
+def _open_ended(cmd, max_s):
+    "Rewrite a fixed-length iperf/ping command so it runs for at most max_s."
+    if cmd.startswith('iperf'):
+        return re.sub(r'-t\s+\d+', f'-t {max_s}', cmd)
+    # ping: count -> deadline
+    cmd = re.sub(r'\s-c\s+\d+', '', cmd)
+    return cmd.replace('ping ', f'ping -w {max_s} ', 1)
+
+
+def run_test(host, cmd, adaptive=None, name='', fixed_s=10, streams=1, log_dir='.',
+             live=None, probe_log=None):
+    """
+    Run a measurement command on host and return its output.
+    Without `adaptive` / `live` this is just host.cmd(cmd).  Otherwise the
+    output is read while the command runs:
+    - adaptive: the command runs open-ended and is stopped once the
+      target metric has converged
+    - live (live.Live): rolling RTT / loss / throughput is printed and the
+      test is stopped when a health check fails; probe_log is the
+      concurrent ping log to tail (the command itself for ping tests)
+    """
+    if adaptive is None and live is None:
+        return host.cmd(cmd)
+
+    if adaptive is not None:
+        cmd = _open_ended(cmd, adaptive.max_s)
+    is_iperf = cmd.startswith('iperf')
+    if is_iperf and ' -i ' not in cmd:
+        cmd += ' -i 1'  # 需要区间输出才有样本
+    sample = iperf_sample if is_iperf else ping_sample
+    # 管道输出默认是全缓冲，用 stdbuf 让 iperf / ping 按行输出
+    proc = host.popen(['stdbuf', '-oL'] + cmd.split(), stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+    stats = LiveStats(live.window) if live is not None else None
+    probe = FileTail(probe_log) if live is not None and is_iperf else None
+    t0 = last_report = time.time()
+    lines, samples, stopped_early, abort_reason = [], [], False, None
+    for line in read_lines(proc):
+        now = time.time()
+        if line is not None:
+            lines.append(line)
+            val = sample(line, streams)
+            if val is not None:
+                samples.append(val)
+                if stats is not None and is_iperf:
+                    stats.add_throughput(val)
+            if stats is not None and not is_iperf:
+                stats.add_ping_line(line)
+        if stopped_early:
+            continue
+
+        if stats is not None:
+            for probe_line in (probe.read_lines() if probe else []):
+                stats.add_ping_line(probe_line)
+            if now - last_report >= live.report_s:
+                print(stats.line(name, now - t0))
+                last_report = now
+            abort_reason = live.check(stats, now)
+            if abort_reason:
+                print(f"[ABORT] {name}: {abort_reason}")
+                record_abort(log_dir, name, abort_reason, now - t0)
+                proc.send_signal(signal.SIGINT)
+                stopped_early = True
+                continue
+
+        if adaptive is not None and adaptive.converged(samples, now - t0):
+            proc.send_signal(signal.SIGINT)  # iperf / ping print their summary on SIGINT
+            stopped_early = True
+    proc.wait()
+    elapsed = time.time() - t0
+
+    if adaptive is not None:
+        record_test(log_dir, name, fixed_s, elapsed, stopped_early and not abort_reason,
+                    len(samples), adaptive)
+        print(f"[INFO] adaptive {name}: {elapsed:.1f} s "
+              f"({'converged' if stopped_early and not abort_reason else 'max duration'}, "
+              f"{len(samples)} samples, fixed would be {fixed_s} s)")
+    return ''.join(lines)
+
+
+def record_test(log_dir, name, fixed_s, actual_s, stopped_early, n_samples, adaptive):
+    "Append one adaptive test to adaptive_savings.json."
+    path = os.path.join(log_dir, SAVINGS_FILE)
+    tests = load_savings(log_dir)
+    tests.append({
+        "test": name,
+        "fixed_s": fixed_s,
+        "actual_s": round(actual_s, 3),
+        "stopped_early": stopped_early,
+        "samples": n_samples,
+        "rel_ci": adaptive.rel_ci,
+        "min_s": adaptive.min_s,
+        "max_s": adaptive.max_s,
+    })
+    with open(path, 'w') as f:
+        json.dump(tests, f, indent=2)
+
+
+def load_savings(log_dir):
+    path = os.path.join(log_dir, SAVINGS_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def savings_summary(tests):
+    "Totals of a list of adaptive test records."
+    fixed = sum(t["fixed_s"] for t in tests)
+    actual = sum(t["actual_s"] for t in tests)
+    return {
+        "tests": len(tests),
+        "stopped_early": sum(1 for t in tests if t["stopped_early"]),
+        "fixed_s": fixed,
+        "actual_s": actual,
+        "saved_s": fixed - actual,
+        "saved_pct": 100.0 * (fixed - actual) / fixed if fixed else math.nan,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time saved by adaptive test durations")
+    parser.add_argument('--log-dir', default='.')
+    args = parser.parse_args(argv)
+
+    tests = load_savings(args.log_dir)
+    for t in tests:
+        print(f"{t['test']:<20} fixed {t['fixed_s']:>5} s  actual {t['actual_s']:>7.2f} s  "
+              f"{'converged' if t['stopped_early'] else 'hit max'}")
+    s = savings_summary(tests)
+    print(f"\n{s['tests']} tests, {s['stopped_early']} stopped early: "
+          f"{s['actual_s']:.1f} s instead of {s['fixed_s']:.1f} s "
+          f"(saved {s['saved_s']:.1f} s, {s['saved_pct']:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,35 @@
+import argparse
+import glob
+import hashlib
+import io
+import json
 import os
 import re
 import math
-import numpy as np
-import matplotlib.pyplot as plt
+import random
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+from archive import open_log, resolve_log
 
 def parse_iperf_throughput(filepath):
 
-    if not os.path.exists(filepath):
+    if resolve_log(filepath) is None:
         print(f"[WARN] File not found: {filepath}")
         return math.nan
 
     throughput = math.nan
-    with open(filepath, 'r') as f:
+    sum_seen = False
+    with open_log(filepath) as f:
         for line in f:
             if "bits/sec" in line:
+                # iperf -P 会为每个 stream 打印一行，总和在 [SUM] 行
+                is_sum = line.lstrip().startswith("[SUM]")
+                if sum_seen and not is_sum:
+                    continue
+                sum_seen = sum_seen or is_sum
         
                 m = re.search(r'([\d\.]+)\s+([KMG])bits/sec', line)
                 if m:
@@ -51,9 +67,15 @@ def _parse_bits_per_sec(line):
         return val * 1e3
     else:
         return math.nan
+
+
+_UDP_JITTER_RE = re.compile(r'([\d\.]+)\s*ms')
+_UDP_LOSS_RE = re.compile(r'(\d+)/\s*(\d+)\s*\(')
+
+
 def parse_iperf_udp_metrics(filepath):
 
-    if not os.path.exists(filepath):
+    if resolve_log(filepath) is None:
         print(f"[WARN] File not found: {filepath}")
         return math.nan, math.nan, math.nan
 
@@ -61,143 +83,413 @@ def parse_iperf_udp_metrics(filepath):
     jitter = math.nan
     loss_pct = math.nan
 
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
-
-    for line in lines:
-        if "bits/sec" in line:
-       
+    with open_log(filepath) as f:
+        for line in f:
+            if "bits/sec" not in line:
+                continue
             val = _parse_bits_per_sec(line)
             if not math.isnan(val):
                 throughput = val
 
-       
-            m_jit = re.search(r'([\d\.]+)\s*ms', line)
+            m_jit = _UDP_JITTER_RE.search(line)
             if m_jit:
                 try:
                     jitter = float(m_jit.group(1))
                 except ValueError:
                     pass
 
-        
-            m_loss = re.search(r'(\d+)/(\d+)\s*\(([\d\.]+)%\)', line)
-            if m_loss:
-                loss_pct = float(m_loss.group(3))
-
+            # "   9/ 2551 (0.35%)"：iperf 会补空格，百分比用 %.2g 打印（100% 是 "1e+02%"），
+            # 所以直接用 lost/total 计算
+            m_loss = _UDP_LOSS_RE.search(line)
+            if m_loss and int(m_loss.group(2)):
+                loss_pct = 100.0 * int(m_loss.group(1)) / int(m_loss.group(2))
 
     if math.isnan(throughput) or math.isnan(jitter) or math.isnan(loss_pct):
         print(f"[WARN] UDP metrics incomplete in {filepath}")
     return throughput, jitter, loss_pct
 
 
-def parse_ping_rtt_loss(filepath):
+_STREAM_RE = re.compile(
+    r'^\[\s*(\d+|SUM)\]\s+([\d\.]+)\s*-\s*([\d\.]+)\s+sec\s+.*?([\d\.]+\s+[KMG]?bits/sec)')
+
+
+def parse_iperf_interval_line(line):
     """
-    解析 ping 日志：
-    - 优先使用 summary 的 'packet loss' 和 'rtt min/avg/max/mdev' 行；
-    - 如果没有 summary（例如 ping 被 pkill 提前杀掉），
-      则从每一行 'time=xxx ms' 直接计算平均 RTT，
-      丢包率在没有明确信息时默认 0%。
-    返回 (avg_rtt_ms, loss_pct).
+    解析一行 iperf 区间/summary 输出：
+    "[  3]  2.0- 3.0 sec  1.12 MBytes  9.44 Mbits/sec" -> ('3', 2.0, 3.0, 9.44)
+    不是区间行时返回 None。
     """
-    if not os.path.exists(filepath):
+    m = _STREAM_RE.match(line.strip())
+    if not m:
+        return None
+    return m.group(1), float(m.group(2)), float(m.group(3)), _parse_bits_per_sec(m.group(4))
+
+
+def parse_iperf_streams(filepath):
+    """
+    解析 iperf -P 的输出，返回每个 stream 的 throughput：
+    - 对每个 stream id 取从 0.0 开始、区间最长的那一行（即最终 summary）；
+    - 返回 (per_stream_Mbps 列表, total_Mbps)。
+    单 stream 时没有 [SUM] 行，total 就是那一个 stream 的值。
+    """
+    if resolve_log(filepath) is None:
         print(f"[WARN] File not found: {filepath}")
-        return math.nan, math.nan
+        return [], math.nan
 
-    avg_rtt = math.nan
-    loss_pct = math.nan
-    rtts = []  # 用于记录每个 icmp_seq 的 time
+    final = {}  # stream id -> (interval end, Mbps)
+    with open_log(filepath) as f:
+        for line in f:
+            parsed = parse_iperf_interval_line(line)
+            if not parsed or parsed[1] != 0.0:
+                continue
+            sid, _start, end, val = parsed
+            if sid not in final or end >= final[sid][0]:
+                final[sid] = (end, val)
+
+    total = final.pop("SUM", (None, math.nan))[1]
+    per_stream = [final[sid][1] for sid in sorted(final, key=int)]
+    if math.isnan(total) and per_stream:
+        total = sum(per_stream)
+    if not per_stream:
+        print(f"[WARN] No per-stream throughput parsed from {filepath}")
+    return per_stream, total
+
+
+def parse_iperf_intervals(filepath):
+    """
+    解析 iperf -i 的区间输出，返回 [(start_s, end_s, Mbps), ...]：
+    - 多 stream (-P) 时只用 [SUM] 行，否则用单 stream 的行；
+    - 最后的 0.0-T summary 行不算区间（它比正常区间长很多）。
+    """
+    if resolve_log(filepath) is None:
+        print(f"[WARN] File not found: {filepath}")
+        return []
 
-    with open(filepath, 'r') as f:
-        lines = f.readlines()
+    rows = {"SUM": [], "stream": []}
+    with open_log(filepath) as f:
+        for line in f:
+            parsed = parse_iperf_interval_line(line)
+            if not parsed:
+                continue
+            key = "SUM" if parsed[0] == "SUM" else "stream"
+            rows[key].append(parsed[1:])
 
-    for line in lines:
-        # 收集每一行的 time=... ms
-        if " time=" in line:
-            m_time = re.search(r'time=([\d\.]+)\s*ms', line)
-            if m_time:
-                try:
-                    rtts.append(float(m_time.group(1)))
-                except ValueError:
-                    pass
+    rows = rows["SUM"] or rows["stream"]
+    if not rows:
+        print(f"[WARN] No interval lines parsed from {filepath} (was iperf run with -i?)")
+        return []
 
-     
-        if "packet loss" in line:
-            # e.g. "20 packets transmitted, 20 received, 0% packet loss, time 19451ms"
-            m_loss = re.search(r'(\d+)%\s+packet loss', line)
-            if m_loss:
-                loss_pct = float(m_loss.group(1))
+    lengths = sorted(end - start for start, end, _ in rows)
+    step = lengths[len(lengths) // 2]  # 区间长度取中位数
+    return [r for r in rows if (r[1] - r[0]) <= 1.5 * step]
+
+
+def parse_iperf_summary(filepath):
+    """
+    iperf 客户端日志的 summary：{"sent": (start, end, Mbps), "received": ...}
+    - sent: "Server Report" 之前、从 0.0 开始最长的那一行
+    - received: UDP 的 Server Report 那一行；没有时（TCP）就等于 sent
+    找不到的项是 None。
+    """
+    sent = received = None
+    sent_sum = False
+    if resolve_log(filepath) is None:
+        print(f"[WARN] File not found: {filepath}")
+        return {"sent": None, "received": None}
+    in_report = False
+    with open_log(filepath) as f:
+        for line in f:
+            if "Server Report" in line:
+                in_report = True
+                continue
+            parsed = parse_iperf_interval_line(line)
+            if not parsed or parsed[1] != 0.0:
+                continue
+            if in_report:
+                received = received or parsed[1:]
+            elif sent is None or (parsed[0] == "SUM", parsed[2]) >= (sent_sum, sent[1]):
+                # -P 时 [SUM] 行优先
+                sent, sent_sum = parsed[1:], parsed[0] == "SUM"
+    return {"sent": sent, "received": received or sent}
+
+
+def jain_index(values):
+    "Jain's fairness index: (sum x)^2 / (n * sum x^2), 1.0 = perfectly fair."
+    xs = [v for v in values if not math.isnan(v)]
+    if not xs:
+        return math.nan
+    sq = sum(v * v for v in xs)
+    if sq == 0:
+        return math.nan
+    return sum(xs) ** 2 / (len(xs) * sq)
 
 
-        if "rtt " in line or "round-trip" in line:
-            # e.g. "rtt min/avg/max/mdev = 0.032/0.043/0.050/0.003 ms"
-            m_rtt = re.search(r'=\s*[\d\.]+/([\d\.]+)/[\d\.]+/[\d\.]+\s*ms', line)
-            if m_rtt:
-                avg_rtt = float(m_rtt.group(1))
+# 高频 probe (-i 0.001 / -f) 一次 run 就有上百万行，RTT 不再存成 list，
+# 只保留 running aggregates 和一个固定大小的 reservoir 用来算 percentile
+RTT_RESERVOIR = 65536
 
 
-    if math.isnan(avg_rtt) and len(rtts) > 0:
-        avg_rtt = sum(rtts) / len(rtts)
+def percentiles(values, qs):
+    "Percentiles (0-100) of values, linear interpolation; nan for no values."
+    if not values:
+        return [math.nan for _ in qs]
+    xs = sorted(values)
+    out = []
+    for q in qs:
+        pos = (len(xs) - 1) * q / 100.0
+        lo = int(pos)
+        hi = min(lo + 1, len(xs) - 1)
+        out.append(xs[lo] + (xs[hi] - xs[lo]) * (pos - lo))
+    return out
 
 
-    if math.isnan(loss_pct) and len(rtts) > 0:
-        loss_pct = 0.0
+class RttStats(object):
+    """
+    Running RTT aggregates in constant memory: count, mean / variance
+    (Welford), min, max, plus a uniform reservoir sample of at most
+    `reservoir` RTTs stored as C floats (array('f'), 4 bytes each) for
+    the percentiles.
+    """
 
-    if math.isnan(avg_rtt) or math.isnan(loss_pct):
-        print(f"[WARN] Ping metrics incomplete in {filepath}")
+    def __init__(self, reservoir=RTT_RESERVOIR, seed=0):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.reservoir = reservoir
+        self.sample = array('f')
+        self._rng = random.Random(seed)  # 固定 seed，同一个 log 每次结果一样
+
+    def add(self, rtt):
+        self.n += 1
+        delta = rtt - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (rtt - self.mean)
+        if rtt < self.min:
+            self.min = rtt
+        if rtt > self.max:
+            self.max = rtt
+        if len(self.sample) < self.reservoir:
+            self.sample.append(rtt)
+        else:
+            j = self._rng.randrange(self.n)
+            if j < self.reservoir:
+                self.sample[j] = rtt
+
+    def std(self):
+        return math.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else math.nan
+
+    def percentiles(self, qs):
+        "Percentiles (0-100) from the reservoir."
+        # float32 存储，保留 ping 打印的精度即可
+        return [round(v, 4) for v in percentiles(self.sample, qs)]
+
+
+def _reply_rtt(line):
+    "RTT in ms of a ping reply line ('... time=0.043 ms'), None for other lines."
+    i = line.find("time=")
+    if i < 0:
+        return None
+    j = line.find(" ", i)
+    value = line[i + 5:j] if j > 0 else line[i + 5:].rstrip()
+    if j < 0 and not value.endswith("ms"):
+        # 被 pkill 截断的最后一行（"time=0.0"），数值不完整
+        return None
+    try:
+        return float(value[:-2] if value.endswith("ms") else value)
+    except ValueError:
+        return None
+
+
+_PING_SUMMARY_RE = re.compile(r'(\d+) packets transmitted, (\d+) (?:packets )?received.*?([\d\.]+)%\s+packet loss')
+_PING_RTT_RE = re.compile(r'=\s*([\d\.]+)/([\d\.]+)/([\d\.]+)/([\d\.]+)\s*ms')
+
+
+def parse_ping_stats(filepath, reservoir=RTT_RESERVOIR):
+    """
+    逐行（streaming）解析 ping 日志，内存不随日志长度增长：
+    - 每个 reply 的 time= 进 RttStats（count/mean/std/min/max + reservoir）；
+    - summary 行给出 transmitted/received/loss（loss 可以是小数，
+      例如 flood ping 的 "0.0123% packet loss"）和 min/avg/max/mdev；
+    - flood ping (-f) 只有 summary，没有逐个 reply。
+    返回 dict：count, rtt_avg_ms, rtt_std_ms, rtt_min_ms, rtt_max_ms,
+    rtt_p50_ms, rtt_p99_ms, rtt_p999_ms, transmitted, received, loss_pct。
+    """
+    result = dict(count=0, rtt_avg_ms=math.nan, rtt_std_ms=math.nan, rtt_min_ms=math.nan,
+                  rtt_max_ms=math.nan, rtt_p50_ms=math.nan, rtt_p99_ms=math.nan,
+                  rtt_p999_ms=math.nan, transmitted=None, received=None, loss_pct=math.nan)
+    if resolve_log(filepath) is None:
+        print(f"[WARN] File not found: {filepath}")
+        return result
 
-    return avg_rtt, loss_pct
+    stats = RttStats(reservoir)
+    summary_rtt = None
+    with open_log(filepath) as f:
+        for line in f:
+            rtt = _reply_rtt(line)
+            if rtt is not None:
+                stats.add(rtt)
+                continue
+            if "packet loss" in line:
+                # e.g. "20 packets transmitted, 20 received, 0% packet loss, time 19451ms"
+                m_loss = _PING_SUMMARY_RE.search(line)
+                if m_loss:
+                    result["transmitted"] = int(m_loss.group(1))
+                    result["received"] = int(m_loss.group(2))
+                    result["loss_pct"] = float(m_loss.group(3))
+            elif "rtt " in line or "round-trip" in line:
+                # e.g. "rtt min/avg/max/mdev = 0.032/0.043/0.050/0.003 ms"
+                m_rtt = _PING_RTT_RE.search(line)
+                if m_rtt:
+                    summary_rtt = [float(v) for v in m_rtt.groups()]
+
+    result["count"] = stats.n
+    if stats.n:
+        result.update(rtt_avg_ms=stats.mean, rtt_std_ms=stats.std(),
+                      rtt_min_ms=stats.min, rtt_max_ms=stats.max)
+        result["rtt_p50_ms"], result["rtt_p99_ms"], result["rtt_p999_ms"] = \
+            stats.percentiles((50, 99, 99.9))
+    if summary_rtt is not None:
+        # summary 是 ping 自己的统计，优先用它
+        result.update(rtt_min_ms=summary_rtt[0], rtt_avg_ms=summary_rtt[1],
+                      rtt_max_ms=summary_rtt[2], rtt_std_ms=summary_rtt[3])
+    if math.isnan(result["loss_pct"]) and stats.n:
+        # 没有 summary（ping 被 pkill 提前杀掉），丢包率在没有明确信息时默认 0%
+        result["loss_pct"] = 0.0
+
+    if math.isnan(result["rtt_avg_ms"]) or math.isnan(result["loss_pct"]):
+        print(f"[WARN] Ping metrics incomplete in {filepath}")
+    return result
 
 
+def parse_ping_rtt_loss(filepath):
+    """
+    解析 ping 日志：
+    - 优先使用 summary 的 'packet loss' 和 'rtt min/avg/max/mdev' 行；
+    - 如果没有 summary（例如 ping 被 pkill 提前杀掉），
+      则从每一行 'time=xxx ms' 直接计算平均 RTT，
+      丢包率在没有明确信息时默认 0%。
+    返回 (avg_rtt_ms, loss_pct).
+    """
+    stats = parse_ping_stats(filepath)
+    return stats["rtt_avg_ms"], stats["loss_pct"]
 
 
 experiments = ["exp1", "exp2", "exp3"]
 scenario_labels = ["Baseline (Exp1)", "High-load (Exp2)", "Delay (Exp3)"]
 protocols = ["TCP", "UDP", "ICMP"]
 
-# metrics[exp][protocol] = dict(...)
-metrics = {exp: {p: {} for p in protocols} for exp in experiments}
-
-for exp in experiments:
-    # TCP
-    tcp_log = f"{exp}_tcp_h1_h20.log"
-    ping_tcp_log = f"{exp}_ping_during_tcp_h1_h20.log"
-
-    tcp_thr = parse_iperf_throughput(tcp_log)
-    tcp_rtt, tcp_loss = parse_ping_rtt_loss(ping_tcp_log)
-
-    metrics[exp]["TCP"] = {
-        "throughput_Mbps": tcp_thr,
-        "rtt_ms": tcp_rtt,
-        "loss_pct": tcp_loss,
-        "jitter_ms": math.nan,  # jitter 对 TCP 没有定义
-    }
-
-    # UDP
-    udp_log = f"{exp}_udp_h1_h20.log"
-    ping_udp_log = f"{exp}_ping_during_udp_h1_h20.log"
-
-    udp_thr, udp_jitter, udp_loss_udp = parse_iperf_udp_metrics(udp_log)
-    udp_rtt, _udp_ping_loss = parse_ping_rtt_loss(ping_udp_log)
-    # 根据 project 要求，UDP 的 packet loss 用 iperf 的统计
-    metrics[exp]["UDP"] = {
-        "throughput_Mbps": udp_thr,
-        "rtt_ms": udp_rtt,
-        "loss_pct": udp_loss_udp,
-        "jitter_ms": udp_jitter,
-    }
-
-    # ICMP（只看 ping-only）
-    ping_icmp_log = f"{exp}_ping_h1_h20.log"
-    icmp_rtt, icmp_loss = parse_ping_rtt_loss(ping_icmp_log)
-
-    metrics[exp]["ICMP"] = {
-        "throughput_Mbps": math.nan,   # throughput 对纯 ICMP 不定义，这里留空
-        "rtt_ms": icmp_rtt,
-        "loss_pct": icmp_loss,
-        "jitter_ms": math.nan,         # jitter 也不定义
-    }
-
-def plot_metric(metric_key, ylabel, title, filename):
+
+_CODE_DIGEST = None
+
+
+def _code_digest():
+    "Hash of this file: any parser change invalidates the parse cache."
+    global _CODE_DIGEST
+    if _CODE_DIGEST is None:
+        with open(__file__, 'rb') as f:
+            _CODE_DIGEST = hashlib.sha256(f.read()).hexdigest()[:16]
+    return _CODE_DIGEST
+
+
+def file_digest(filepath):
+    "sha256 of the stored bytes of a log (compressed logs are hashed as stored)."
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cached_parse(parser, filepath, cache_dir=None):
+    """
+    parser(filepath), with the result cached in cache_dir under the content
+    hash of the log, so an unchanged log is never parsed twice.  What the
+    parser printed ([WARN] of a malformed log) is cached with the result
+    and printed again on every hit.
+    """
+    real = resolve_log(filepath)
+    if cache_dir is None or real is None:
+        return parser(filepath)
+
+    key = hashlib.sha256(f"{parser.__name__}:{_code_digest()}:{file_digest(real)}".encode()).hexdigest()
+    path = os.path.join(cache_dir, key[:2], key + ".json")
+    if os.path.exists(path):
+        with open(path) as f:
+            entry = json.load(f)
+        print(entry["output"], end='')
+        result = entry["result"]
+        return tuple(result) if isinstance(result, list) else result
+
+    out = io.StringIO()
+    with redirect_stdout(out):
+        result = parser(filepath)
+    print(out.getvalue(), end='')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({"result": result, "output": out.getvalue()}, f)
+    os.replace(tmp, path)  # 多个进程同时写同一个 key 时不会读到半个文件
+    return result
+
+
+def collect_metrics(log_dir='.', cache_dir=None):
+    "Parse the exp*_*.log files in log_dir into metrics[exp][protocol]."
+    # metrics[exp][protocol] = dict(...)
+    metrics = {exp: {p: {} for p in protocols} for exp in experiments}
+
+    for exp in experiments:
+        # TCP
+        tcp_log = os.path.join(log_dir, f"{exp}_tcp_h1_h20.log")
+        ping_tcp_log = os.path.join(log_dir, f"{exp}_ping_during_tcp_h1_h20.log")
+
+        tcp_thr = cached_parse(parse_iperf_throughput, tcp_log, cache_dir)
+        tcp_ping = cached_parse(parse_ping_stats, ping_tcp_log, cache_dir)
+
+        metrics[exp]["TCP"] = {
+            "throughput_Mbps": tcp_thr,
+            "rtt_ms": tcp_ping["rtt_avg_ms"],
+            "loss_pct": tcp_ping["loss_pct"],
+            "jitter_ms": math.nan,  # jitter 对 TCP 没有定义
+            "rtt_p99_ms": tcp_ping["rtt_p99_ms"],
+        }
+
+        # UDP
+        udp_log = os.path.join(log_dir, f"{exp}_udp_h1_h20.log")
+        ping_udp_log = os.path.join(log_dir, f"{exp}_ping_during_udp_h1_h20.log")
+
+        udp_thr, udp_jitter, udp_loss_udp = cached_parse(parse_iperf_udp_metrics, udp_log, cache_dir)
+        udp_ping = cached_parse(parse_ping_stats, ping_udp_log, cache_dir)
+        # 根据 project 要求，UDP 的 packet loss 用 iperf 的统计
+        metrics[exp]["UDP"] = {
+            "throughput_Mbps": udp_thr,
+            "rtt_ms": udp_ping["rtt_avg_ms"],
+            "loss_pct": udp_loss_udp,
+            "jitter_ms": udp_jitter,
+            "rtt_p99_ms": udp_ping["rtt_p99_ms"],
+        }
+
+        # ICMP（只看 ping-only）
+        ping_icmp_log = os.path.join(log_dir, f"{exp}_ping_h1_h20.log")
+        icmp_ping = cached_parse(parse_ping_stats, ping_icmp_log, cache_dir)
+
+        metrics[exp]["ICMP"] = {
+            "throughput_Mbps": math.nan,   # throughput 对纯 ICMP 不定义，这里留空
+            "rtt_ms": icmp_ping["rtt_avg_ms"],
+            "loss_pct": icmp_ping["loss_pct"],
+            "jitter_ms": math.nan,         # jitter 也不定义
+            "rtt_p99_ms": icmp_ping["rtt_p99_ms"],
+        }
+
+    return metrics
+
+
+def plot_metric(metrics, metric_key, ylabel, title, filename):
+    # numpy / matplotlib 只在画图时才加载，只用 parser 的脚本不用付这个启动时间
+    import numpy as np
+    import matplotlib.pyplot as plt
+
     x = np.arange(len(experiments))  # 0,1,2
 
     plt.figure()
@@ -216,24 +508,100 @@ def plot_metric(metric_key, ylabel, title, filename):
     print(f"[INFO] Saved figure: {filename}")
 
 
-plot_metric("throughput_Mbps",
-            "Throughput (Mbits/sec)",
-            "Throughput vs Scenario (TCP/UDP/ICMP)",
-            "throughput_comparison.png")
-
-plot_metric("rtt_ms",
-            "Average RTT (ms)",
-            "RTT vs Scenario (TCP/UDP/ICMP)",
-            "rtt_comparison.png")
-
-plot_metric("loss_pct",
-            "Packet Loss (%)",
-            "Packet Loss vs Scenario (TCP/UDP/ICMP)",
-            "loss_comparison.png")
-
-plot_metric("jitter_ms",
-            "Jitter (ms)",
-            "Jitter vs Scenario (TCP/UDP/ICMP)",
-            "jitter_comparison.png")
-
-plt.show()
+def expand_runs(patterns):
+    "Run directories from a list of directories and/or glob patterns."
+    dirs = []
+    for pat in patterns:
+        matches = sorted(glob.glob(pat)) if glob.has_magic(pat) else [pat]
+        dirs += [d for d in matches if os.path.isdir(d)]
+    return dirs
+
+
+def _analyze_run(job):
+    "Process-pool worker: metrics of one run directory (warnings are dropped)."
+    run_dir, cache_dir = job
+    with redirect_stdout(io.StringIO()):
+        metrics = collect_metrics(run_dir, cache_dir)
+    return run_dir, metrics
+
+
+def analyze_runs(run_dirs, jobs=None, cache_dir=None):
+    "{run_dir: metrics} for many run directories, parsed across a process pool."
+    work = [(d, cache_dir) for d in run_dirs]
+    if jobs == 1:
+        return dict(map(_analyze_run, work))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return dict(pool.map(_analyze_run, work, chunksize=max(1, len(work) // 64)))
+
+
+# (metric key, y label, title, file name prefix) of the four comparison plots
+PLOTS = [
+    ("throughput_Mbps", "Throughput (Mbits/sec)", "Throughput vs Scenario (TCP/UDP/ICMP)", "throughput_comparison"),
+    ("rtt_ms", "Average RTT (ms)", "RTT vs Scenario (TCP/UDP/ICMP)", "rtt_comparison"),
+    ("loss_pct", "Packet Loss (%)", "Packet Loss vs Scenario (TCP/UDP/ICMP)", "loss_comparison"),
+    ("jitter_ms", "Jitter (ms)", "Jitter vs Scenario (TCP/UDP/ICMP)", "jitter_comparison"),
+]
+
+
+def plot_filename(prefix, out_dir='.', tag=''):
+    "e.g. throughput_comparison_B500.png; no suffix without a tag."
+    suffix = f"_{tag}" if tag else ""
+    return os.path.join(out_dir, f"{prefix}{suffix}.png")
+
+
+def load_run_meta(log_dir='.'):
+    "exp -> run metadata written by the experiment scripts (expN_run_meta.json)."
+    meta = {}
+    for exp in experiments:
+        path = os.path.join(log_dir, f"{exp}_run_meta.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                meta[exp] = json.load(f)
+    return meta
+
+
+def default_tag(log_dir='.'):
+    "Plot suffix from the bandwidth the runs were made with (B10 / B500), '' if unknown."
+    bws = {m.get("bw_Mbps") for m in load_run_meta(log_dir).values()}
+    bws.discard(None)
+    return f"B{bws.pop()}" if len(bws) == 1 else ""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse exp1-3 logs and plot the comparison figures")
+    parser.add_argument('--log-dir', default='.')
+    parser.add_argument('--out-dir', default=None, help="where the PNGs go (default: --log-dir)")
+    parser.add_argument('--tag', default=None,
+                        help="file name suffix, e.g. B500 (default: from the run metadata)")
+    parser.add_argument('--no-show', action='store_true', help="do not open the plot windows")
+    parser.add_argument('--runs', nargs='+', default=None, metavar='DIR_OR_GLOB',
+                        help="analyze many run directories (e.g. 'runs/*_B500M') instead of --log-dir")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes for --runs (default: all CPUs)")
+    parser.add_argument('--cache-dir', default='.parse_cache',
+                        help="parse cache keyed by log content hash ('' to disable)")
+    parser.add_argument('--out', default='runs_summary.json', help="output of --runs")
+    args = parser.parse_args(argv)
+
+    if args.runs:
+        t0 = time.time()
+        run_dirs = expand_runs(args.runs)
+        results = analyze_runs(run_dirs, args.jobs, args.cache_dir or None)
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=1)
+        print(f"[INFO] Analyzed {len(results)} runs in {time.time() - t0:.2f} s -> {args.out}")
+        return
+
+    metrics = collect_metrics(args.log_dir, args.cache_dir or None)
+    tag = default_tag(args.log_dir) if args.tag is None else args.tag
+    out_dir = args.out_dir or args.log_dir
+
+    for key, ylabel, title, prefix in PLOTS:
+        plot_metric(metrics, key, ylabel, title, plot_filename(prefix, out_dir, tag))
+
+    if not args.no_show:
+        import matplotlib.pyplot as plt
+        plt.show()
+
+
+if __name__ == '__main__':
+    main()
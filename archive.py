@@ -0,0 +1,162 @@
+"""
+Compressed per-run log archives.
+
+With `--archive ROOT` an experiment script writes its logs into a fresh
+run directory ROOT/<date>-<time>_expN_B<bw>M/ and compresses every .log
+there when the run is done (gzip, or zstd when the `zstandard` module is
+installed).  manifest.json in the run directory lists every file with its
+raw / stored size and the sha256 of the raw content.
+
+The analyze_logs.py parsers open logs through open_log(), which reads
+`x.log`, `x.log.gz` or `x.log.zst` transparently as a text stream, so
+archived runs are analyzed without extracting anything to disk.
+
+    python3 archive.py compress runs/20260101-120000_exp1_B10M --codec zstd
+    python3 archive.py stats runs
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import time
+
+try:
+    import zstandard
+except ImportError:  # optional, gzip is always there
+    zstandard = None
+
+MANIFEST = "manifest.json"
+CODECS = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def new_run_dir(root, exp, bw_Mbps):
+    "Create and return ROOT/<date>-<time>_<exp>_B<bw>M."
+    path = os.path.join(root, f"{time.strftime('%Y%m%d-%H%M%S')}_{exp}_B{bw_Mbps}M")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def resolve_log(path):
+    "Existing file for a log path: the plain file, else its .gz / .zst archive, else None."
+    for candidate in (path, path + ".gz", path + ".zst"):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def open_log(path):
+    "Open a (possibly compressed) log as a text stream; path may omit .gz/.zst."
+    real = resolve_log(path)
+    if real is None:
+        raise FileNotFoundError(path)
+    if real.endswith(".gz"):
+        return gzip.open(real, 'rt', errors='replace')
+    if real.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{real} is zstd-compressed but the zstandard module is not installed")
+        raw = open(real, 'rb')
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True),
+                                errors='replace')
+    return open(real, 'r')
+
+
+def _compress_file(src, codec, level):
+    dst = src + CODECS[codec]
+    sha = hashlib.sha256()
+    with open(src, 'rb') as fin:
+        if codec == "zstd":
+            cctx = zstandard.ZstdCompressor(level=level)
+            with open(dst, 'wb') as fout, cctx.stream_writer(fout) as writer:
+                for chunk in iter(lambda: fin.read(1 << 20), b''):
+                    sha.update(chunk)
+                    writer.write(chunk)
+        else:
+            with gzip.open(dst, 'wb', compresslevel=level) as fout:
+                for chunk in iter(lambda: fin.read(1 << 20), b''):
+                    sha.update(chunk)
+                    fout.write(chunk)
+    return dst, sha.hexdigest()
+
+
+def compress_run(run_dir, codec="gzip", level=None):
+    """
+    Compress every *.log in run_dir in place and (re)write manifest.json.
+    Returns the manifest dict.
+    """
+    if codec == "zstd" and zstandard is None:
+        print("[WARN] zstandard module not installed, falling back to gzip")
+        codec = "gzip"
+    if level is None:
+        level = 3 if codec == "zstd" else 6
+
+    manifest = load_manifest(run_dir)
+    files = manifest.setdefault("files", {})
+    for name in sorted(os.listdir(run_dir)):
+        src = os.path.join(run_dir, name)
+        if not name.endswith(".log") or not os.path.isfile(src):
+            continue
+        raw_bytes = os.path.getsize(src)
+        dst, digest = _compress_file(src, codec, level)
+        os.remove(src)
+        files[name] = {
+            "stored": os.path.basename(dst),
+            "codec": codec,
+            "raw_bytes": raw_bytes,
+            "stored_bytes": os.path.getsize(dst),
+            "sha256": digest,
+        }
+
+    manifest["run"] = os.path.basename(os.path.abspath(run_dir))
+    manifest["raw_bytes"] = sum(f["raw_bytes"] for f in files.values())
+    manifest["stored_bytes"] = sum(f["stored_bytes"] for f in files.values())
+    with open(os.path.join(run_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"[INFO] Archived {len(files)} logs in {run_dir}: "
+          f"{manifest['raw_bytes']} -> {manifest['stored_bytes']} bytes ({codec})")
+    return manifest
+
+
+def load_manifest(run_dir):
+    path = os.path.join(run_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def run_dirs(root):
+    "Run directories (those with a manifest) below root, sorted by name."
+    return sorted(os.path.join(root, d) for d in os.listdir(root)
+                  if os.path.exists(os.path.join(root, d, MANIFEST)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compressed per-run log archives")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("compress", help="compress the .log files of run directories")
+    p.add_argument("run_dir", nargs='+')
+    p.add_argument("--codec", choices=sorted(CODECS), default="gzip")
+    p.add_argument("--level", type=int, default=None)
+    p = sub.add_parser("stats", help="storage per run of an archive root")
+    p.add_argument("root")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "compress":
+        for run_dir in args.run_dir:
+            compress_run(run_dir, args.codec, args.level)
+    else:
+        total_raw = total_stored = 0
+        for run_dir in run_dirs(args.root):
+            m = load_manifest(run_dir)
+            total_raw += m.get("raw_bytes", 0)
+            total_stored += m.get("stored_bytes", 0)
+            ratio = m["raw_bytes"] / m["stored_bytes"] if m.get("stored_bytes") else float('nan')
+            print(f"{m.get('run', run_dir):<40} {m.get('raw_bytes', 0):>12} -> "
+                  f"{m.get('stored_bytes', 0):>10} bytes  x{ratio:.1f}")
+        print(f"{'total':<40} {total_raw:>12} -> {total_stored:>10} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,431 @@
+"""
+Stochastic background load for exp2.
+
+By default exp2's congestion comes from two constant flows (h4 -> h3,
+h6 -> h5) that start together with the main test.  With --bg-model the
+experiment scripts replace them with a schedule that is built in advance
+as a numpy record array (start, pair, length, rate) and replayed across
+any host pairs (--bg-pairs, not h1 / h20):
+- constant: one flow per pair for the whole phase (the old behaviour)
+- onoff:    per pair, exponential on periods (mean --bg-on s) separated
+            by exponential off periods (mean --bg-off s), random phase
+- poisson:  per pair, flows arrive as a Poisson process (--bg-arrivals
+            per s) with exponential lengths (mean --bg-flow s)
+- trace:    the flows of a CSV file "t,src,dst,duration[,rate]"
+The same --bg-seed gives the same schedule.  The replayer starts every
+flow at its scheduled time and keeps the lag.  Per phase it writes
+<exp>_<phase>_background.json: the planned offered load (mean, peak,
+burstiness), what the iperf clients actually sent, and the start-time
+lag.
+
+    sudo python3 project_topo_exp2_B10M.py --bg-model onoff --bg-on 1 --bg-off 2 --bg-seed 7
+    python3 background.py --bg-model poisson --bg-arrivals 4 --duration 20 --out trace.csv
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import threading
+import time
+
+from analyze_logs import parse_iperf_summary
+from exp_common import log_path
+from procs import IPERF_PORT, Procs
+from topology import HOSTS
+
+BG_MODELS = ('constant', 'onoff', 'poisson', 'trace')
+
+DEFAULT_PAIRS = (('h4', 'h3'), ('h6', 'h5'))
+
+# endpoints of the main measurement, never used by the background
+MAIN_HOSTS = ('h1', 'h20')
+
+SCHEDULE_DTYPE = [
+    ("t", "f8"),      # start, s after the phase started
+    ("pair", "i4"),   # index into the pair list
+    ("dur", "f8"),    # flow length (s)
+    ("rate", "f8"),   # Mbit/s, nan = unlimited (TCP)
+]
+
+# shorter flows are dropped (iperf needs time to even start)
+MIN_FLOW_S = 0.1
+# resolution of the offered-load curve
+LOAD_BIN_S = 0.1
+# iperf -i of the background flows (per-flow throughput over time, see fairness.py)
+REPORT_INTERVAL_S = 0.5
+
+
+def add_background_args(parser):
+    "The --bg-* options of the exp2 scripts."
+    parser.add_argument('--bg-model', choices=BG_MODELS, default=None,
+                        help="background schedule (default: the script's two constant flows)")
+    parser.add_argument('--bg-pairs', nargs='+', default=[f'{s}:{d}' for s, d in DEFAULT_PAIRS],
+                        metavar='SRC:DST', help="background host pairs")
+    parser.add_argument('--bg-rate', type=float, default=None,
+                        help="Mbit/s per flow (default: the script's UDP rate of the phase; TCP unlimited)")
+    parser.add_argument('--bg-on', type=float, default=1.0, help="onoff: mean on period (s)")
+    parser.add_argument('--bg-off', type=float, default=1.0, help="onoff: mean off period (s)")
+    parser.add_argument('--bg-arrivals', type=float, default=2.0, help="poisson: flows per s per pair")
+    parser.add_argument('--bg-flow', type=float, default=0.5, help="poisson: mean flow length (s)")
+    parser.add_argument('--bg-trace', default=None, help="trace: CSV file t,src,dst,duration[,rate]")
+    parser.add_argument('--bg-seed', type=int, default=0)
+    return parser
+
+
+def check_pairs(pairs, source):
+    "SystemExit unless every (src, dst) of pairs is two different known hosts, neither h1 nor h20."
+    for src, dst in pairs:
+        pair = f'{src}:{dst}'
+        for h in (src, dst):
+            if h not in HOSTS:
+                raise SystemExit(f"{source}: unknown host {h!r} in {pair} (hosts h1 .. h{len(HOSTS)})")
+            if h in MAIN_HOSTS:
+                raise SystemExit(f"{source}: {pair} uses {h}, the background must not touch "
+                                 f"the main flow's hosts ({' / '.join(MAIN_HOSTS)})")
+        if src == dst:
+            raise SystemExit(f"{source}: {pair} sends to itself")
+
+
+def parse_pairs(values):
+    "[(src, dst), ...] of --bg-pairs SRC:DST values (SystemExit on a bad one)."
+    pairs = []
+    for value in values:
+        src, sep, dst = value.partition(':')
+        if not sep or not src or not dst or ':' in dst:
+            raise SystemExit(f"--bg-pairs: bad pair {value!r}, expected SRC:DST (e.g. h4:h3)")
+        pairs.append((src, dst))
+    check_pairs(pairs, '--bg-pairs')
+    return pairs
+
+
+def background_from_args(args, udp_rate):
+    """
+    Background from the --bg-* options, or None for the scripts' fixed
+    flows.  udp_rate: Mbit/s of the UDP background, or {phase: Mbit/s}
+    where the script's phases use different rates.
+    """
+    if not args.bg_model:
+        return None
+    if args.bg_model == 'trace' and not args.bg_trace:
+        raise SystemExit("--bg-model trace needs --bg-trace FILE")
+    if args.bg_model == 'trace':
+        if not os.path.exists(args.bg_trace):
+            raise SystemExit(f"--bg-trace: no such file {args.bg_trace!r}")
+        # trace 自带 host pair，提前检查，别等 server 都起来了才出错
+        check_pairs(load_trace(args.bg_trace)[0], args.bg_trace)
+    pairs = parse_pairs(args.bg_pairs)
+    return Background(args.bg_model, pairs, rate=args.bg_rate, udp_rate=udp_rate, on_s=args.bg_on,
+                      off_s=args.bg_off, arrivals=args.bg_arrivals, flow_s=args.bg_flow,
+                      trace=args.bg_trace, seed=args.bg_seed)
+
+
+def _to_schedule(t, pair, dur, rate):
+    import numpy as np
+    sched = np.zeros(len(t), dtype=SCHEDULE_DTYPE)
+    sched["t"], sched["pair"], sched["dur"], sched["rate"] = t, pair, dur, rate
+    sched = sched[sched["dur"] >= MIN_FLOW_S]
+    sched.sort(order="t")
+    return sched
+
+
+def _clip(starts, durs, duration):
+    "Flows that start before `duration`, cut off at it."
+    import numpy as np
+    keep = starts < duration
+    starts, durs = starts[keep], durs[keep]
+    return starts, np.minimum(durs, duration - starts)
+
+
+def onoff_schedule(n_pairs, duration, on_s, off_s, rate, rng):
+    import numpy as np
+    parts = []
+    for p in range(n_pairs):
+        n = int(duration / (on_s + off_s) * 2) + 10   # 多抽一些，反正会截掉
+        on, off = rng.exponential(on_s, n), rng.exponential(off_s, n)
+        # 随机相位：第一个 off 只取一部分
+        starts = off[0] * rng.random() + np.concatenate(([0.0], np.cumsum(on[:-1] + off[1:])))
+        starts, durs = _clip(starts, on, duration)
+        parts.append((starts, np.full(len(starts), p), durs))
+    return _to_schedule(*(np.concatenate([x[i] for x in parts]) for i in range(3)), rate)
+
+
+def poisson_schedule(n_pairs, duration, arrivals, flow_s, rate, rng):
+    import numpy as np
+    parts = []
+    for p in range(n_pairs):
+        n = int(duration * arrivals * 2) + 10
+        starts = np.cumsum(rng.exponential(1.0 / arrivals, n))
+        starts, durs = _clip(starts, rng.exponential(flow_s, n), duration)
+        parts.append((starts, np.full(len(starts), p), durs))
+    return _to_schedule(*(np.concatenate([x[i] for x in parts]) for i in range(3)), rate)
+
+
+def constant_schedule(n_pairs, duration, rate):
+    import numpy as np
+    return _to_schedule(np.zeros(n_pairs), np.arange(n_pairs), np.full(n_pairs, float(duration)), rate)
+
+
+def load_trace(path, default_rate=math.nan):
+    "(pairs, schedule) of a CSV trace; lines starting with '#' and a header are skipped."
+    import numpy as np
+    pairs, rows = [], []
+    with open(path) as f:
+        for line in csv.reader(f):
+            if not line or line[0].startswith('#') or line[0].strip() == 't':
+                continue
+            t, src, dst, dur = float(line[0]), line[1].strip(), line[2].strip(), float(line[3])
+            rate = float(line[4]) if len(line) > 4 and line[4].strip() else default_rate
+            if (src, dst) not in pairs:
+                pairs.append((src, dst))
+            rows.append((t, pairs.index((src, dst)), dur, rate))
+    t, pair, dur, rate = (np.array(col) for col in zip(*rows)) if rows else ([], [], [], [])
+    return pairs, _to_schedule(t, pair, dur, rate)
+
+
+def save_trace(path, pairs, schedule):
+    "Write a schedule as a CSV trace that --bg-model trace replays."
+    with open(path, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(('t', 'src', 'dst', 'duration', 'rate'))
+        for row in schedule:
+            src, dst = pairs[row["pair"]]
+            rate = '' if math.isnan(row["rate"]) else f'{row["rate"]:.3f}'
+            w.writerow((f'{row["t"]:.4f}', src, dst, f'{row["dur"]:.4f}', rate))
+
+
+def offered_load(schedule, n_pairs, duration, bin_s=LOAD_BIN_S):
+    "Planned offered load, Mbit/s per bin and pair: array of shape (bins, pairs)."
+    import numpy as np
+    n_bins = max(int(math.ceil(duration / bin_s)), 1)
+    load = np.zeros((n_bins, n_pairs))
+    edges = np.arange(n_bins + 1) * bin_s
+    for row in schedule:
+        if math.isnan(row["rate"]):
+            continue
+        start, end = row["t"], min(row["t"] + row["dur"], duration)
+        first, last = int(start // bin_s), min(int(math.ceil(end / bin_s)), n_bins)
+        overlap = np.minimum(edges[first + 1:last + 1], end) - np.maximum(edges[first:last], start)
+        load[first:last, row["pair"]] += row["rate"] * np.clip(overlap, 0, None) / bin_s
+    return load
+
+
+def load_summary(schedule, pairs, duration, bin_s=LOAD_BIN_S):
+    "Mean / peak / CV of the planned load and the per-pair means (Mbit/s)."
+    import numpy as np
+    load = offered_load(schedule, len(pairs), duration, bin_s)
+    if len(schedule) and np.isnan(schedule["rate"]).all():
+        load[:] = math.nan   # 不限速的 TCP 流没有计划速率
+    total = load.sum(axis=1)
+    mean = float(total.mean())
+    active = schedule.copy()
+    active["rate"] = 1.0
+    return {
+        "flows": int(len(schedule)),
+        "planned_mean_Mbps": mean,
+        "planned_peak_Mbps": float(total.max()),
+        "planned_cv": float(total.std() / mean) if mean else math.nan,
+        "busy_fraction": float((offered_load(active, len(pairs), duration, bin_s).sum(axis=1) > 0).mean()),
+        "per_pair_Mbps": {f'{s}->{d}': float(load[:, i].mean()) for i, (s, d) in enumerate(pairs)},
+    }
+
+
+class Background(object):
+    """
+    A background-load model; schedule() builds the flows of one phase,
+    start() replays them on a network.
+    - rate: Mbit/s of every flow (None = udp_rate for UDP, unlimited TCP)
+    - udp_rate: Mbit/s of UDP flows, or {phase: Mbit/s}
+    """
+
+    def __init__(self, model, pairs=DEFAULT_PAIRS, rate=None, udp_rate=20.0, on_s=1.0, off_s=1.0,
+                 arrivals=2.0, flow_s=0.5, trace=None, seed=0):
+        self.model = model
+        self.pairs = list(pairs)
+        self.rate = rate
+        self.udp_rate = udp_rate
+        self.on_s, self.off_s = on_s, off_s
+        self.arrivals, self.flow_s = arrivals, flow_s
+        self.trace = trace
+        self.seed = seed
+
+    def flow_rate(self, proto, phase=None):
+        if self.rate:
+            return self.rate
+        if proto != 'udp':
+            return math.nan
+        return self.udp_rate[phase] if isinstance(self.udp_rate, dict) else self.udp_rate
+
+    def schedule(self, duration, proto='udp', phase=None):
+        "(pairs, schedule) of one phase of `duration` s."
+        import numpy as np
+        rng = np.random.default_rng(self.seed)
+        rate, n = self.flow_rate(proto, phase), len(self.pairs)
+        if self.model == 'trace':
+            pairs, sched = load_trace(self.trace, rate)
+            return pairs, sched[sched["t"] < duration]
+        if self.model == 'onoff':
+            return self.pairs, onoff_schedule(n, duration, self.on_s, self.off_s, rate, rng)
+        if self.model == 'poisson':
+            return self.pairs, poisson_schedule(n, duration, self.arrivals, self.flow_s, rate, rng)
+        return self.pairs, constant_schedule(n, duration, rate)
+
+    def describe(self):
+        params = {'onoff': dict(on_s=self.on_s, off_s=self.off_s),
+                  'poisson': dict(arrivals_per_s=self.arrivals, flow_s=self.flow_s),
+                  'trace': dict(trace=self.trace)}.get(self.model, {})
+        return dict(model=self.model, seed=self.seed, rate_Mbps=self.rate, udp_rate_Mbps=self.udp_rate,
+                    **params)
+
+    def start(self, net, proto, duration, log_dir, exp, phase, events=None, procs=None):
+        """
+        Start the servers and a Replayer for one phase; returns the running
+        Replayer.  procs: procs.Procs that tracks the servers and clients.
+        """
+        pairs, sched = self.schedule(duration, proto, phase)
+        replayer = Replayer(net, pairs, sched, proto, duration, log_dir, exp, phase, events,
+                            self.describe(), procs=procs)
+        replayer.start_servers()
+        replayer.start()
+        return replayer
+
+
+class Replayer(threading.Thread):
+    """
+    Replays a schedule: every flow is an iperf client started in the
+    background on its source host at t0 + t.  Only the source hosts of
+    the pairs are touched from this thread.
+    """
+
+    def __init__(self, net, pairs, schedule, proto, duration, log_dir, exp, phase, events=None,
+                 info=None, lead_s=0.2, procs=None):
+        super().__init__(daemon=True)
+        self.net = net
+        self.pairs = pairs
+        self.schedule = schedule
+        self.proto = proto
+        self.duration = duration
+        self.log_dir = log_dir
+        self.phase = phase
+        self.tag = f'{exp}_{phase}'
+        self.events = events
+        self.info = info or {}
+        self.lead_s = lead_s
+        self.procs = procs if procs is not None else Procs()
+        self.t0 = None
+        self.lags = []
+        self.logs = []
+        self._halt = threading.Event()
+
+    def start_servers(self):
+        opt = ' -u' if self.proto == 'udp' else ''
+        for dst in dict.fromkeys(d for _, d in self.pairs):
+            self.procs.start(self.net.get(dst), f'iperf -s{opt} > /dev/null 2>&1', name=f'iperf -s{opt} {dst}',
+                             group=self.tag, port=IPERF_PORT, sig='TERM')
+
+    def _client_cmd(self, dst_ip, row, log):
+        cmd = f'iperf -c {dst_ip} -t {row["dur"]:.3f} -i {REPORT_INTERVAL_S}'
+        if self.proto == 'udp':
+            cmd += ' -u'
+        if not math.isnan(row["rate"]):
+            cmd += f' -b {row["rate"]:.3f}M'   # iperf 2.0.10+ 也能限 TCP 的速率
+        return f'{cmd} > {log} 2>&1'
+
+    def run(self):
+        actions = sorted([(row["t"], 1, i) for i, row in enumerate(self.schedule)] +
+                         [(row["t"] + row["dur"], 0, i) for i, row in enumerate(self.schedule)])
+        self.t0 = time.time() + self.lead_s
+        for t, is_start, i in actions:
+            if self._halt.wait(max(self.t0 + t - time.time(), 0)):
+                break
+            row = self.schedule[i]
+            src, dst = self.pairs[row["pair"]]
+            flow = f'{src}->{dst}#{i}'
+            if not is_start:
+                if self.events is not None:
+                    self.events.stop(flow)
+                continue
+            self.lags.append(time.time() - (self.t0 + t))
+            log = log_path(self.log_dir, f'{self.tag}_bg_{i:04d}_{src}_{dst}.log')
+            self.logs.append((row["pair"], log))
+            self.procs.start(self.net.get(src), self._client_cmd(self.net.get(dst).IP(), row, log),
+                             name=flow, group=self.tag)
+            if self.events is not None:
+                self.events.start(flow, kind='background', proto=self.proto, phase=self.phase,
+                                  model=self.info.get('model'))
+
+    def stop(self):
+        "Stop the replay and the running clients, save and return the report."
+        elapsed = time.time() - self.t0 if self.t0 else 0.0
+        self._halt.set()
+        self.join()
+        # 先 SIGINT 客户端（iperf 还会打 summary），再停 server
+        self.procs.stop(self.tag, label=f'{self.tag} background')
+        if self.events is not None:
+            self.events.stop_all()
+        report = self.report(min(elapsed, self.duration))
+        out_file = log_path(self.log_dir, f'{self.tag}_background.json')
+        with open(out_file, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[BG] {self.tag}: {report['flows_started']} flows, planned {report['planned_mean_Mbps']:.2f} "
+              f"Mbit/s (peak {report['planned_peak_Mbps']:.2f}), sent {report['actual_mean_Mbps']:.2f} Mbit/s, "
+              f"start lag p99 {report['lag_p99_ms']:.1f} ms")
+        return report
+
+    def report(self, elapsed):
+        "Planned vs actually offered load over the first `elapsed` s."
+        from analyze_logs import percentiles
+        sched = self.schedule[self.schedule["t"] < elapsed]
+        summary = load_summary(sched, self.pairs, max(elapsed, LOAD_BIN_S))
+        sent = [0.0] * len(self.pairs)
+        unreported = 0
+        for pair, log in self.logs:
+            mbit = _sent_mbit(log)
+            if mbit is None:
+                unreported += 1
+            else:
+                sent[pair] += mbit
+        span = max(elapsed, LOAD_BIN_S)
+        lags_ms = [1e3 * lag for lag in self.lags]
+        p50, p99 = percentiles(lags_ms, (50, 99))
+        return dict(self.info, proto=self.proto, elapsed_s=round(elapsed, 3), **summary,
+                    flows_started=len(self.logs), flows_unreported=unreported,
+                    actual_mean_Mbps=sum(sent) / span,
+                    actual_per_pair_Mbps={f'{s}->{d}': v / span for (s, d), v in zip(self.pairs, sent)},
+                    lag_p50_ms=p50, lag_p99_ms=p99, lag_max_ms=max(lags_ms, default=math.nan))
+
+
+def _sent_mbit(log):
+    "Mbit the iperf client in `log` sent (its summary line), None if it has none."
+    sent = parse_iperf_summary(log)["sent"] if os.path.exists(log) else None
+    if sent is None:
+        return None
+    start, end, mbps = sent
+    return mbps * (end - start)
+
+
+def main(argv=None):
+    parser = add_background_args(argparse.ArgumentParser(
+        description="Build a background schedule and show its planned offered load"))
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--proto', choices=('udp', 'tcp'), default='udp')
+    parser.add_argument('--udp-rate', type=float, default=20.0, help="rate when --bg-rate is not given")
+    parser.add_argument('--out', default=None, help="save the schedule as a CSV trace")
+    args = parser.parse_args(argv)
+    args.bg_model = args.bg_model or 'constant'
+
+    bg = background_from_args(args, args.udp_rate)
+    pairs, sched = bg.schedule(args.duration, args.proto)
+    summary = load_summary(sched, pairs, args.duration)
+    print(f"{bg.model}: {summary['flows']} flows over {args.duration:.0f} s, "
+          f"mean {summary['planned_mean_Mbps']:.2f} Mbit/s, peak {summary['planned_peak_Mbps']:.2f}, "
+          f"cv {summary['planned_cv']:.2f}, busy {100 * summary['busy_fraction']:.0f}%")
+    for pair, mbps in summary["per_pair_Mbps"].items():
+        print(f"  {pair}: {mbps:.2f} Mbit/s")
+    if args.out:
+        save_trace(args.out, pairs, sched)
+        print(f"[INFO] Saved trace: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Correctness checks and benchmarks of the log parsers in analyze_logs.py.
+
+Every case writes a synthetic log with synth_logs.py (iperf TCP in
+K/M/G units and with -P streams, iperf UDP with the server report, ping
+with a summary / cut off by pkill / flood / without -D / gzip-compressed)
+and compares what the parser reads back with the generator's ground
+truth.  For each size of --sizes (reply / interval lines) it reports the
+best of --repeats parse times as lines per second and the peak Python
+memory of one parse (tracemalloc), so a parser that keeps the whole log
+in memory shows up as growing with the size.  Exits with status 1 if a
+check fails.
+
+    python3 bench_parsers.py --sizes 10000 100000 1000000
+"""
+import argparse
+import io
+import json
+import math
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+import synth_logs
+from analyze_logs import parse_iperf_throughput, parse_iperf_udp_metrics, parse_ping_rtt_loss, parse_ping_stats
+
+# parser name -> (parser, result -> {ground-truth key: value})
+PARSERS = {
+    'parse_iperf_throughput': (parse_iperf_throughput, lambda r: {"throughput_Mbps": r}),
+    'parse_iperf_udp_metrics': (parse_iperf_udp_metrics,
+                                lambda r: dict(zip(("throughput_Mbps", "jitter_ms", "loss_pct"), r))),
+    'parse_ping_rtt_loss': (parse_ping_rtt_loss, lambda r: {"rtt_avg_ms": r[0], "loss_pct": r[1]}),
+    'parse_ping_stats': (parse_ping_stats, lambda r: r),
+}
+
+# case -> (parser name, file suffix, writer(path, lines) -> ground truth)
+CASES = {
+    'tcp_M': ('parse_iperf_throughput', '.log',
+              lambda path, n: synth_logs.iperf_tcp_log(path, 9.5, n)),
+    'tcp_K': ('parse_iperf_throughput', '.log',
+              lambda path, n: synth_logs.iperf_tcp_log(path, 0.5, n)),
+    'tcp_G_P4': ('parse_iperf_throughput', '.log',
+                 lambda path, n: synth_logs.iperf_tcp_log(path, 2400, max(n // 5, 1), streams=4)),
+    'udp': ('parse_iperf_udp_metrics', '.log',
+            lambda path, n: synth_logs.iperf_udp_log(path, 10, n, loss_pct=0.35)),
+    'udp_all_lost': ('parse_iperf_udp_metrics', '.log',
+                     lambda path, n: synth_logs.iperf_udp_log(path, 0.5, n, loss_pct=100)),
+    'ping': ('parse_ping_stats', '.log',
+             lambda path, n: synth_logs.ping_log(path, n, loss_pct=1.0)),
+    'ping_truncated': ('parse_ping_stats', '.log',
+                       lambda path, n: synth_logs.ping_log(path, n, ending='truncated')),
+    'ping_flood': ('parse_ping_stats', '.log',
+                   lambda path, n: synth_logs.ping_log(path, n, loss_pct=0.01, ending='flood')),
+    'ping_no_D_ms': ('parse_ping_rtt_loss', '.log',
+                     lambda path, n: synth_logs.ping_log(path, n, rtt_ms=25, jitter_ms=5, timestamps=False)),
+    'ping_gz': ('parse_ping_stats', '.log.gz',
+                lambda path, n: synth_logs.ping_log(path, n, loss_pct=1.0)),
+}
+
+CHECK_LINES = 200
+
+
+def _same(expected, got):
+    if isinstance(expected, float) and math.isnan(expected):
+        return isinstance(got, float) and math.isnan(got)
+    return got is not None and math.isclose(got, expected, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def check(parser_name, path, truth):
+    "[(field, expected, got), ...] of the fields the parser got wrong."
+    parser, fields = PARSERS[parser_name]
+    with redirect_stdout(io.StringIO()):
+        got = fields(parser(path))
+    return [(key, truth[key], got[key]) for key in got
+            if key in truth and not _same(truth[key], got[key])]
+
+
+def _line_count(path):
+    with synth_logs.gzip.open(path, 'rt') if path.endswith('.gz') else open(path) as f:
+        return sum(1 for _ in f)
+
+
+def bench(parser, path, repeats):
+    "(best seconds, peak traced bytes) of parsing path."
+    best = math.inf
+    with redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            parser(path)
+            best = min(best, time.perf_counter() - t0)
+        # tracemalloc 会让解析慢很多，单独跑一遍只量内存
+        tracemalloc.start()
+        parser(path)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_case(case, lines, tmp_dir, repeats):
+    parser_name, suffix, writer = CASES[case]
+    base = os.path.join(tmp_dir, f'{case}_{lines}.log')
+    truth = writer(base + suffix[len('.log'):], lines)
+    errors = check(parser_name, base, truth)
+    n = _line_count(base + suffix[len('.log'):])
+    seconds, peak = bench(PARSERS[parser_name][0], base, repeats)
+    return {
+        "case": case,
+        "parser": parser_name,
+        "lines": n,
+        "bytes": os.path.getsize(base + suffix[len('.log'):]),
+        "seconds": seconds,
+        "lines_per_s": n / seconds if seconds > 0 else math.inf,
+        "peak_KiB": peak / 1024,
+        "errors": [{"field": f, "expected": e, "got": g} for f, e, g in errors],
+    }
+
+
+def print_table(rows):
+    print(f"\n{'case':<15} {'parser':<24} {'lines':>9} {'lines/s':>11} {'peak KiB':>9} {'check':<5}")
+    for r in rows:
+        status = "ok" if not r["errors"] else "FAIL"
+        print(f"{r['case']:<15} {r['parser']:<24} {r['lines']:>9} {r['lines_per_s']:>11.0f} "
+              f"{r['peak_KiB']:>9.1f} {status:<5}")
+        for e in r["errors"]:
+            print(f"    {e['field']}: expected {e['expected']!r}, got {e['got']!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the log parsers against synthetic logs and time them")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help="reply / interval lines per log")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--repeats', type=int, default=3, help="timed parses per log (best is kept)")
+    parser.add_argument('--out', default='bench_parsers.json')
+    args = parser.parse_args(argv)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for lines in [CHECK_LINES] + sorted(args.sizes):
+            for case in args.cases:
+                rows.append(run_case(case, lines, tmp_dir, args.repeats))
+
+    print_table(rows)
+    with open(args.out, 'w') as f:
+        json.dump(rows, f, indent=1)
+    print(f"[INFO] Saved parser benchmark: {args.out}")
+    failed = sorted({r["case"] for r in rows if r["errors"]})
+    if failed:
+        raise SystemExit(f"[WARN] Parser checks failed: {', '.join(failed)}")
+
+
+if __name__ == '__main__':
+    main()
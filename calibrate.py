@@ -0,0 +1,349 @@
+"""
+Pre-flight link calibration: does every link deliver its configured rate?
+
+Every analysis assumes a TCLink(bw=500) really carries 500 Mbit/s, which
+at high rates often depends on the machine (CPU, OVS, tc).  After the
+network is started this covers every link of the topology with short
+host-to-host tests:
+- tests are chosen so that each link is on at least one test path
+  (shortest host pair whose path crosses it, preferring pairs that also
+  cover other links not measured yet)
+- tests whose paths share no link run in parallel, in rounds of at most
+  --parallel tests (CPU contention is interference too)
+- each test: idle ping for the base RTT, then a BURST_S TCP burst; the
+  rate is the median of its 0.5 s intervals after slow start
+- a link's capacity is the best rate of the tests that crossed it (a
+  path is never faster than its slowest link), its RTT the smallest test
+  RTT minus the netem delays of the other links on that path
+A link is off target when its capacity is more than --tolerance % away
+from the TCP goodput of its bw (planner.TCP_PAYLOAD_RATIO), or its RTT
+more than --tolerance % away from 2 x its netem delay + BASE_RTT_MS
+(links with a delay only, a bare veth RTT is all noise).  With a link
+profile (topology.py) the target is the link's own bw, or the slower
+direction of an asymmetric link, capped at the slowest link of the test
+paths that cross it: a core faster than the edges is only checked up to
+the edge rate.
+
+Results are cached under a hash of the topology (spec, bw, isolation)
+and of the machine (host name, kernel, CPU, OVS / iperf versions), so
+later runs on the same setup skip the pass (--recalibrate forces it,
+results older than MAX_AGE_DAYS are redone).  The experiment scripts run
+it with --calibrate and flag (or with --calib-strict refuse) the run when
+a link is off target.
+
+    sudo python3 calibrate.py --bw 500 --exp 3
+    sudo python3 project_topo_exp1_B500M.py --calibrate --calib-tolerance 10 --calib-strict
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import platform
+import time
+
+from analyze_logs import parse_iperf_intervals, parse_ping_stats, percentiles
+from exp_common import host_info, log_path
+from planner import BASE_RTT_MS, TCP_PAYLOAD_RATIO, delay_ms
+from procs import IPERF_PORT, Procs
+from topology import shortest_path
+
+BURST_S = 3
+REPORT_S = 0.5
+# intervals before this are slow start
+SETTLE_S = 1.0
+RTT_PINGS = 5
+DEFAULT_TOLERANCE = 10.0
+DEFAULT_PARALLEL = 4
+CACHE_DIR = 'calibration'
+MAX_AGE_DAYS = 7
+
+
+def spec_links(spec, bw):
+    """{link id: {"ends", "target_Mbps", "delay_ms"}} of every host and core link of spec."""
+    links = {}
+    for a, b, opts in list(spec["host_links"]) + list(spec["core_links"]):
+        links[f'{a}-{b}'] = {
+            "ends": (a, b),
+            # asymmetric links (topology profiles): the slower direction
+            "target_Mbps": min(float(opts.get(d, {}).get('bw', opts.get('bw', bw))) for d in ('up', 'down')),
+            "delay_ms": delay_ms(opts['delay']) if opts.get('delay') else 0.0,
+        }
+    return links
+
+
+def _path_links(path, links):
+    by_ends = {frozenset(v["ends"]): k for k, v in links.items()}
+    return [by_ends[frozenset(hop)] for hop in zip(path, path[1:])]
+
+
+def plan_tests(spec, links):
+    """[{"src", "dst", "links"}, ...] that together cross every link."""
+    hosts = list(spec["hosts"])
+    paths = {}
+    for x in hosts:
+        for y in hosts:
+            if x != y:
+                paths[(x, y)] = _path_links(shortest_path(x, y, spec=spec), links)
+    tests, covered = [], set()
+    for link in links:
+        if link in covered:
+            continue
+        candidates = [(len(p), -len(set(p) - covered), pair, p) for pair, p in paths.items() if link in p]
+        if not candidates:
+            print(f"[WARN] No host pair crosses link {link}, not calibrated")
+            continue
+        _len, _new, (src, dst), p = min(candidates)
+        tests.append({"src": src, "dst": dst, "links": p})
+        covered.update(p)
+    return tests
+
+
+def schedule(tests, parallel=DEFAULT_PARALLEL):
+    "Rounds of tests whose paths share no link (at most `parallel` per round)."
+    rounds = []
+    for test in sorted(tests, key=lambda t: -len(t["links"])):
+        for rnd in rounds:
+            if len(rnd) < parallel and not any(set(test["links"]) & set(t["links"]) for t in rnd):
+                rnd.append(test)
+                break
+        else:
+            rounds.append([test])
+    return rounds
+
+
+def _burst_rate(log):
+    "Median Mbit/s of the burst's intervals after slow start."
+    rows = parse_iperf_intervals(log)
+    settled = [mbps for start, _end, mbps in rows if start >= SETTLE_S] or [mbps for _s, _e, mbps in rows]
+    return percentiles(settled, (50,))[0]
+
+
+def run_round(net, tests, log_dir, index):
+    "Idle ping, then the TCP bursts, of one round of tests in parallel."
+    procs = Procs()
+    for t in tests:
+        src, dst = net.get(t["src"], t["dst"])
+        t["ping_log"] = log_path(log_dir, f'calib_{t["src"]}_{t["dst"]}_ping.log')
+        t["iperf_log"] = log_path(log_dir, f'calib_{t["src"]}_{t["dst"]}_iperf.log')
+        procs.start(dst, 'iperf -s > /dev/null 2>&1', group='servers', port=IPERF_PORT, sig='TERM')
+        procs.start(src, f'ping -c {RTT_PINGS} -i 0.2 {dst.IP()} > {t["ping_log"]}', group='ping')
+    procs.wait('ping', timeout=RTT_PINGS * 0.2 + 2)
+    for t in tests:
+        src, dst = net.get(t["src"], t["dst"])
+        procs.start(src, f'iperf -c {dst.IP()} -t {BURST_S} -i {REPORT_S} > {t["iperf_log"]} 2>&1', group='burst')
+    procs.wait('burst', timeout=BURST_S + 5)
+    procs.stop(label=f'calibration round {index}')
+    for t in tests:
+        t["rtt_ms"] = parse_ping_stats(t["ping_log"])["rtt_min_ms"]
+        t["Mbps"] = _burst_rate(t["iperf_log"])
+        t["round"] = index
+
+
+def link_estimates(links, tests, tolerance=DEFAULT_TOLERANCE):
+    "Per link: measured capacity / RTT against its targets."
+    out = {}
+    for link, info in links.items():
+        crossing = [t for t in tests if link in t["links"]]
+        rates = [t["Mbps"] for t in crossing if not math.isnan(t["Mbps"])]
+        rtts = [t["rtt_ms"] - 2 * sum(links[o]["delay_ms"] for o in t["links"] if o != link)
+                for t in crossing if not math.isnan(t["rtt_ms"])]
+        # a test path runs at its slowest link: a fast core link is only checked up to that
+        reach = max((min(links[o]["target_Mbps"] for o in t["links"]) for t in crossing), default=math.inf)
+        target = min(info["target_Mbps"], reach) * TCP_PAYLOAD_RATIO
+        target_rtt = 2 * info["delay_ms"] + BASE_RTT_MS
+        mbps = max(rates) if rates else math.nan
+        rtt = min(rtts) if rtts else math.nan
+        dev = 100.0 * (mbps - target) / target if target else math.nan
+        rtt_dev = 100.0 * (rtt - target_rtt) / target_rtt if info["delay_ms"] else math.nan
+        out[link] = {
+            "target_Mbps": round(target, 3),
+            "Mbps": mbps,
+            "deviation_pct": dev,
+            "target_rtt_ms": target_rtt,
+            "rtt_ms": rtt,
+            "rtt_deviation_pct": rtt_dev,
+            "tests": len(crossing),
+        }
+        out[link]["ok"] = _on_target(out[link], tolerance)
+    return out
+
+
+def _on_target(r, tolerance):
+    "Capacity measured and within tolerance, and RTT too where the link has a delay."
+    if math.isnan(r["deviation_pct"]) or abs(r["deviation_pct"]) > tolerance:
+        return False
+    return math.isnan(r["rtt_deviation_pct"]) or abs(r["rtt_deviation_pct"]) <= tolerance
+
+
+def _cpu_model():
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def fingerprint(spec, bw, **variant):
+    """(cache key, {"topology", "machine"}) of a topology on this machine."""
+    topo = {"spec": {k: spec[k] for k in ("switches", "hosts", "host_links", "core_links")},
+            "bw_Mbps": bw, **variant}
+    machine = dict(host_info(), cpu=_cpu_model(), ncpu=os.cpu_count())
+    blob = json.dumps({"topology": topo, "machine": machine}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest(), {"topology": topo, "machine": machine}
+
+
+def load_cached(cache_dir, key, max_age_days=MAX_AGE_DAYS):
+    "Cached calibration of key, None if there is none or it is too old."
+    path = os.path.join(cache_dir, f'{key[:16]}.json')
+    try:
+        with open(path) as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if result.get("key") != key or time.time() - result.get("created", 0) > max_age_days * 86400:
+        return None
+    return result
+
+
+def calibrate(net, spec, bw, log_dir, parallel=DEFAULT_PARALLEL, tolerance=DEFAULT_TOLERANCE):
+    "Run the calibration pass on a started network; returns the result (not cached)."
+    links = spec_links(spec, bw)
+    tests = plan_tests(spec, links)
+    rounds = schedule(tests, parallel)
+    print(f"*** Calibrating {len(links)} links with {len(tests)} tests in {len(rounds)} rounds")
+    t0 = time.time()
+    for i, rnd in enumerate(rounds):
+        run_round(net, rnd, log_dir, i)
+    return {
+        "created": time.time(),
+        "seconds": round(time.time() - t0, 1),
+        "bw_Mbps": bw,
+        "tolerance_pct": tolerance,
+        "tests": [{k: t[k] for k in ("src", "dst", "links", "round", "rtt_ms", "Mbps")} for t in tests],
+        "links": link_estimates(links, tests, tolerance),
+    }
+
+
+def ensure_calibration(net, spec, bw, cache_dir=CACHE_DIR, force=False, parallel=DEFAULT_PARALLEL,
+                       tolerance=DEFAULT_TOLERANCE, **variant):
+    "Cached calibration of this topology / machine, or a fresh one (then cached)."
+    key, info = fingerprint(spec, bw, **variant)
+    result = None if force else load_cached(cache_dir, key)
+    if result is not None:
+        print(f"[INFO] Using cached calibration {key[:16]} from {time.ctime(result['created'])}")
+        # tolerance 可以每次不同，重新判断
+        for link in result["links"].values():
+            link["ok"] = _on_target(link, tolerance)
+        result["cached"] = True
+        return result
+    result = calibrate(net, spec, bw, os.path.join(cache_dir, key[:16]), parallel, tolerance)
+    result.update(key=key, cached=False, **info)
+    out_file = log_path(cache_dir, f'{key[:16]}.json')
+    with open(out_file, 'w') as f:
+        json.dump(result, f, indent=1)
+    print(f"[INFO] Saved calibration: {out_file}")
+    return result
+
+
+def off_target(result):
+    "Ids of the links that are off target."
+    return [link for link, r in result["links"].items() if not r["ok"]]
+
+
+def print_table(result):
+    print(f"\n{'link':<10} {'target':>8} {'Mbps':>8} {'dev %':>7} {'tgt RTT':>8} {'RTT ms':>8} {'tests':>5}  ok")
+    for link, r in result["links"].items():
+        print(f"{link:<10} {r['target_Mbps']:>8.1f} {r['Mbps']:>8.1f} {r['deviation_pct']:>7.1f} "
+              f"{r['target_rtt_ms']:>8.2f} {r['rtt_ms']:>8.3f} {r['tests']:>5}  {'yes' if r['ok'] else 'NO'}")
+
+
+def add_calibration_args(parser):
+    "--calibrate options of the experiment scripts."
+    parser.add_argument('--calibrate', action='store_true',
+                        help='measure every link before the run (cached per topology and machine, calibrate.py)')
+    parser.add_argument('--calib-tolerance', type=float, default=DEFAULT_TOLERANCE, metavar='PCT',
+                        help='a link more than PCT %% off its target rate / RTT is off target')
+    parser.add_argument('--calib-strict', action='store_true',
+                        help='refuse to run when a link is off target (default: flag it in the run metadata)')
+    parser.add_argument('--calib-cache', default=CACHE_DIR, help='calibration cache directory')
+    parser.add_argument('--recalibrate', action='store_true', help='ignore the cached calibration')
+    return parser
+
+
+def calibration_from_args(args, net, bw, delays=None, spec=None):
+    """
+    Calibration summary for the run metadata (None without --calibrate);
+    raises SystemExit with --calib-strict when a link is off target.
+    """
+    if not args.calibrate:
+        return None
+    from topology import apply_profile, default_spec, load_profile
+    spec = spec or default_spec(delays=delays)
+    profile = load_profile(args.profile)
+    spec = apply_profile(spec, profile if profile is not None else spec.get("profile"), bw)
+    result = ensure_calibration(net, spec, bw, args.calib_cache, args.recalibrate,
+                                tolerance=args.calib_tolerance, isolation=args.isolation)
+    bad = off_target(result)
+    if bad:
+        print_table(result)
+        msg = f"{len(bad)} link(s) more than {args.calib_tolerance}% off target: {', '.join(bad)}"
+        if args.calib_strict:
+            raise SystemExit(f"[ERROR] Calibration: {msg}, not running (drop --calib-strict to run anyway)")
+        print(f"[WARN] Calibration: {msg}; the run is flagged in its metadata")
+    return {
+        "key": result["key"][:16],
+        "created": result["created"],
+        "cached": result["cached"],
+        "tolerance_pct": args.calib_tolerance,
+        "off_target": bad,
+        "links_Mbps": {link: r["Mbps"] for link, r in result["links"].items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the capacity and base RTT of every link")
+    parser.add_argument('--bw', type=int, default=500)
+    parser.add_argument('--exp', type=int, choices=(1, 2, 3), default=1, help="topology variant (exp3: delays)")
+    parser.add_argument('--mn', default=None, help="calibrate a MiniEdit .mn topology instead")
+    parser.add_argument('--isolation', choices=('none', 'limit', 'pin'), default='none')
+    parser.add_argument('--profile', default=None, help="link profile: a topology.LINK_PROFILES preset or a JSON file")
+    parser.add_argument('--parallel', type=int, default=DEFAULT_PARALLEL, help="tests per round at most")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="off-target threshold (%%)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--force', action='store_true', help="recalibrate even if cached")
+    args = parser.parse_args(argv)
+
+    from mininet.log import setLogLevel
+    from planner import EXP_DELAYS
+    from topology import apply_profile, build_network, default_spec, load_profile
+    setLogLevel('info')
+
+    if args.mn:
+        from mn_loader import load_mn
+        spec = load_mn(args.mn)
+    else:
+        spec = default_spec(delays=EXP_DELAYS[args.exp])
+    profile = load_profile(args.profile)
+    if profile is None:
+        profile = spec.get("profile")
+    net = None
+    try:
+        # build_network() 自己 apply profile，传未处理的 spec，profile 只 apply 一次
+        net = build_network(args.bw, isolation=args.isolation, spec=spec, profile=profile)
+        result = ensure_calibration(net, apply_profile(spec, profile, args.bw), args.bw, args.cache_dir,
+                                    args.force, args.parallel, args.tolerance, isolation=args.isolation)
+    finally:
+        if net is not None:
+            net.stop()
+    print_table(result)
+    bad = off_target(result)
+    print(f"[INFO] {len(result['links']) - len(bad)}/{len(result['links'])} links within {args.tolerance}%"
+          + (f", off target: {', '.join(bad)}" if bad else ""))
+
+
+if __name__ == '__main__':
+    main()
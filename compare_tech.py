@@ -0,0 +1,222 @@
+"""
+Side-by-side comparison of the two technologies, project.mn and
+project_delay.mn.
+
+Each .mn file is built with mn_loader + topology.build_network (every
+link at --bw, the file's own link options such as the 20 ms delays on
+top) and gets the same traffic suite: the phases of experiment --exp
+(TCP, UDP, ping-only).  This repeats --repeats times.  The order
+alternates (A B, B A, ...) so that slow drift on the machine hits both
+sides equally.  Repeat i of A and repeat i of B form a pair.  For every
+metric the table shows:
+- mean of each side and the paired difference B - A (and in % of A)
+- 95% confidence interval of the difference (Student t)
+- p-value of a paired sign-flip permutation test (exact up to 16 pairs);
+  the smallest possible p is 2 / 2^n, so p < 0.05 needs at least 6 pairs
+
+    sudo python3 compare_tech.py --bw 10 --repeats 6
+    python3 compare_tech.py --analyze-only --log-dir compare_tech
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import statistics
+
+from adaptive import ci_halfwidth
+from analyze_logs import parse_iperf_throughput, parse_iperf_udp_metrics, parse_ping_stats
+from exp_common import PHASES, log_path
+from mn_loader import load_mn
+
+# (key, label, unit) in table order
+METRICS = (
+    ("tcp_Mbps", "TCP throughput", "Mbit/s"),
+    ("udp_Mbps", "UDP throughput", "Mbit/s"),
+    ("udp_loss_pct", "UDP loss", "%"),
+    ("udp_jitter_ms", "UDP jitter", "ms"),
+    ("tcp_rtt_p50_ms", "RTT p50 under TCP", "ms"),
+    ("tcp_rtt_p99_ms", "RTT p99 under TCP", "ms"),
+    ("icmp_rtt_p50_ms", "RTT p50 idle", "ms"),
+    ("icmp_rtt_p99_ms", "RTT p99 idle", "ms"),
+    ("icmp_loss_pct", "ping loss idle", "%"),
+)
+
+ALPHA = 0.05
+# 超过这么多 pair 就不穷举了，改成随机 sign flip
+EXACT_MAX_PAIRS = 16
+PERMUTATIONS = 20000
+
+
+def run_metrics(log_dir, exp=1):
+    "Metrics of one run of the suite from its logs."
+    udp, jitter, loss = parse_iperf_udp_metrics(os.path.join(log_dir, f'exp{exp}_udp_h1_h20.log'))
+    tcp_ping = parse_ping_stats(os.path.join(log_dir, f'exp{exp}_ping_during_tcp_h1_h20.log'))
+    icmp = parse_ping_stats(os.path.join(log_dir, f'exp{exp}_ping_h1_h20.log'))
+    return {
+        "tcp_Mbps": parse_iperf_throughput(os.path.join(log_dir, f'exp{exp}_tcp_h1_h20.log')),
+        "udp_Mbps": udp,
+        "udp_loss_pct": loss,
+        "udp_jitter_ms": jitter,
+        "tcp_rtt_p50_ms": tcp_ping["rtt_p50_ms"],
+        "tcp_rtt_p99_ms": tcp_ping["rtt_p99_ms"],
+        "icmp_rtt_p50_ms": icmp["rtt_p50_ms"],
+        "icmp_rtt_p99_ms": icmp["rtt_p99_ms"],
+        "icmp_loss_pct": icmp["loss_pct"],
+    }
+
+
+def sign_flip_pvalue(diffs, permutations=PERMUTATIONS, seed=0):
+    """
+    Two-sided p-value of a paired permutation test: under H0 (no
+    difference) every pair difference is equally likely +d or -d.
+    """
+    n = len(diffs)
+    if n == 0:
+        return math.nan
+    observed = abs(sum(diffs))
+    if n <= EXACT_MAX_PAIRS:
+        signs = itertools.product((1, -1), repeat=n)
+        total = 2 ** n
+    else:
+        rng = random.Random(seed)
+        signs = ([rng.choice((1, -1)) for _ in range(n)] for _ in range(permutations))
+        total = permutations
+    # 浮点误差：和 observed 相等的也要算进去
+    hits = sum(1 for s in signs if abs(sum(x * d for x, d in zip(s, diffs))) >= observed - 1e-12)
+    return hits / total
+
+
+def paired_stats(a, b):
+    "Paired difference b - a over the pairs where both sides have a value."
+    pairs = [(x, y) for x, y in zip(a, b) if not (math.isnan(x) or math.isnan(y))]
+    if not pairs:
+        return {"pairs": 0, "mean_a": math.nan, "mean_b": math.nan, "diff": math.nan,
+                "diff_pct": math.nan, "ci95": math.nan, "p_value": math.nan, "significant": False}
+    diffs = [y - x for x, y in pairs]
+    mean_a = statistics.fmean(x for x, _ in pairs)
+    mean_d = statistics.fmean(diffs)
+    p = sign_flip_pvalue(diffs)
+    return {
+        "pairs": len(pairs),
+        "mean_a": mean_a,
+        "mean_b": statistics.fmean(y for _, y in pairs),
+        "diff": mean_d,
+        "diff_pct": 100.0 * mean_d / mean_a if mean_a else math.nan,
+        "ci95": ci_halfwidth(diffs),
+        "p_value": p,
+        "significant": p < ALPHA,
+    }
+
+
+def compare(runs, a, b):
+    "{metric: paired_stats} for the runs of technologies a and b (paired by repeat)."
+    by_tech = {t: sorted((r for r in runs if r["tech"] == t), key=lambda r: r["repeat"]) for t in (a, b)}
+    repeats = sorted({r["repeat"] for r in by_tech[a]} & {r["repeat"] for r in by_tech[b]})
+    side = {t: {r["repeat"]: r for r in by_tech[t]} for t in (a, b)}
+    return {key: paired_stats([side[a][i][key] for i in repeats], [side[b][i][key] for i in repeats])
+            for key, _label, _unit in METRICS}
+
+
+def print_table(diff, a, b):
+    print(f"\n{'metric':<20} {'unit':<7} {a:>14} {b:>14} {'diff':>10} {'diff %':>8} {'± CI95':>9} "
+          f"{'p':>7}  n")
+    for key, label, unit in METRICS:
+        d = diff[key]
+        mark = ' *' if d["significant"] else ''
+        print(f"{label:<20} {unit:<7} {d['mean_a']:>14.3f} {d['mean_b']:>14.3f} {d['diff']:>+10.3f} "
+              f"{d['diff_pct']:>+8.1f} {d['ci95']:>9.3f} {d['p_value']:>7.3f}{mark} {d['pairs']}")
+    print(f"(diff = {b} - {a}, paired by repeat; * = p < {ALPHA})")
+
+
+def plot_diff(diff, a, b, filename):
+    "Bar per metric: relative difference with its CI, significant ones filled."
+    import matplotlib.pyplot as plt
+    labels, values, errs, colors = [], [], [], []
+    for key, label, _unit in METRICS:
+        d = diff[key]
+        if math.isnan(d["diff_pct"]):
+            continue
+        labels.append(label)
+        values.append(d["diff_pct"])
+        errs.append(100.0 * d["ci95"] / abs(d["mean_a"]) if math.isfinite(d["ci95"]) else 0.0)
+        colors.append('tab:red' if d["significant"] else 'lightgray')
+    plt.figure(figsize=(9, 4.5))
+    plt.barh(labels, values, xerr=errs, color=colors, edgecolor='black', capsize=3)
+    plt.axvline(0, color='black', linewidth=0.8)
+    plt.gca().invert_yaxis()
+    plt.xlabel(f"{b} vs {a} (% of {a}, 95% CI; red = p < {ALPHA})")
+    plt.title("Technology comparison (paired repeats)")
+    plt.grid(True, axis='x', linestyle='--', alpha=0.4)
+    plt.tight_layout()
+    plt.savefig(filename)
+    print(f"[INFO] Saved figure: {filename}")
+
+
+def run_suite(mn_file, bw, exp, run_dir, controller, duration):
+    "Build the topology of mn_file and run the phases of experiment exp on it."
+    from tcp_matrix import load_experiment
+    from topology import build_network
+    _create, run_experiment = load_experiment(exp, bw)
+    net = None
+    try:
+        net = build_network(bw, controller=controller, spec=load_mn(mn_file))
+        run_experiment(net, duration=duration, log_dir=run_dir, phases=PHASES)
+    finally:
+        if net is not None:
+            net.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paired comparison of project.mn vs project_delay.mn")
+    parser.add_argument('--mn', nargs=2, default=['project.mn', 'project_delay.mn'], metavar=('A', 'B'))
+    parser.add_argument('--bw', type=int, choices=(10, 500), default=10)
+    parser.add_argument('--exp', type=int, choices=(1, 2), default=1,
+                        help="traffic suite: 1 = main flow only, 2 = with background flows")
+    parser.add_argument('--repeats', type=int, default=6)
+    parser.add_argument('--duration', type=int, default=10)
+    parser.add_argument('--controller', choices=('standalone', 'file'), default='standalone',
+                        help="'file' = the controllers of the .mn files")
+    parser.add_argument('--log-dir', default='compare_tech')
+    parser.add_argument('--analyze-only', action='store_true', help="only re-analyze existing runs")
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args(argv)
+
+    techs = [os.path.splitext(os.path.basename(p))[0] for p in args.mn]
+    a, b = techs
+    base = os.path.join(args.log_dir, f'exp{args.exp}_B{args.bw}M')
+
+    if not args.analyze_only:
+        from mininet.log import setLogLevel
+        setLogLevel('info')
+        for i in range(args.repeats):
+            order = list(zip(args.mn, techs))
+            if i % 2:
+                order.reverse()
+            for mn_file, tech in order:
+                print(f"\n=== {tech}: exp{args.exp} suite at {args.bw} Mbit/s, run {i + 1}/{args.repeats} ===")
+                run_suite(mn_file, args.bw, args.exp, os.path.join(base, f'{tech}_{i + 1}'),
+                          args.controller, args.duration)
+
+    runs = []
+    for tech in techs:
+        for i in range(args.repeats):
+            run_dir = os.path.join(base, f'{tech}_{i + 1}')
+            if os.path.isdir(run_dir):
+                runs.append(dict(tech=tech, repeat=i + 1, **run_metrics(run_dir, args.exp)))
+
+    diff = compare(runs, a, b)
+    print_table(diff, a, b)
+    if not args.no_plot:
+        plot_diff(diff, a, b, log_path(args.log_dir, f'compare_tech_exp{args.exp}_B{args.bw}M.png'))
+
+    out_file = log_path(args.log_dir, f'compare_tech_exp{args.exp}_B{args.bw}M.json')
+    with open(out_file, 'w') as f:
+        json.dump({"a": a, "b": b, "exp": args.exp, "bw_Mbps": args.bw, "controller": args.controller,
+                   "runs": runs, "diff": diff}, f, indent=2)
+    print(f"[INFO] Saved comparison: {out_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""
+Helpers shared by the project_topo_exp*.py scripts.
+
+The experiment scripts are still meant to be run on their own
+("sudo python3 project_topo_exp1_B10M.py"); this module only holds the
+bits that every script builds in the same way (log paths, iperf commands).
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+
+# Phases of one experiment, in the order the scripts run them.
+PHASES = ('tcp', 'udp', 'icmp')
+
+# Congestion-control algorithms the TCP matrix tries by default.
+DEFAULT_CC = ('cubic', 'reno', 'bbr')
+
+
+def log_path(log_dir, name):
+    "Absolute path of a log file (host shells do not share our cwd handling)."
+    os.makedirs(log_dir, exist_ok=True)
+    return os.path.join(os.path.abspath(log_dir), name)
+
+
+def tcp_client_cmd(server_ip, duration=10, cc=None, streams=1, interval=1, window=None, length=None):
+    """
+    Build the iperf TCP client command used by the TCP phase.
+    - cc: congestion-control algorithm (iperf -Z), None = kernel default
+    - streams: number of parallel streams (iperf -P)
+    - interval: report period in s (iperf -i), used by steady_state.py
+    - window: socket buffer / TCP window per stream (iperf -w), None = autotuning
+    - length: read/write buffer length (iperf -l), None = iperf default
+    """
+    cmd = f'iperf -c {server_ip} -t {duration}'
+    if interval:
+        cmd += f' -i {interval}'
+    if cc:
+        cmd += f' -Z {cc}'
+    if streams and streams > 1:
+        cmd += f' -P {streams}'
+    if window:
+        cmd += f' -w {window}'
+    if length:
+        cmd += f' -l {length}'
+    return cmd
+
+
+def tcp_server_cmd(window=None):
+    "iperf TCP server of the TCP phase (the receive window is set on the server side)."
+    return f'iperf -s -w {window}' if window else 'iperf -s'
+
+
+def resolve_duration(value, exp, log_dir='.', default=10, minimum=3):
+    """
+    TCP phase length in seconds. value is a number or 'auto'; 'auto' uses
+    the stable duration steady_state.py found for exp in a previous run.
+    """
+    if value != 'auto':
+        return int(value)
+    path = os.path.join(log_dir, 'steady_state.json')
+    try:
+        with open(path) as f:
+            rec = json.load(f)[exp]['recommended_duration_s']
+    except (OSError, KeyError, ValueError):
+        print(f"[WARN] No steady-state recommendation for {exp} in {path}, using {default} s")
+        return default
+    return max(int(rec), minimum)
+
+
+def probe_count(duration, adaptive=None, interval=0.2):
+    "ping -c for a probe that has to cover a test of `duration` s (or the adaptive maximum)."
+    if adaptive is not None:
+        duration = adaptive.max_s
+    return int(duration / interval)
+
+
+# Concurrent-probe modes: ping interval in s, None = flood (ping -f).
+# Intervals below 0.2 s need root, which the Mininet hosts have.
+PROBE_MODES = {'default': 0.2, 'fast': 0.001, 'flood': None}
+
+
+def probe_cmd(server_ip, duration, adaptive=None, mode='default', size=None):
+    """
+    ping command of the probe that runs next to a test (without the
+    redirect).  'default' / 'fast' print one timestamped line per reply;
+    'flood' only prints the summary, bounded by a -w deadline.
+    size: ICMP payload in bytes (ping -s), None = ping's 56.
+    """
+    interval = PROBE_MODES[mode]
+    opts = f'-s {size} ' if size else ''
+    if interval is None:
+        deadline = adaptive.max_s if adaptive is not None else duration
+        return f'ping -f {opts}-w {deadline} {server_ip}'
+    return f'ping -D -i {interval} {opts}-c {probe_count(duration, adaptive, interval)} {server_ip}'
+
+
+def available_cc(host):
+    "Congestion-control algorithms the kernel of `host` can use."
+    # bbr is a module on most kernels, load it if it is there
+    host.cmd('modprobe tcp_bbr 2>/dev/null')
+    out = host.cmd('sysctl -n net.ipv4.tcp_available_congestion_control')
+    return out.split()
+
+
+def add_run_args(parser):
+    "Command-line options shared by all project_topo_exp*.py scripts."
+    parser.add_argument('--cc', default=None,
+                        help='TCP congestion control for the TCP phase (default: kernel default)')
+    parser.add_argument('--streams', type=int, default=1,
+                        help='number of parallel TCP streams (iperf -P)')
+    parser.add_argument('--window', default=None,
+                        help="iperf -w for the TCP phase, e.g. 2M, or 'auto' for the BDP from planner.py")
+    parser.add_argument('--tcp-duration', default='10',
+                        help="TCP phase length in s, or 'auto' to use steady_state.json")
+    parser.add_argument('--adaptive', type=float, default=None, metavar='REL_CI',
+                        help='stop each test once the 95%% CI half-width / mean is below REL_CI (e.g. 0.05)')
+    parser.add_argument('--min-duration', type=int, default=3,
+                        help='minimum test length in adaptive mode (s)')
+    parser.add_argument('--max-duration', type=int, default=20,
+                        help='maximum test length in adaptive mode (s)')
+    parser.add_argument('--live', action='store_true',
+                        help='print rolling RTT/loss/throughput while tests run and abort unhealthy tests')
+    parser.add_argument('--max-loss', type=float, default=50.0,
+                        help='live mode: abort a test when the rolling ping loss exceeds this (%%)')
+    parser.add_argument('--stall', type=float, default=5.0,
+                        help='live mode: abort a test when no sample arrived for this many seconds')
+    parser.add_argument('--probe', choices=sorted(PROBE_MODES), default='default',
+                        help='concurrent ping probe rate: default 0.2 s, fast 1 ms, flood (ping -f)')
+    parser.add_argument('--hop-probes', action='store_true',
+                        help='also ping a quiet host on every switch of the h1 -> h20 path (hops.py)')
+    parser.add_argument('--isolation', choices=('none', 'limit', 'pin'), default='none',
+                        help='CPU isolation of the hosts: cgroup CPU caps, or cores pinned for iperf hosts and OVS')
+    parser.add_argument('--profile', default=None, metavar='NAME|FILE',
+                        help='link profile: a topology.LINK_PROFILES preset (e.g. fast-core) or a JSON file')
+    parser.add_argument('--log-dir', default='.',
+                        help='directory the .log files are written to')
+    parser.add_argument('--archive', default=None, metavar='ROOT',
+                        help='write logs to a new run directory under ROOT and compress them afterwards')
+    parser.add_argument('--codec', choices=('gzip', 'zstd'), default='gzip',
+                        help='compression of archived logs')
+    parser.add_argument('--no-cli', action='store_true',
+                        help='do not open the Mininet CLI after the run')
+    parser.add_argument('--phases', nargs='+', choices=PHASES, default=list(PHASES),
+                        help='which phases to run')
+    return parser
+
+
+class EventLog(object):
+    """
+    Flow start/stop events of one experiment run, one JSON object per line:
+        {"t": <unix time>, "event": "start"|"stop", "flow": "h4->h3", "kind": "background", ...}
+    Times come from time.time(), the same clock `ping -D` prints, so the
+    analyzer can put both on one time axis (see timeline.py).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.active = {}
+        open(self.path, 'w').close()
+
+    def _write(self, record):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def start(self, flow, kind='main', **info):
+        record = dict(t=time.time(), event='start', flow=flow, kind=kind, **info)
+        self.active[flow] = record
+        self._write(record)
+
+    def stop(self, flow):
+        started = self.active.pop(flow, None)
+        if started is None:
+            return
+        record = dict(started, t=time.time(), event='stop')
+        self._write(record)
+
+    def stop_all(self):
+        for flow in list(self.active):
+            self.stop(flow)
+
+
+def event_log(log_dir, exp):
+    "EventLog for exp (e.g. 'exp2') written next to the other logs."
+    return EventLog(log_path(log_dir, f'{exp}_events.log'))
+
+
+def _tool_version(cmd):
+    "First line of `cmd` (e.g. 'ovs-vsctl --version'), or None if it is not installed."
+    try:
+        out = subprocess.run(cmd.split(), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                             universal_newlines=True, timeout=5).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    lines = out.strip().splitlines()
+    return lines[0] if lines else None
+
+
+def host_info():
+    "Machine the experiments run on: hostname, kernel, OVS / iperf versions."
+    return dict(
+        hostname=platform.node(),
+        kernel=platform.release(),
+        ovs_version=_tool_version('ovs-vsctl --version'),
+        iperf_version=_tool_version('iperf -v'))
+
+
+def write_run_meta(log_dir, exp, bw_Mbps, started, finished, **info):
+    """
+    Save expN_run_meta.json next to the logs: bandwidth, kernel, OVS / iperf
+    versions and durations, used by report.py.
+    """
+    meta = dict(
+        exp=exp,
+        bw_Mbps=bw_Mbps,
+        started=started,
+        finished=finished,
+        duration_s=round(finished - started, 3),
+        **host_info(),
+        **info)
+    path = log_path(log_dir, f'{exp}_run_meta.json')
+    with open(path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    return path
@@ -0,0 +1,221 @@
+"""
+How the bandwidth was shared: every flow of a phase, main and background.
+
+The experiment scripts keep the output of every iperf client: the main
+h1 -> h20 flow (exp<N>_<phase>_h1_h20.log) and, in exp2, the background
+flows (exp2_<phase>_bg_h4_h3.log, or one log per replayed flow with
+--bg-model, see background.py), all with per-interval reports.  Flows of
+the same host pair are added up.  Each flow's interval report is placed
+on one time axis with the start times from the event log, and for every
+phase this computes:
+- per-flow throughput over time (bins of --bin s) and while the main
+  flow ran (UDP: client intervals scaled by the server-side delivery ratio)
+- the bottleneck: the link of the main flow's path that carries the most
+  traffic, and the flows that share it (paths from topology.py)
+- Jain's fairness index over the flows on the bottleneck and over all
+  flows, and the main flow's share of the bottleneck (of the traffic on it
+  and of its capacity)
+
+    python3 fairness.py --log-dir . --exp exp2
+"""
+import argparse
+import json
+import math
+import os
+import re
+
+from analyze_logs import jain_index, load_run_meta, parse_iperf_intervals, parse_iperf_summary
+from archive import resolve_log
+from timeline import parse_events
+from topology import shortest_path
+
+FAIRNESS_FILE = "fairness.json"
+
+FLOW_PHASES = ('tcp', 'udp', 'icmp')
+
+_BG_LOG_RE = re.compile(r'^(exp\d+)_(tcp|udp|icmp)_bg_(?:(\d+)_)?(h\d+)_(h\d+)\.log(?:\.gz|\.zst)?$')
+
+
+def flow_logs(log_dir, exp, phase):
+    """
+    [(pair label, log path, event flow name), ...] of one phase: the main
+    flow first, then the background flows.
+    """
+    logs = []
+    if phase != 'icmp':
+        logs.append(('h1->h20', os.path.join(log_dir, f'{exp}_{phase}_h1_h20.log'), 'h1->h20'))
+    for name in sorted(os.listdir(log_dir)):
+        m = _BG_LOG_RE.match(name)
+        if not m or m.group(1) != exp or m.group(2) != phase:
+            continue
+        idx, src, dst = m.group(3), m.group(4), m.group(5)
+        label = f'{src}->{dst}'
+        base = name[:name.index('.log') + 4]
+        logs.append((label, os.path.join(log_dir, base), f'{label}#{int(idx)}' if idx else label))
+    return logs
+
+
+def _start_times(log_dir, exp, phase):
+    "{event flow name: start time} of the flows of one phase."
+    path = os.path.join(log_dir, f'{exp}_events.log')
+    if resolve_log(path) is None:
+        return {}
+    starts = {}
+    for ev in parse_events(path):
+        if ev['event'] == 'start' and ev.get('phase') == phase:
+            starts.setdefault(ev['flow'], ev['t'])
+    return starts
+
+
+def flow_intervals(path):
+    "[(start, end, Mbps), ...] of one client log, UDP scaled to what the server received."
+    summary = parse_iperf_summary(path)
+    rows = [r for r in parse_iperf_intervals(path)
+            if r not in (summary["sent"], summary["received"])] or [summary["received"]]
+    rows = [r for r in rows if r is not None]
+    sent, received = summary["sent"], summary["received"]
+    ratio = received[2] / sent[2] if sent and received and sent[2] else 1.0
+    return [(start, end, mbps * ratio) for start, end, mbps in rows]
+
+
+def _bin(series, start, end, mbps, bin_s):
+    "Add a constant rate over [start, end) to the bins of series (dict bin -> Mbit)."
+    b = int(math.floor(start / bin_s))
+    while b * bin_s < end:
+        overlap = min(end, (b + 1) * bin_s) - max(start, b * bin_s)
+        if overlap > 0:
+            series[b] = series.get(b, 0.0) + mbps * overlap
+        b += 1
+
+
+def phase_series(log_dir, exp, phase, bin_s=1.0):
+    """
+    Per-pair throughput over time: ({"t": [...], "flows": {pair: [Mbps]}}, main window).
+    Time 0 is the start of the main flow (or of the first flow).
+    """
+    logs = flow_logs(log_dir, exp, phase)
+    starts = _start_times(log_dir, exp, phase)
+    t0 = starts.get('h1->h20', min(starts.values(), default=0.0))
+    bins, window = {}, None
+    for label, path, flow in logs:
+        if resolve_log(path) is None:
+            continue
+        offset = starts.get(flow, t0) - t0
+        rows = flow_intervals(path)
+        for start, end, mbps in rows:
+            _bin(bins.setdefault(label, {}), offset + start, offset + end, mbps, bin_s)
+        if label == 'h1->h20' and rows:
+            window = (offset, offset + max(end for _, end, _ in rows))
+    if not bins:
+        return {"t": [], "flows": {}}, window
+    first = min(min(b) for b in bins.values())
+    last = max(max(b) for b in bins.values())
+    t = [b * bin_s for b in range(first, last + 1)]
+    flows = {label: [b.get(i, 0.0) / bin_s for i in range(first, last + 1)] for label, b in bins.items()}
+    return {"t": t, "flows": flows}, window
+
+
+def _links(path):
+    return list(zip(path, path[1:]))
+
+
+def bottleneck(rates, main='h1->h20'):
+    "(link, [pairs on it]) of the main path's link with the most traffic."
+    paths = {label: _links(shortest_path(*label.split('->'))) for label in rates}
+    best = None
+    for link in paths.get(main, []):
+        on_link = [label for label, links in paths.items() if link in links]
+        load = sum(rates[label] for label in on_link if not math.isnan(rates[label]))
+        if best is None or (load, len(on_link)) > (best[2], len(best[1])):
+            best = (link, on_link, load)
+    return (best[0], best[1]) if best else (None, list(rates))
+
+
+def phase_fairness(log_dir, exp, phase, bw=None, bin_s=1.0):
+    "Fairness numbers of one phase, None if it has no flow logs."
+    series, window = phase_series(log_dir, exp, phase, bin_s)
+    if not series["flows"]:
+        return None
+    t = series["t"]
+    if window:
+        sel = [i for i, x in enumerate(t) if window[0] - bin_s / 2 <= x < window[1]]
+    else:
+        sel = list(range(len(t)))
+    rates = {label: (sum(v[i] for i in sel) / len(sel) if sel else math.nan)
+             for label, v in series["flows"].items()}
+
+    link, sharing = bottleneck(rates)
+    main = rates.get('h1->h20', math.nan)
+    on_link = sum(rates[label] for label in sharing)
+    jain_t = [jain_index([series["flows"][label][i] for label in sharing
+                          if series["flows"][label][i] > 0]) for i in range(len(t))]
+    return {
+        "exp": exp,
+        "phase": phase,
+        "flows_Mbps": rates,
+        "bottleneck": '->'.join(link) if link else None,
+        "sharing": sharing,
+        "jain_bottleneck": jain_index([rates[label] for label in sharing]),
+        "jain_all": jain_index(list(rates.values())),
+        "main_share": main / on_link if on_link else math.nan,
+        "main_link_share": main / bw if bw else math.nan,
+        "jain_over_time": jain_t,
+        "series": series,
+    }
+
+
+def plot_series(result, filename):
+    import matplotlib.pyplot as plt
+    series = result["series"]
+    labels = list(series["flows"])
+    plt.figure(figsize=(10, 4))
+    plt.stackplot(series["t"], [series["flows"][label] for label in labels], labels=labels, alpha=0.8)
+    plt.xlabel("Time since main flow start (s)")
+    plt.ylabel("Throughput (Mbps)")
+    plt.title(f"Per-flow throughput ({result['exp']}, {result['phase']}), "
+              f"Jain {result['jain_bottleneck']:.3f} on {result['bottleneck']}")
+    plt.legend(loc='upper right', fontsize='small')
+    plt.grid(True, linestyle='--', alpha=0.4)
+    plt.tight_layout()
+    plt.savefig(filename)
+    print(f"[INFO] Saved figure: {filename}")
+
+
+def print_table(rows):
+    print(f"\n{'exp':<5} {'phase':<5} {'flows':>5} {'bottleneck':<10} {'main Mbps':>9} {'share':>6} "
+          f"{'of link':>7} {'Jain(bn)':>8} {'Jain(all)':>9}")
+    for r in rows:
+        print(f"{r['exp']:<5} {r['phase']:<5} {len(r['flows_Mbps']):>5} {r['bottleneck'] or '-':<10} "
+              f"{r['flows_Mbps'].get('h1->h20', math.nan):>9.2f} {r['main_share']:>6.2f} "
+              f"{r['main_link_share']:>7.2f} {r['jain_bottleneck']:>8.3f} {r['jain_all']:>9.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-flow throughput, Jain index and main-flow share")
+    parser.add_argument('--log-dir', default='.')
+    parser.add_argument('--exp', nargs='+', default=['exp1', 'exp2', 'exp3'])
+    parser.add_argument('--phase', nargs='+', choices=FLOW_PHASES, default=list(FLOW_PHASES))
+    parser.add_argument('--bin', type=float, default=1.0, help="time bin of the over-time view (s)")
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args(argv)
+
+    meta = load_run_meta(args.log_dir)
+    rows = []
+    for exp in args.exp:
+        for phase in args.phase:
+            r = phase_fairness(args.log_dir, exp, phase, meta.get(exp, {}).get("bw_Mbps"), args.bin)
+            if r is None:
+                continue
+            rows.append(r)
+            if not args.no_plot and r["series"]["t"]:
+                plot_series(r, os.path.join(args.log_dir, f"{exp}_fairness_{phase}.png"))
+
+    print_table(rows)
+    out_file = os.path.join(args.log_dir, FAIRNESS_FILE)
+    with open(out_file, 'w') as f:
+        json.dump(rows, f, indent=1)
+    print(f"[INFO] Saved fairness report: {out_file}")
+
+
+if __name__ == '__main__':
+    main()
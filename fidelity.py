@@ -0,0 +1,122 @@
+"""
+Emulation fidelity with and without CPU isolation.
+
+Runs the TCP and UDP phases of one experiment several times for every
+isolation mode (none / limit / pin, see topology.py) and compares the
+achieved rate with the configured link rate: fidelity = achieved / bw.
+A faithful setup gets close to 1.0 with little spread between repeats;
+without isolation the spread grows as soon as something else competes
+for the CPU, which --stress N simulates with N busy processes outside
+the hosts.
+
+    sudo python3 fidelity.py --exp 2 --bw 500 --repeats 3 --stress 2
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+
+from analyze_logs import parse_iperf_throughput, parse_iperf_udp_metrics
+from exp_common import log_path
+from topology import ISOLATION_MODES
+
+
+def start_stress(n):
+    "n busy-looping processes in the root namespace (competing load)."
+    return [subprocess.Popen([sys.executable, '-c', 'while True: pass']) for _ in range(n)]
+
+
+def stop_stress(procs):
+    for p in procs:
+        p.terminate()
+    for p in procs:
+        p.wait()
+
+
+def run_once(exp, bw, isolation, log_dir):
+    "TCP + UDP phases of exp on a fresh network; returns (tcp Mbps, udp Mbps, udp loss %)."
+    from tcp_matrix import load_experiment
+    create_network, run_experiment = load_experiment(exp, bw)
+    net = None
+    try:
+        net = create_network(isolation)
+        run_experiment(net, log_dir=log_dir, phases=('tcp', 'udp'))
+    finally:
+        if net is not None:
+            net.stop()
+    tcp = parse_iperf_throughput(os.path.join(log_dir, f'exp{exp}_tcp_h1_h20.log'))
+    udp, _jitter, loss = parse_iperf_udp_metrics(os.path.join(log_dir, f'exp{exp}_udp_h1_h20.log'))
+    return tcp, udp, loss
+
+
+def _spread(values):
+    "(mean, std, cv) of the non-nan values."
+    xs = [v for v in values if not math.isnan(v)]
+    if not xs:
+        return math.nan, math.nan, math.nan
+    mean = statistics.fmean(xs)
+    std = statistics.stdev(xs) if len(xs) > 1 else 0.0
+    return mean, std, (std / mean if mean else math.nan)
+
+
+def summarize(rows, bw):
+    "Per isolation mode: mean / std / CV of the fidelity ratios and the mean UDP loss."
+    summary = {}
+    for mode in dict.fromkeys(r["isolation"] for r in rows):
+        sel = [r for r in rows if r["isolation"] == mode]
+        entry = {"runs": len(sel)}
+        for proto in ("tcp", "udp"):
+            mean, std, cv = _spread([r[f"{proto}_Mbps"] / bw for r in sel])
+            entry.update({f"{proto}_fidelity": mean, f"{proto}_fidelity_std": std, f"{proto}_cv": cv})
+        entry["udp_loss_pct"] = _spread([r["udp_loss_pct"] for r in sel])[0]
+        summary[mode] = entry
+    return summary
+
+
+def print_table(summary):
+    print(f"\n{'isolation':<10} {'runs':>4} {'TCP fid':>8} {'TCP cv':>7} {'UDP fid':>8} {'UDP cv':>7} {'UDP loss %':>10}")
+    for mode, s in summary.items():
+        print(f"{mode:<10} {s['runs']:>4} {s['tcp_fidelity']:>8.3f} {s['tcp_cv']:>7.3f} "
+              f"{s['udp_fidelity']:>8.3f} {s['udp_cv']:>7.3f} {s['udp_loss_pct']:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Achieved vs configured rate with and without CPU isolation")
+    parser.add_argument('--exp', type=int, choices=(1, 2, 3), default=2)
+    parser.add_argument('--bw', type=int, choices=(10, 500), default=500)
+    parser.add_argument('--isolation', nargs='+', choices=ISOLATION_MODES, default=list(ISOLATION_MODES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--stress', type=int, default=0, help="busy processes competing for the CPU")
+    parser.add_argument('--log-dir', default='fidelity')
+    args = parser.parse_args(argv)
+
+    from mininet.log import setLogLevel
+    setLogLevel('info')
+
+    rows = []
+    stress = start_stress(args.stress)
+    try:
+        for mode in args.isolation:
+            for i in range(args.repeats):
+                print(f"\n=== Fidelity: exp{args.exp} at {args.bw} Mbit/s, isolation={mode}, run {i + 1} ===")
+                run_dir = os.path.join(args.log_dir, f'exp{args.exp}_B{args.bw}M', f'{mode}_{i + 1}')
+                tcp, udp, loss = run_once(args.exp, args.bw, mode, run_dir)
+                rows.append({"isolation": mode, "repeat": i + 1, "tcp_Mbps": tcp,
+                             "udp_Mbps": udp, "udp_loss_pct": loss})
+    finally:
+        stop_stress(stress)
+
+    summary = summarize(rows, args.bw)
+    print_table(summary)
+    out_file = log_path(args.log_dir, f'fidelity_exp{args.exp}_B{args.bw}M.json')
+    with open(out_file, 'w') as f:
+        json.dump({"exp": args.exp, "bw_Mbps": args.bw, "stress": args.stress, "cpus": os.cpu_count(),
+                   "runs": rows, "summary": summary}, f, indent=2)
+    print(f"[INFO] Saved fidelity report: {out_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Per-hop latency / loss decomposition of the measured path.
+
+The path h1 -> h20 comes from the topology graph (h1-s1-s2-s3-s5-h20).
+With --hop-probes the experiment scripts ping, next to the main flow, one
+quiet host (not an iperf endpoint) on every switch of that path:
+
+    s1: h2    s2: h7    s3: h9    s5: h17
+
+The RTT to the host on switch k covers everything up to switch k, so the
+difference between consecutive targets is the delay added by that hop;
+the last segment (s5 -> h20) comes from the usual h1 -> h20 probe.  Loss
+is split the same way: hop loss = 1 - (1 - L_k) / (1 - L_k-1).  Binned
+over time (ping -D timestamps) this shows where congestion builds.  The
+targets are measured by separate pings, so a quiet hop can come out
+slightly negative.
+
+    python3 hops.py --exp exp2 --phase tcp --log-dir .
+"""
+import argparse
+import json
+import math
+import os
+
+from analyze_logs import parse_ping_stats
+from exp_common import log_path, probe_cmd
+from timeline import parse_ping_timestamps
+from topology import ACTIVE_HOSTS, HOST_SWITCH, shortest_path
+
+HOP_PHASES = ('tcp', 'udp')
+
+# main h1 -> h20 probe of each phase (same names as the experiment scripts)
+MAIN_PROBE = {"tcp": "ping_during_tcp_h1_h20.log", "udp": "ping_during_udp_h1_h20.log"}
+
+
+def hop_targets(src='h1', dst='h20', redundant='none'):
+    "[(switch, quiet host), ...] for every switch on the src -> dst path."
+    targets = []
+    for node in shortest_path(src, dst, redundant)[1:-1]:
+        quiet = [h for h, sw in HOST_SWITCH.items()
+                 if sw == node and h not in ACTIVE_HOSTS and h not in (src, dst)]
+        if quiet:
+            targets.append((node, quiet[0]))
+    return targets
+
+
+def hop_log_name(exp, phase, switch, host):
+    return f'{exp}_hop_{phase}_{switch}_{host}.log'
+
+
+def start_hop_probes(net, exp, phase, log_dir, duration, adaptive, probe, procs):
+    """
+    Start one background ping from h1 per path switch, tracked by procs
+    (procs.Procs), so they are stopped by PID with the rest of the phase.
+    """
+    h1 = net.get('h1')
+    for switch, host in hop_targets():
+        log = log_path(log_dir, hop_log_name(exp, phase, switch, host))
+        cmd = f'{probe_cmd(net.get(host).IP(), duration, adaptive, probe)} > {log}'
+        procs.start(h1, cmd, name=f'ping h1->{host}')
+
+
+def _cumulative_logs(exp, phase, log_dir):
+    "[(label, log path), ...] from the first switch to the destination."
+    logs = [(switch, os.path.join(log_dir, hop_log_name(exp, phase, switch, host)))
+            for switch, host in hop_targets()]
+    logs.append(("h20", os.path.join(log_dir, f"{exp}_{MAIN_PROBE[phase]}")))
+    return logs
+
+
+def _hop_loss(loss_k, loss_prev):
+    if math.isnan(loss_k) or math.isnan(loss_prev) or loss_prev >= 100:
+        return math.nan
+    return 100.0 * (1 - (1 - loss_k / 100) / (1 - loss_prev / 100))
+
+
+def hop_breakdown(exp, phase, log_dir='.'):
+    "Per-segment delay (ms) and loss (%) of one phase, from the cumulative probes."
+    rows = []
+    prev_label, prev_rtt, prev_loss = "h1", 0.0, 0.0
+    for label, path in _cumulative_logs(exp, phase, log_dir):
+        stats = parse_ping_stats(path)
+        rtt, loss = stats["rtt_avg_ms"], stats["loss_pct"]
+        rows.append({
+            "segment": f"{prev_label}->{label}",
+            "cumulative_rtt_ms": rtt,
+            "cumulative_loss_pct": loss,
+            "hop_delay_ms": rtt - prev_rtt,
+            "hop_loss_pct": _hop_loss(loss, prev_loss),
+            "rtt_p99_ms": stats["rtt_p99_ms"],
+        })
+        prev_label, prev_rtt, prev_loss = label, rtt, loss
+    return rows
+
+
+def hop_timeseries(exp, phase, log_dir='.', bin_s=1.0):
+    """
+    Per-segment delay over time: {"t": [bin start s], "segments": {name: [ms]}}.
+    Bins where a target has no reply are nan for the segments next to it.
+    """
+    series = [(label, parse_ping_timestamps(path)) for label, path in _cumulative_logs(exp, phase, log_dir)]
+    starts = [s[0][0] for _, s in series if s]
+    if not starts:
+        return {"t": [], "segments": {}}
+    t0 = min(starts)
+    n_bins = int((max(s[-1][0] for _, s in series if s) - t0) // bin_s) + 1
+
+    means = []
+    for label, samples in series:
+        sums, counts = [0.0] * n_bins, [0] * n_bins
+        for t, _seq, rtt in samples:
+            i = int((t - t0) // bin_s)
+            sums[i] += rtt
+            counts[i] += 1
+        means.append((label, [s / c if c else math.nan for s, c in zip(sums, counts)]))
+
+    segments = {}
+    prev_label, prev = "h1", [0.0] * n_bins
+    for label, cur in means:
+        segments[f"{prev_label}->{label}"] = [c - p for c, p in zip(cur, prev)]
+        prev_label, prev = label, cur
+    return {"t": [i * bin_s for i in range(n_bins)], "segments": segments}
+
+
+def plot_timeseries(ts, title, filename):
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(10, 4))
+    for name, values in ts["segments"].items():
+        plt.plot(ts["t"], values, marker='.', linewidth=0.8, label=name)
+    plt.xlabel("Time (s)")
+    plt.ylabel("Hop delay (ms)")
+    plt.title(title)
+    plt.legend()
+    plt.grid(True, linestyle='--', alpha=0.4)
+    plt.tight_layout()
+    plt.savefig(filename)
+    print(f"[INFO] Saved figure: {filename}")
+
+
+def print_breakdown(exp, phase, rows):
+    print(f"\n{exp} {phase}: {'segment':<10} {'cum RTT':>9} {'hop ms':>8} {'cum loss':>9} {'hop loss':>9}")
+    for r in rows:
+        print(f"{'':<{len(exp) + len(phase) + 2}} {r['segment']:<10} {r['cumulative_rtt_ms']:>9.3f} "
+              f"{r['hop_delay_ms']:>8.3f} {r['cumulative_loss_pct']:>9.2f} {r['hop_loss_pct']:>9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-hop delay / loss along h1 -> h20")
+    parser.add_argument('--exp', default='exp2', help="experiment prefix, e.g. exp2")
+    parser.add_argument('--phase', nargs='+', choices=HOP_PHASES, default=list(HOP_PHASES))
+    parser.add_argument('--log-dir', default='.')
+    parser.add_argument('--bin', type=float, default=1.0, help="time bin of the over-time view (s)")
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args(argv)
+
+    result = {}
+    for phase in args.phase:
+        rows = hop_breakdown(args.exp, phase, args.log_dir)
+        print_breakdown(args.exp, phase, rows)
+        ts = hop_timeseries(args.exp, phase, args.log_dir, args.bin)
+        result[phase] = {"breakdown": rows, "timeseries": ts}
+        if not args.no_plot and ts["t"]:
+            plot_timeseries(ts, f"Per-hop delay over time ({args.exp}, {phase})",
+                            os.path.join(args.log_dir, f"{args.exp}_hops_{phase}.png"))
+
+    out_file = os.path.join(args.log_dir, f"{args.exp}_hops.json")
+    with open(out_file, 'w') as f:
+        json.dump(result, f, indent=1)
+    print(f"[INFO] Saved hop breakdown: {out_file}")
+
+
+if __name__ == '__main__':
+    main()
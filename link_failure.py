@@ -0,0 +1,199 @@
+"""
+Link failure / recovery experiment.
+
+A TCP flow h1 -> h20 runs with a 1 ms `ping -D` probe next to it; in the
+middle of the flow one core link (s2-s3 by default, on the h1 -> h20 path)
+is taken down with net.configLinkStatus and brought back later.  From the
+probe and the iperf intervals this measures:
+- outage: how long h1 could not reach h20 after the failure (ms)
+- rerouted: whether traffic came back before the link did (backup path)
+- recovery: time from restoring the link to the first reply after it,
+  when the outage lasted until then (ms)
+- throughput recovery: time until the iperf rate is back to 90% of its
+  pre-failure mean, counted from the failure and from the restore (s)
+- any other probe gap (e.g. STP re-converging after the restore)
+
+Runs for every topology variant (none / ring / mesh, see topology.py)
+and switch mode (standalone OVS / OpenFlow controller).  The link events
+go to the event log like flow events, so timeline.py shades the outage.
+
+    sudo python3 link_failure.py --bw 10 --variant none ring --mode standalone ref
+"""
+import argparse
+import json
+import math
+import os
+import time
+
+from analyze_logs import parse_iperf_intervals
+from exp_common import event_log, log_path
+from procs import IPERF_PORT, Procs
+from timeline import parse_events, parse_ping_timestamps
+from topology import CONTROLLER_MODES, EXP3_DELAYS, REDUNDANT, build_network
+
+# probe gaps longer than this many probe intervals count as a disruption
+GAP_FACTOR = 20
+# throughput counts as recovered at this fraction of the pre-failure mean
+RECOVERED_FRACTION = 0.9
+
+
+def wait_reachable(src, dst_ip, timeout=60.0):
+    "Ping until dst answers (STP takes ~30 s to open ports); returns the wait in s."
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        if ' 0% packet loss' in src.cmd(f'ping -c 1 -W 1 {dst_ip}'):
+            return time.time() - t0
+        time.sleep(0.5)
+    print(f"[WARN] {dst_ip} not reachable from {src.name} after {timeout:.0f} s")
+    return math.nan
+
+
+def run_failure(net, name, log_dir, link=('s2', 's3'), fail_at=5.0, down_for=5.0,
+                duration=20, interval=0.001, report_interval=0.5):
+    "One failure run on a started network; logs go to <log_dir>/<name>_*."
+    h1, h20 = net.get('h1', 'h20')
+    server_ip = h20.IP()
+    link_name = f'{link[0]}-{link[1]}'
+    events = event_log(log_dir, name)
+    ping_log = log_path(log_dir, f'{name}_ping_h1_h20.log')
+    tcp_log = log_path(log_dir, f'{name}_tcp_h1_h20.log')
+
+    procs = Procs()
+    procs.start(h20, 'iperf -s > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')
+    time.sleep(0.5)
+    procs.start(h1, f'ping -D -i {interval} -w {duration + 2} {server_ip} > {ping_log} 2>&1',
+                name='ping h1->h20')
+    events.start('h1->h20', kind='main', proto='tcp')
+    procs.start(h1, f'iperf -c {server_ip} -t {duration} -i {report_interval} > {tcp_log} 2>&1',
+                name='iperf h1->h20')
+
+    time.sleep(fail_at)
+    print(f"*** {name}: link {link_name} down")
+    events.start(link_name, kind='link', state='down')
+    net.configLinkStatus(link[0], link[1], 'down')
+    time.sleep(down_for)
+    print(f"*** {name}: link {link_name} up")
+    net.configLinkStatus(link[0], link[1], 'up')
+    events.stop(link_name)
+
+    time.sleep(max(duration - fail_at - down_for, 0) + 1)
+    events.stop('h1->h20')
+    procs.stop(label=name)
+    return ping_log, tcp_log
+
+
+def probe_gaps(samples, min_gap):
+    "[(t_before, t_after), ...] of consecutive replies more than min_gap s apart."
+    return [(a[0], b[0]) for a, b in zip(samples, samples[1:]) if b[0] - a[0] > min_gap]
+
+
+def analyze_failure(name, log_dir, interval=0.001):
+    "Outage / recovery numbers of one run from its probe, iperf and event logs."
+    events = parse_events(os.path.join(log_dir, f'{name}_events.log'))
+    link_ev = [e for e in events if e.get('kind') == 'link']
+    flow_ev = [e for e in events if e.get('kind') == 'main' and e['event'] == 'start']
+    t_down = next((e['t'] for e in link_ev if e['event'] == 'start'), math.nan)
+    t_up = next((e['t'] for e in link_ev if e['event'] == 'stop'), math.nan)
+    t_flow = flow_ev[0]['t'] if flow_ev else math.nan
+
+    samples = parse_ping_timestamps(os.path.join(log_dir, f'{name}_ping_h1_h20.log'))
+    gaps = probe_gaps(samples, max(GAP_FACTOR * interval, 0.05))
+    # 覆盖 failure 时刻的那个 gap 就是 outage
+    outage = next(((a, b) for a, b in gaps if a <= t_down + interval and b > t_down), None)
+    result = {
+        "run": name,
+        "probe_replies": len(samples),
+        "outage_ms": round((outage[1] - outage[0] - interval) * 1e3, 1) if outage else 0.0,
+        "rerouted": bool(outage is None or outage[1] < t_up),
+        "recovery_ms": (round((outage[1] - t_up) * 1e3, 1)
+                        if outage and outage[1] >= t_up else None),
+        "other_disruptions": [{"at_s": round(a - t_down, 3), "ms": round((b - a - interval) * 1e3, 1)}
+                              for a, b in gaps if (a, b) != outage],
+    }
+    if outage is None and samples and not any(t > t_down for t, _, _ in samples):
+        result.update(outage_ms=None, rerouted=False)   # 一直没恢复
+
+    rows = parse_iperf_intervals(os.path.join(log_dir, f'{name}_tcp_h1_h20.log'))
+    fail_off, up_off = t_down - t_flow, t_up - t_flow
+    before = [mbps for start, end, mbps in rows if end <= fail_off and start >= 1.0]  # 跳过 slow start
+    pre = sum(before) / len(before) if before else math.nan
+    recovered = next((end for start, end, mbps in rows
+                      if start >= fail_off and mbps >= RECOVERED_FRACTION * pre), None)
+    during = [mbps for start, end, mbps in rows if start >= fail_off and end <= up_off]
+    result.update({
+        "pre_failure_Mbps": round(pre, 3) if not math.isnan(pre) else None,
+        "min_during_failure_Mbps": min(during) if during else None,
+        "throughput_recovery_s": round(recovered - fail_off, 3) if recovered is not None else None,
+        "throughput_recovery_after_up_s": (round(recovered - up_off, 3)
+                                           if recovered is not None and recovered > up_off else None),
+    })
+    return result
+
+
+def print_table(rows):
+    print(f"\n{'variant':<8} {'mode':<10} {'outage ms':>10} {'rerouted':>8} {'recover ms':>10} "
+          f"{'thr rec s':>9} {'pre Mbps':>9}")
+    for r in rows:
+        print(f"{r['variant']:<8} {r['mode']:<10} {_fmt(r['outage_ms']):>10} {str(r['rerouted']):>8} "
+              f"{_fmt(r['recovery_ms']):>10} {_fmt(r['throughput_recovery_s']):>9} "
+              f"{_fmt(r['pre_failure_Mbps']):>9}")
+
+
+def _fmt(v):
+    return '-' if v is None else f"{v:.1f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Link failure / recovery with outage and convergence times")
+    parser.add_argument('--bw', type=int, choices=(10, 500), default=10)
+    parser.add_argument('--exp', type=int, choices=(1, 3), default=1,
+                        help="1 = plain topology, 3 = exp3 delays")
+    parser.add_argument('--variant', nargs='+', choices=sorted(REDUNDANT), default=['none', 'ring'])
+    parser.add_argument('--mode', nargs='+', choices=CONTROLLER_MODES, default=['standalone', 'ref'],
+                        help="'ref' = Mininet's default controller, 'remote' = --controller-ip/--controller-port")
+    parser.add_argument('--loop-protection', choices=('stp', 'rstp'), default='stp',
+                        help="used by the redundant variants")
+    parser.add_argument('--controller-ip', default='127.0.0.1')
+    parser.add_argument('--controller-port', type=int, default=6653)
+    parser.add_argument('--link', nargs=2, default=['s2', 's3'], metavar=('SA', 'SB'))
+    parser.add_argument('--fail-at', type=float, default=5.0, help="s after the flow started")
+    parser.add_argument('--down-for', type=float, default=5.0)
+    parser.add_argument('--duration', type=int, default=20, help="TCP flow length (s)")
+    parser.add_argument('--interval', type=float, default=0.001, help="probe interval (s)")
+    parser.add_argument('--log-dir', default='link_failure')
+    args = parser.parse_args(argv)
+
+    from mininet.log import setLogLevel
+    setLogLevel('info')
+
+    rows = []
+    for variant in args.variant:
+        for mode in args.mode:
+            name = f'fail_{variant}_{mode}'
+            print(f"\n=== Link failure: {'-'.join(args.link)}, variant={variant}, mode={mode} ===")
+            net = None
+            try:
+                net = build_network(args.bw, EXP3_DELAYS if args.exp == 3 else None, variant, mode,
+                                    args.loop_protection if variant != 'none' else None,
+                                    args.controller_ip, args.controller_port)
+                h1, h20 = net.get('h1', 'h20')
+                waited = wait_reachable(h1, h20.IP())
+                run_failure(net, name, args.log_dir, tuple(args.link), args.fail_at, args.down_for,
+                            args.duration, args.interval)
+            finally:
+                if net is not None:
+                    net.stop()
+            row = {"variant": variant, "mode": mode, "link": '-'.join(args.link), "bw_Mbps": args.bw,
+                   "converge_before_s": round(waited, 2)}
+            row.update(analyze_failure(name, args.log_dir, args.interval))
+            rows.append(row)
+
+    print_table(rows)
+    out_file = log_path(args.log_dir, f'link_failure_B{args.bw}M.json')
+    with open(out_file, 'w') as f:
+        json.dump(rows, f, indent=2)
+    print(f"[INFO] Saved link-failure results: {out_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Live metrics and health checks while a test is running.
+
+In live mode the main iperf / ping of a test is read line by line (see
+adaptive.run_test) and the concurrent ping log is tailed as the host
+shell writes it.  Every second a rolling RTT / loss / throughput line is
+printed, and the test is stopped early when a health check fails:
+- loss over the rolling window above --max-loss percent
+- no sample (ping reply or iperf interval) for --stall seconds
+--probe flood prints no per-reply lines, so it cannot be combined with --live.
+Aborted tests are listed in live_health.json next to the logs.
+"""
+import json
+import os
+import re
+import statistics
+import time
+from collections import deque
+
+HEALTH_FILE = "live_health.json"
+
+_PING_SEQ_RE = re.compile(r'icmp_seq=(\d+).*time=([\d\.]+)\s*ms')
+
+
+def live_from_args(args):
+    "Live settings from the --live/--max-loss/--stall options, or None."
+    if not args.live:
+        return None
+    if getattr(args, 'probe', None) == 'flood':
+        # ping -f 只打印 summary，没有逐个 reply，rolling loss / RTT 永远是空的
+        raise SystemExit("[ERROR] --live needs per-reply ping lines, use --probe default or fast "
+                         "instead of --probe flood")
+    return Live(args.max_loss, args.stall)
+
+
+class Live(object):
+    """
+    Health-check thresholds of live mode:
+    - max_loss: abort when the rolling ping loss is above this (percent)
+    - stall_s: abort when no sample arrived for this many seconds
+    - window: number of recent ping replies the rolling stats use
+    """
+
+    def __init__(self, max_loss=50.0, stall_s=5.0, window=20, report_s=1.0):
+        self.max_loss = max_loss
+        self.stall_s = stall_s
+        self.window = window
+        self.report_s = report_s
+
+    def check(self, stats, now):
+        "Reason to abort, or None if the test looks healthy."
+        if now - stats.last_sample > self.stall_s:
+            return f"no samples for {now - stats.last_sample:.1f} s"
+        loss = stats.loss_pct()
+        if loss is not None and loss > self.max_loss:
+            return f"rolling loss {loss:.0f}% > {self.max_loss:.0f}%"
+        return None
+
+
+class LiveStats(object):
+    "Rolling RTT / loss over the last `window` ping replies plus the last iperf interval."
+
+    def __init__(self, window=20):
+        self.rtts = deque(maxlen=window)
+        self.seqs = deque(maxlen=window)
+        self.mbps = None
+        self.last_sample = time.time()
+
+    def add_ping_line(self, line):
+        m = _PING_SEQ_RE.search(line)
+        if not m:
+            return
+        self.seqs.append(int(m.group(1)))
+        self.rtts.append(float(m.group(2)))
+        self.last_sample = time.time()
+
+    def add_throughput(self, mbps):
+        self.mbps = mbps
+        self.last_sample = time.time()
+
+    def loss_pct(self):
+        "Loss from icmp_seq gaps in the window (None until there are 2 replies)."
+        if len(self.seqs) < 2:
+            return None
+        span = self.seqs[-1] - self.seqs[0] + 1
+        return 100.0 * (1 - len(self.seqs) / span) if span > 0 else None
+
+    def line(self, name, elapsed):
+        rtt = f"{statistics.fmean(self.rtts):.2f} ms" if self.rtts else "-"
+        loss = self.loss_pct()
+        loss = f"{loss:.0f}%" if loss is not None else "-"
+        mbps = f"{self.mbps:.2f} Mbps" if self.mbps is not None else "-"
+        return f"[LIVE] {name} t={elapsed:5.1f}s  rtt {rtt}  loss {loss}  thr {mbps}"
+
+
+class FileTail(object):
+    "New lines of a file that another process is still writing."
+
+    def __init__(self, path):
+        self.path = path
+        self.pos = 0
+        self.buf = ''
+
+    def read_lines(self):
+        if not self.path or not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r', errors='replace') as f:
+            f.seek(self.pos)
+            data = f.read()
+            self.pos = f.tell()
+        self.buf += data
+        *lines, self.buf = self.buf.split('\n')
+        return lines
+
+
+def record_abort(log_dir, name, reason, elapsed):
+    "Append one aborted test to live_health.json."
+    path = os.path.join(log_dir, HEALTH_FILE)
+    aborts = []
+    if os.path.exists(path):
+        with open(path) as f:
+            aborts = json.load(f)
+    aborts.append({"test": name, "reason": reason, "elapsed_s": round(elapsed, 3), "t": time.time()})
+    with open(path, 'w') as f:
+        json.dump(aborts, f, indent=2)
@@ -0,0 +1,126 @@
+"""
+Load a MiniEdit topology file (project.mn, project_delay.mn) as a
+topology spec for topology.build_network().
+
+A .mn file is JSON with "switches", "hosts", "links" and "controllers";
+every node has its name in opts["hostname"].  Link opts are MiniEdit's
+TCLink parameters (bw, delay, loss, ...), switch opts list the
+controllers the switch connects to.  Hosts are sorted by number so h1
+gets 10.0.0.1 as in the experiment scripts, and host links come before
+switch links (same interface names as the scripts).
+
+Two keys MiniEdit does not write (add them by hand, MiniEdit drops them
+when it saves the file again):
+- link opts "up" / "down": TCLink parameters of one direction only
+  (asymmetric links, see topology.py)
+- top-level "linkProfiles": a link profile (topology.LINK_PROFILES
+  format) the topology is built with unless --profile gives another
+
+    python3 mn_loader.py project_delay.mn
+    python3 mn_loader.py project.mn --bw 500 --profile fast-core
+"""
+import argparse
+import json
+import os
+import re
+
+# MiniEdit link opts that TCLink understands
+TCLINK_KEYS = ('bw', 'delay', 'jitter', 'loss', 'max_queue_size')
+
+
+def _node_key(name):
+    m = re.match(r'^([a-z]+)(\d+)$', name)
+    return (m.group(1), int(m.group(2))) if m else (name, 0)
+
+
+def _link_opts(opts):
+    out = {k: opts[k] for k in TCLINK_KEYS if opts.get(k) not in (None, '')}
+    for k in ('bw', 'loss', 'max_queue_size'):
+        if k in out:
+            out[k] = float(out[k]) if k != 'max_queue_size' else int(out[k])
+    for direction in ('up', 'down'):
+        if opts.get(direction):
+            out[direction] = _link_opts(opts[direction])
+    return out
+
+
+def load_mn(path):
+    "Spec (see topology.default_spec) of a MiniEdit .mn file."
+    with open(path) as f:
+        data = json.load(f)
+
+    switches = sorted((s['opts']['hostname'] for s in data.get('switches', [])), key=_node_key)
+    hosts = sorted((h['opts']['hostname'] for h in data.get('hosts', [])), key=_node_key)
+    host_set = set(hosts)
+
+    host_links, core_links = [], []
+    for link in data.get('links', []):
+        a, b, opts = link['src'], link['dest'], _link_opts(link.get('opts') or {})
+        if a in host_set or b in host_set:
+            h, sw = (a, b) if a in host_set else (b, a)
+            host_links.append((h, sw, opts))
+        else:
+            core_links.append((a, b, opts))
+    host_links.sort(key=lambda l: _node_key(l[0]))
+
+    controllers = {}
+    for c in data.get('controllers', []):
+        o = c['opts']
+        controllers[o['hostname']] = {
+            'type': o.get('controllerType', 'ref'),
+            'ip': o.get('remoteIP', '127.0.0.1'),
+            'port': int(o.get('remotePort', 6653)),
+        }
+    switch_controllers = {s['opts']['hostname']: list(s['opts'].get('controllers') or [])
+                          for s in data.get('switches', [])}
+
+    return {
+        "name": os.path.splitext(os.path.basename(path))[0],
+        "switches": switches,
+        "hosts": hosts,
+        "host_links": host_links,
+        "core_links": core_links,
+        "controllers": controllers,
+        "switch_controllers": switch_controllers,
+        "profile": data.get("linkProfiles"),
+    }
+
+
+def describe(spec, bw=None, profile=None):
+    """
+    One line per switch link and its options, host links only where they
+    have options of their own.  With bw: the links as built with profile
+    (or the file's linkProfiles) and the edge oversubscription.
+    """
+    lines = [f"{spec['name']}: {len(spec['switches'])} switches, {len(spec['hosts'])} hosts, "
+             f"controllers {', '.join(sorted(spec['controllers'])) or '-'}"]
+    if bw:
+        from topology import apply_profile, oversubscription
+        spec = apply_profile(spec, profile if profile is not None else spec.get("profile"), bw)
+    for a, b, opts in spec["core_links"] + [l for l in spec["host_links"] if l[2] not in ({}, {'bw': bw})]:
+        extra = ', '.join(f'{k}={v}' for k, v in opts.items()) or '-'
+        lines.append(f"  {a}-{b}: {extra}")
+    if bw:
+        lines.append("  oversubscription: " + ', '.join(
+            f"{sw} {r['ratio']:g}:1" for sw, r in sorted(oversubscription(spec).items())))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the topology of MiniEdit .mn files")
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--bw', type=float, default=None,
+                        help="show the links as built at this bw (Mbit/s) and the oversubscription")
+    parser.add_argument('--profile', default=None,
+                        help="link profile: a topology.LINK_PROFILES name or a JSON file")
+    args = parser.parse_args(argv)
+    profile = None
+    if args.profile:
+        from topology import load_profile
+        profile = load_profile(args.profile)
+    for path in args.files:
+        print(describe(load_mn(path), args.bw, profile))
+
+
+if __name__ == '__main__':
+    main()
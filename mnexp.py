@@ -0,0 +1,139 @@
+"""
+One entry point for running and analyzing the experiments.
+
+    sudo python3 mnexp.py run --exp 2 --bw 500 --cc bbr --no-cli
+    sudo python3 mnexp.py sweep --exp 1 2 3 --bw 10 500 --out campaigns
+    python3 mnexp.py analyze --log-dir campaigns/B500 --summary
+    python3 mnexp.py compare campaigns/B10 campaigns/B500
+    python3 mnexp.py report --log-dir campaigns/B500
+
+Options after `run` / `sweep` that mnexp does not know (--cc, --streams,
+--adaptive, --archive, ...) are passed on to the project_topo_exp*.py
+script, and those of `analyze` (without --summary) to analyze_logs.py;
+the other subcommands reject unknown options.  Mininet, numpy and matplotlib are only imported by the
+subcommands that need them, so `analyze --summary` stays fast;
+`--timing` prints how long startup and the command took.
+"""
+import time
+
+_T0 = time.perf_counter()
+
+import argparse
+import importlib
+import math
+import os
+import sys
+
+
+def _experiment_module(exp, bw):
+    return importlib.import_module(f'project_topo_exp{exp}_B{bw}M')
+
+
+def cmd_run(args, rest):
+    from mininet.log import setLogLevel
+    setLogLevel('info')
+    _experiment_module(args.exp, args.bw).main(rest)
+
+
+def cmd_sweep(args, rest):
+    from mininet.log import setLogLevel
+    setLogLevel('info')
+    for bw in args.bw:
+        log_dir = os.path.join(args.out, f'B{bw}')
+        for exp in args.exp:
+            print(f"\n*** sweep: exp{exp} at {bw} Mbit/s -> {log_dir}")
+            _experiment_module(exp, bw).main(['--no-cli', '--log-dir', log_dir] + rest)
+
+
+def print_summary(metrics):
+    from analyze_logs import experiments, protocols
+    print(f"{'exp':<5} {'proto':<5} {'Mbps':>9} {'RTT ms':>9} {'loss %':>7} {'jitter ms':>9}")
+    for exp in experiments:
+        for p in protocols:
+            m = metrics[exp][p]
+            print(f"{exp:<5} {p:<5} {m['throughput_Mbps']:>9.2f} {m['rtt_ms']:>9.3f} "
+                  f"{m['loss_pct']:>7.1f} {m['jitter_ms']:>9.3f}")
+
+
+def cmd_analyze(args, rest):
+    import analyze_logs
+    if args.summary:
+        print_summary(analyze_logs.collect_metrics(args.log_dir))
+        return
+    argv = ['--log-dir', args.log_dir] + rest
+    analyze_logs.main(argv)
+
+
+def cmd_compare(args, rest):
+    from analyze_logs import collect_metrics, experiments, protocols
+    a, b = collect_metrics(args.dir_a), collect_metrics(args.dir_b)
+    keys = ("throughput_Mbps", "rtt_ms", "loss_pct", "jitter_ms")
+    print(f"A = {args.dir_a}\nB = {args.dir_b}\n")
+    print(f"{'exp':<5} {'proto':<5} {'metric':<16} {'A':>10} {'B':>10} {'B-A %':>8}")
+    for exp in experiments:
+        for p in protocols:
+            for key in keys:
+                va, vb = a[exp][p][key], b[exp][p][key]
+                if math.isnan(va) and math.isnan(vb):
+                    continue
+                pct = 100.0 * (vb - va) / va if va else math.nan
+                print(f"{exp:<5} {p:<5} {key:<16} {va:>10.3f} {vb:>10.3f} {pct:>8.1f}")
+
+
+def cmd_report(args, rest):
+    from report import build_report
+    build_report(args.log_dir, args.out_dir, args.tag, args.force)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run and analyze the Mininet experiments")
+    parser.add_argument('--timing', action='store_true', help="print startup / run time")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('run', help="run one experiment script (other options are passed on)")
+    p.add_argument('--exp', type=int, choices=(1, 2, 3), required=True)
+    p.add_argument('--bw', type=int, choices=(10, 500), default=10)
+    p.set_defaults(func=cmd_run, passthrough=True)
+
+    p = sub.add_parser('sweep', help="run several experiments / bandwidths without the CLI")
+    p.add_argument('--exp', type=int, nargs='+', choices=(1, 2, 3), default=[1, 2, 3])
+    p.add_argument('--bw', type=int, nargs='+', choices=(10, 500), default=[10, 500])
+    p.add_argument('--out', default='campaigns', help="logs go to OUT/B<bw>/")
+    p.set_defaults(func=cmd_sweep, passthrough=True)
+
+    p = sub.add_parser('analyze', help="parse logs and plot (analyze_logs.py)")
+    p.add_argument('--log-dir', default='.')
+    p.add_argument('--summary', action='store_true', help="print the metrics table only, no plots")
+    p.set_defaults(func=cmd_analyze, passthrough=True)
+
+    p = sub.add_parser('compare', help="metrics of two campaign directories side by side")
+    p.add_argument('dir_a')
+    p.add_argument('dir_b')
+    p.set_defaults(func=cmd_compare)
+
+    p = sub.add_parser('report', help="JSON + HTML campaign report (report.py)")
+    p.add_argument('--log-dir', default='.')
+    p.add_argument('--out-dir', default=None)
+    p.add_argument('--tag', default=None)
+    p.add_argument('--force', action='store_true')
+    p.set_defaults(func=cmd_report)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, rest = parser.parse_known_args(argv)
+    # 只有会把参数继续传下去的 subcommand 才接受未知参数，其它的打错字要报错
+    if rest and not (getattr(args, 'passthrough', False) and not getattr(args, 'summary', False)):
+        parser.error(f"unrecognized arguments for {args.command}: {' '.join(rest)}")
+    t_start = time.perf_counter()
+    args.func(args, rest)
+    if args.timing:
+        heavy = [m for m in ('mininet', 'numpy', 'matplotlib') if m in sys.modules]
+        print(f"[TIMING] startup {1e3 * (t_start - _T0):.1f} ms, "
+              f"{args.command} {1e3 * (time.perf_counter() - t_start):.1f} ms, "
+              f"heavy modules loaded: {', '.join(heavy) or 'none'}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
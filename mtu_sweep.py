@@ -0,0 +1,196 @@
+"""
+MTU / jumbo-frame sweep: throughput and CPU cost per Gbit against the MTU.
+
+At 500 Mbit/s the per-packet cost of the emulated path (veth pairs, the
+OVS datapath, the tc shapers) can cap throughput before the configured
+bw does, and a larger MTU means fewer packets for the same bytes.  For
+every MTU of --mtu this builds the experiment's network, sets the MTU on
+every host and switch interface (topology.set_mtu) and checks it end to
+end h1 -> h20 with DF-bit pings (ping -M do): a payload of exactly
+MTU - 28 has to get through and one byte more must not.  Then it runs the
+experiment's TCP and UDP phases and samples /proc/stat around each:
+- main-flow throughput, TCP also against the goodput ceiling at that MTU
+  (planner.tcp_payload_ratio)
+- CPU cost: busy CPU seconds of the whole machine during the phase, minus
+  what the idle network used before, per Gbit the main flow carried
+
+TCP follows the MTU by itself (the MSS is negotiated); the UDP phase keeps
+iperf's 1470-byte datagrams, so it only shows the same packets on a path
+with a larger MTU (size_sweep.py varies the payload).
+
+    sudo python3 mtu_sweep.py --bw 500 --exp 1 3 --mtu 1500 4000 9000
+"""
+import argparse
+import json
+import math
+import os
+import re
+import time
+
+from analyze_logs import parse_iperf_throughput, parse_iperf_udp_metrics
+from exp_common import log_path
+from planner import UDP_PAYLOAD_RATIO, tcp_payload_ratio
+
+DEFAULT_MTUS = (1500, 4000, 9000)
+
+# IPv4 + ICMP header: ping -s MTU-28 fills the MTU exactly
+IP_ICMP_HEADERS = 28
+
+# length of the TCP / UDP test of each phase (s)
+TEST_S = 10
+
+IDLE_SAMPLE_S = 2.0
+
+_RECEIVED_RE = re.compile(r'(\d+) (?:packets )?received')
+
+
+def busy_cpu_s():
+    "Busy CPU seconds of the machine so far (all cores), from /proc/stat."
+    with open('/proc/stat') as f:
+        fields = [int(v) for v in f.readline().split()[1:]]
+    # user nice system idle iowait irq softirq steal ...；idle 和 iowait 不算
+    return (sum(fields[:8]) - fields[3] - fields[4]) / os.sysconf('SC_CLK_TCK')
+
+
+def idle_cpu_rate(seconds=IDLE_SAMPLE_S):
+    "Busy cores of the built but idle network (OVS, controllers, the rest of the box)."
+    c0 = busy_cpu_s()
+    time.sleep(seconds)
+    return (busy_cpu_s() - c0) / seconds
+
+
+def _received(out):
+    m = _RECEIVED_RE.search(out)
+    return int(m.group(1)) if m else 0
+
+
+def check_path_mtu(net, mtu, src='h1', dst='h20'):
+    """
+    DF-bit probes src -> dst: {"fits": a full-MTU packet got through,
+    "too_big_blocked": one byte more did not, "ok": both}.
+    """
+    h, ip = net.get(src), net.get(dst).IP()
+    payload = mtu - IP_ICMP_HEADERS
+    fits = _received(h.cmd(f'ping -M do -s {payload} -c 3 -W 1 {ip} 2>&1')) > 0
+    too_big = _received(h.cmd(f'ping -M do -s {payload + 1} -c 2 -W 1 {ip} 2>&1')) > 0
+    result = {"fits": fits, "too_big_blocked": not too_big, "ok": fits and not too_big}
+    if not result["ok"]:
+        print(f"[WARN] Path MTU {src} -> {dst} is not {mtu}: {mtu} B packets "
+              f"{'pass' if fits else 'are dropped'}, {mtu + 1} B packets {'pass' if too_big else 'are dropped'}")
+    return result
+
+
+def run_mtu(exp, bw, mtu, log_dir):
+    "TCP and UDP phase of one experiment at one MTU; returns the rows."
+    from tcp_matrix import load_experiment
+    from topology import set_mtu
+    create_network, run_experiment = load_experiment(exp, bw)
+    net = None
+    rows = []
+    try:
+        net = create_network()
+        failed = set_mtu(net, mtu)
+        path = check_path_mtu(net, mtu)
+        if failed or not path["ok"]:
+            print(f"[WARN] exp{exp}: MTU {mtu} not in place, skipped")
+            return [{"exp": exp, "mtu": mtu, "proto": proto, "path_mtu_ok": False}
+                    for proto in ('tcp', 'udp')]
+        idle = idle_cpu_rate()
+        for proto in ('tcp', 'udp'):
+            t0, c0 = time.time(), busy_cpu_s()
+            run_experiment(net, duration=TEST_S, log_dir=log_dir, phases=(proto,))
+            wall = time.time() - t0
+            cpu = busy_cpu_s() - c0 - idle * wall
+            main_log = os.path.join(log_dir, f'exp{exp}_{proto}_h1_h20.log')
+            if proto == 'tcp':
+                mbps, loss = parse_iperf_throughput(main_log), math.nan
+                ceiling = bw * tcp_payload_ratio(mtu)
+            else:
+                mbps, _jitter, loss = parse_iperf_udp_metrics(main_log)
+                ceiling = bw * UDP_PAYLOAD_RATIO
+            gbit = mbps * TEST_S / 1e3
+            rows.append({
+                "exp": exp,
+                "mtu": mtu,
+                "proto": proto,
+                "path_mtu_ok": True,
+                "throughput_Mbps": mbps,
+                "ceiling_Mbps": round(ceiling, 3),
+                "loss_pct": loss,
+                "cpu_busy_s": round(cpu, 3),
+                "cpu_cores": round(cpu / wall, 3),
+                "idle_cores": round(idle, 3),
+                "cpu_s_per_Gbit": cpu / gbit if gbit > 0 else math.nan,
+            })
+            print(f"  exp{exp} MTU {mtu} {proto}: {mbps:.2f} Mbit/s, "
+                  f"{rows[-1]['cpu_s_per_Gbit']:.3f} CPU s/Gbit")
+        return rows
+    finally:
+        if net is not None:
+            net.stop()
+
+
+def plot_sweep(rows, bw, filename):
+    import matplotlib.pyplot as plt
+    fig, axes = plt.subplots(1, 2, figsize=(11, 4))
+    series = {}
+    for r in rows:
+        if r["path_mtu_ok"]:
+            series.setdefault(f"exp{r['exp']} {r['proto'].upper()}", []).append(r)
+    for name, rs in series.items():
+        mtus = [r["mtu"] for r in rs]
+        axes[0].plot(mtus, [r["throughput_Mbps"] for r in rs], marker='o', label=name)
+        axes[1].plot(mtus, [r["cpu_s_per_Gbit"] for r in rs], marker='o', label=name)
+    for ax, ylabel in zip(axes, ("Throughput (Mbps)", "CPU seconds per Gbit")):
+        ax.set_xlabel("MTU (bytes)")
+        ax.set_ylabel(ylabel)
+        ax.grid(True, linestyle='--', alpha=0.4)
+        ax.legend(fontsize='small')
+    fig.suptitle(f"MTU sweep at {bw} Mbit/s")
+    fig.tight_layout()
+    fig.savefig(filename)
+    print(f"[INFO] Saved figure: {filename}")
+
+
+def print_table(rows):
+    print(f"\n{'exp':>4} {'MTU':>5} {'proto':<5} {'Mbps':>9} {'of ceil':>7} {'loss %':>7} "
+          f"{'cores':>6} {'CPU s/Gbit':>10}")
+    for r in rows:
+        if not r["path_mtu_ok"]:
+            print(f"{r['exp']:>4} {r['mtu']:>5} {r['proto']:<5} path MTU check failed")
+            continue
+        print(f"{r['exp']:>4} {r['mtu']:>5} {r['proto']:<5} {r['throughput_Mbps']:>9.2f} "
+              f"{r['throughput_Mbps'] / r['ceiling_Mbps']:>7.2f} {r['loss_pct']:>7.2f} "
+              f"{r['cpu_cores']:>6.2f} {r['cpu_s_per_Gbit']:>10.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput and CPU cost per Gbit against the interface MTU")
+    parser.add_argument('--bw', type=int, choices=(10, 500), default=500)
+    parser.add_argument('--exp', type=int, nargs='+', choices=(1, 2, 3), default=[1, 2, 3])
+    parser.add_argument('--mtu', type=int, nargs='+', default=list(DEFAULT_MTUS),
+                        help="MTUs to run (bytes), e.g. 1500 4000 9000")
+    parser.add_argument('--out', default='mtu_sweep')
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args(argv)
+
+    from mininet.log import setLogLevel
+    setLogLevel('info')
+
+    rows = []
+    for exp in args.exp:
+        for mtu in sorted(args.mtu):
+            print(f"\n=== MTU sweep: exp{exp} at {args.bw} Mbit/s, MTU {mtu} ===")
+            rows += run_mtu(exp, args.bw, mtu, os.path.join(args.out, f'exp{exp}_B{args.bw}M_mtu{mtu}'))
+
+    print_table(rows)
+    if not args.no_plot:
+        plot_sweep(rows, args.bw, log_path(args.out, f'mtu_sweep_B{args.bw}M.png'))
+    out_file = log_path(args.out, f'mtu_sweep_B{args.bw}M.json')
+    with open(out_file, 'w') as f:
+        json.dump({"bw_Mbps": args.bw, "test_s": TEST_S, "rows": rows}, f, indent=2)
+    print(f"[INFO] Saved MTU sweep: {out_file}")
+
+
+if __name__ == '__main__':
+    main()
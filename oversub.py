@@ -0,0 +1,211 @@
+"""
+Oversubscription sweep: end-to-end throughput and latency against the
+ratio of edge to core capacity.
+
+For every link profile of --profiles (topology.LINK_PROFILES presets or
+JSON files) this builds the experiment's topology with that profile and
+runs --flows parallel TCP flows from the hosts of s1 (h1 -> h9, h2 -> h10,
+...) to the hosts of s3, so they all share the core links s1-s2 and
+s2-s3.  A ping probe h13 -> h17 (s4 -> s5) crosses the same core links
+but none of the busy host links: its RTT above the idle RTT is the
+queueing delay in the core.  Per profile:
+- oversubscription ratio of the flows: their hosts' upload capacity over
+  the slowest core link of their path (in their direction), next to the
+  edge switch ratio of topology.oversubscription()
+- aggregate throughput against what the links allow (min of the edge
+  and core capacity, TCP goodput), per-flow rates and Jain's index
+- probe RTT idle / loaded (p50, p99), the queueing delay, and probe loss
+
+    sudo python3 oversub.py --bw 10 --exp 1 --profiles fast-core core-2x uniform
+    python3 oversub.py --bw 10 --analyze oversub     # re-analyze the logs of an earlier run
+"""
+import argparse
+import json
+import math
+import os
+
+from analyze_logs import jain_index, parse_iperf_throughput, parse_ping_stats, percentiles
+from exp_common import log_path
+from planner import EXP_DELAYS, TCP_PAYLOAD_RATIO
+from procs import IPERF_PORT, Procs
+from timeline import parse_ping_timestamps
+from topology import (apply_profile, default_spec, direction_bw, load_profile, oversubscription,
+                      path_links, shortest_path)
+
+DEFAULT_PROFILES = ('fast-core', 'core-2x', 'uniform')
+
+# flows s1 -> s3 (all through s1-s2-s3), probe s4 -> s5 over the same core links
+SRC_HOSTS = ('h1', 'h2', 'h3', 'h4')
+DST_HOSTS = ('h9', 'h10', 'h11', 'h12')
+PROBE = ('h13', 'h17')
+
+TEST_S = 15
+# probe replies of the first seconds (slow start, queues still filling) are not counted
+SETTLE_S = 3
+PROBE_INTERVAL = 0.2
+IDLE_PINGS = 10
+
+
+def flow_capacity(spec, flows):
+    """
+    Capacity view of the flows [(src, dst), ...]: upload Mbit/s of their
+    hosts, the slowest core link they share and the path ratio.
+    """
+    offered = 0.0
+    core = math.inf
+    edge = 0.0
+    for src, dst in flows:
+        path = shortest_path(src, dst)
+        rates = [direction_bw(opts, d) for opts, d in path_links(spec, path)]
+        offered += rates[0]
+        # 每条 flow 自己的上限：两端 host link 中较慢的那个
+        edge += min(rates[0], rates[-1])
+        core = min([core] + rates[1:-1])
+    return {
+        "offered_Mbps": offered,
+        "core_Mbps": core,
+        "ratio": round(offered / core, 3),
+        "expected_Mbps": round(min(edge, core) * TCP_PAYLOAD_RATIO, 3),
+    }
+
+
+def run_profile(exp, bw, name, flows, log_dir):
+    "Idle probe, then the flows with the probe next to them, on the topology built with profile `name`."
+    from topology import build_network
+    profile = load_profile(name)
+    net = None
+    try:
+        net = build_network(bw, EXP_DELAYS[exp], profile=profile)
+        procs = Procs()
+        p_src, p_dst = net.get(*PROBE)
+        idle_log = log_path(log_dir, 'probe_idle.log')
+        p_src.cmd(f'ping -D -i {PROBE_INTERVAL} -c {IDLE_PINGS} {p_dst.IP()} > {idle_log}')
+        for src, dst in flows:
+            procs.start(net.get(dst), 'iperf -s > /dev/null 2>&1', group='servers', port=IPERF_PORT, sig='TERM')
+        probe_log = log_path(log_dir, 'probe_loaded.log')
+        procs.start(p_src, f'ping -D -i {PROBE_INTERVAL} -c {int(TEST_S / PROBE_INTERVAL)} {p_dst.IP()} '
+                           f'> {probe_log}', group='probe')
+        for src, dst in flows:
+            procs.start(net.get(src), f'iperf -c {net.get(dst).IP()} -t {TEST_S} -i 1 '
+                                      f'> {log_path(log_dir, f"flow_{src}_{dst}.log")} 2>&1', group='flows')
+        procs.wait('flows', timeout=TEST_S + 10)
+        procs.wait('probe', timeout=5)
+        procs.stop(label=f'oversub {name}')
+    finally:
+        if net is not None:
+            net.stop()
+
+
+def _settled_stats(path):
+    "ping stats, RTT percentiles only of the replies after SETTLE_S (ping -D timestamps)."
+    replies = parse_ping_timestamps(path)
+    stats = parse_ping_stats(path)
+    if replies:
+        t0 = replies[0][0]
+        rtts = [rtt for t, _seq, rtt in replies if t - t0 >= SETTLE_S]
+        stats["rtt_p50_ms"], stats["rtt_p99_ms"] = percentiles(rtts, (50, 99))
+    return stats
+
+
+def analyze_profile(exp, bw, name, flows, log_dir):
+    "Result row of one profile's logs."
+    spec = apply_profile(default_spec(delays=EXP_DELAYS[exp]), load_profile(name), bw)
+    rates = {f"{src}->{dst}": parse_iperf_throughput(os.path.join(log_dir, f'flow_{src}_{dst}.log'))
+             for src, dst in flows}
+    total = sum(v for v in rates.values() if not math.isnan(v))
+    cap = flow_capacity(spec, flows)
+    idle = parse_ping_stats(os.path.join(log_dir, 'probe_idle.log'))
+    loaded = _settled_stats(os.path.join(log_dir, 'probe_loaded.log'))
+    return dict(
+        cap,
+        exp=exp,
+        profile=name,
+        edge_oversubscription={sw: r["ratio"] for sw, r in sorted(oversubscription(spec).items())},
+        capped_links=spec["capped_links"],
+        flows=rates,
+        aggregate_Mbps=round(total, 3),
+        efficiency=round(total / cap["expected_Mbps"], 3) if cap["expected_Mbps"] else math.nan,
+        jain=jain_index(list(rates.values())),
+        idle_rtt_p50_ms=idle["rtt_p50_ms"],
+        rtt_p50_ms=loaded["rtt_p50_ms"],
+        rtt_p99_ms=loaded["rtt_p99_ms"],
+        queueing_ms=loaded["rtt_p50_ms"] - idle["rtt_p50_ms"],
+        probe_loss_pct=loaded["loss_pct"],
+    )
+
+
+def plot_sweep(rows, bw, filename):
+    import matplotlib.pyplot as plt
+    rows = sorted(rows, key=lambda r: r["ratio"])
+    ratios = [r["ratio"] for r in rows]
+    fig, axes = plt.subplots(1, 2, figsize=(11, 4))
+    axes[0].plot(ratios, [r["aggregate_Mbps"] for r in rows], marker='o', label="aggregate")
+    axes[0].plot(ratios, [r["expected_Mbps"] for r in rows], linestyle='--', label="link limit")
+    axes[1].plot(ratios, [r["rtt_p50_ms"] for r in rows], marker='o', label="probe RTT p50")
+    axes[1].plot(ratios, [r["rtt_p99_ms"] for r in rows], marker='o', label="probe RTT p99")
+    axes[1].plot(ratios, [r["idle_rtt_p50_ms"] for r in rows], linestyle='--', label="idle RTT p50")
+    for r in rows:
+        axes[0].annotate(r["profile"], (r["ratio"], r["aggregate_Mbps"]), fontsize='x-small')
+    for ax, ylabel in zip(axes, ("Throughput (Mbps)", "RTT (ms)")):
+        ax.set_xlabel("Oversubscription (offered / core capacity)")
+        ax.set_ylabel(ylabel)
+        ax.grid(True, linestyle='--', alpha=0.4)
+        ax.legend(fontsize='small')
+    fig.suptitle(f"Oversubscription sweep at {bw} Mbit/s edges")
+    fig.tight_layout()
+    fig.savefig(filename)
+    print(f"[INFO] Saved figure: {filename}")
+
+
+def print_table(rows):
+    print(f"\n{'profile':<12} {'ratio':>6} {'Mbps':>9} {'limit':>9} {'eff':>5} {'Jain':>5} "
+          f"{'idle ms':>8} {'p50 ms':>8} {'p99 ms':>8} {'queue ms':>8} {'loss %':>6}")
+    for r in sorted(rows, key=lambda r: r["ratio"]):
+        print(f"{r['profile']:<12} {r['ratio']:>6.2f} {r['aggregate_Mbps']:>9.2f} {r['expected_Mbps']:>9.2f} "
+              f"{r['efficiency']:>5.2f} {r['jain']:>5.2f} {r['idle_rtt_p50_ms']:>8.2f} "
+              f"{r['rtt_p50_ms']:>8.2f} {r['rtt_p99_ms']:>8.2f} {r['queueing_ms']:>8.2f} "
+              f"{r['probe_loss_pct']:>6.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput and latency against the edge/core oversubscription")
+    parser.add_argument('--bw', type=int, choices=(10, 500), default=10)
+    parser.add_argument('--exp', type=int, choices=(1, 3), default=1, help="topology variant (exp3: core delays)")
+    parser.add_argument('--profiles', nargs='+', default=list(DEFAULT_PROFILES),
+                        help="link profiles: topology.LINK_PROFILES presets or JSON files")
+    parser.add_argument('--flows', type=int, choices=range(1, len(SRC_HOSTS) + 1), default=len(SRC_HOSTS),
+                        help="parallel flows s1 -> s3")
+    parser.add_argument('--out', default='oversub')
+    parser.add_argument('--analyze', default=None, metavar='DIR',
+                        help="only re-analyze the logs of an earlier sweep in DIR")
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args(argv)
+
+    flows = list(zip(SRC_HOSTS, DST_HOSTS))[:args.flows]
+    out = args.analyze or args.out
+    for name in args.profiles:
+        load_profile(name)   # 早点报错
+
+    if not args.analyze:
+        from mininet.log import setLogLevel
+        setLogLevel('info')
+    rows = []
+    for name in args.profiles:
+        run_dir = os.path.join(out, f'exp{args.exp}_B{args.bw}M_{os.path.splitext(os.path.basename(name))[0]}')
+        if not args.analyze:
+            print(f"\n=== Oversubscription: exp{args.exp} at {args.bw} Mbit/s, profile {name}, "
+                  f"{len(flows)} flows ===")
+            run_profile(args.exp, args.bw, name, flows, run_dir)
+        rows.append(analyze_profile(args.exp, args.bw, name, flows, run_dir))
+
+    print_table(rows)
+    if not args.no_plot:
+        plot_sweep(rows, args.bw, log_path(out, f'oversub_B{args.bw}M.png'))
+    out_file = log_path(out, f'oversub_B{args.bw}M.json')
+    with open(out_file, 'w') as f:
+        json.dump({"bw_Mbps": args.bw, "exp": args.exp, "test_s": TEST_S, "rows": rows}, f, indent=2)
+    print(f"[INFO] Saved oversubscription sweep: {out_file}")
+
+
+if __name__ == '__main__':
+    main()
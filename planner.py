@@ -0,0 +1,279 @@
+"""
+BDP-aware experiment planner.
+
+Works out, from the topology and link parameters in topology.py, what a
+measurement between two hosts can achieve:
+- the path (fewest hops) and its bottleneck bandwidth: the slowest link
+  in the direction of the flow, with the run's link profile applied
+- the path RTT (the netem delays of every link in the forward and the
+  reverse direction, plus a small base RTT for the host / switch stack)
+- the bandwidth-delay product and the TCP window / socket buffers needed
+  to fill the path, i.e. the iperf -w value
+- the theoretical TCP / UDP goodput for a given window
+
+With "--window auto" the experiment scripts use this window for the TCP
+phase.  Run on a campaign directory, the planner compares what each test
+achieved with the theoretical rate (link-utilization efficiency).
+
+    python3 planner.py --bw 500 --exp 3 --profile asym-edge
+    python3 planner.py --log-dir campaigns/B500 --bw 500
+"""
+import argparse
+import json
+import math
+import os
+import re
+import subprocess
+
+from topology import (EXP3_DELAYS, HOST_SWITCH, LINK_PROFILES, apply_profile, default_spec, direction_bw,
+                      load_profile, path_links, shortest_path)
+
+# RTT of the path without netem delays (veth + OVS), ms
+BASE_RTT_MS = 0.1
+# window = BDP * headroom (ACK clocking, delayed ACKs, queueing)
+HEADROOM = 1.25
+# never set a window below this, smaller -w only hurts (it also turns off autotuning)
+MIN_WINDOW = 256 * 1024
+# goodput / link rate: TCP 1448 B payload per 1514 B frame (timestamps on),
+# iperf UDP 1470 B payload per 1512 B frame
+TCP_PAYLOAD_RATIO = 1448 / 1514
+UDP_PAYLOAD_RATIO = 1470 / 1512
+# IP + TCP headers with timestamps, Ethernet header (tc counts it, not the FCS)
+TCP_HEADERS = 52
+ETH_HEADER = 14
+
+# experiment -> core link delays
+EXP_DELAYS = {1: None, 2: None, 3: EXP3_DELAYS}
+
+_SIZE_RE = re.compile(r'^\s*([\d\.]+)\s*([KMG]?)B?\s*$', re.I)
+
+
+def parse_size(value):
+    "Bytes of an iperf size ('512K', '2M', '1048576')."
+    m = _SIZE_RE.match(str(value))
+    if not m:
+        raise ValueError(f"bad size: {value!r}")
+    scale = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}[m.group(2).upper()]
+    return int(float(m.group(1)) * scale)
+
+
+def format_size(nbytes):
+    "iperf -w value for a byte count, rounded up to whole K."
+    return f"{int(math.ceil(nbytes / 1024))}K"
+
+
+def delay_ms(value):
+    "netem delay ('20ms', '500us', '0.1s', 5) in ms."
+    m = re.match(r'^\s*([\d\.]+)\s*(us|ms|s)?\s*$', str(value))
+    scale = {'us': 1e-3, 'ms': 1.0, 's': 1e3, None: 1.0}[m.group(2)]
+    return float(m.group(1)) * scale
+
+
+def direction_delay_ms(opts, direction):
+    "netem delay (ms) of link opts in one direction ('up' / 'down'), 0 without one."
+    value = opts.get(direction, {}).get('delay', opts.get('delay'))
+    return delay_ms(value) if value is not None else 0.0
+
+
+def plan_path(bw, delays=None, src='h1', dst='h20', redundant='none', streams=1,
+              base_rtt_ms=BASE_RTT_MS, profile=None):
+    """
+    Path, RTT, BDP and the window / buffer sizes for a src -> dst
+    measurement at bw Mbit/s with a link profile (dict, see
+    topology.LINK_PROFILES; None = bw on every link).
+    """
+    spec = apply_profile(default_spec(redundant, delays), profile, bw)
+    path = shortest_path(src, dst, spec=spec)
+    links = path_links(spec, path)
+    reverse = {'up': 'down', 'down': 'up'}
+    bottleneck = min(direction_bw(opts, d) for opts, d in links)
+    one_way_ms = sum(direction_delay_ms(opts, d) for opts, d in links)
+    back_ms = sum(direction_delay_ms(opts, reverse[d]) for opts, d in links)
+    rtt_ms = one_way_ms + back_ms + base_rtt_ms
+    bdp = bottleneck * 1e6 * rtt_ms / 1e3 / 8
+    window = parse_size(format_size(max(bdp * HEADROOM / max(streams, 1), MIN_WINDOW)))
+    return {
+        "src": src,
+        "dst": dst,
+        "path": path,
+        "hops": len(links),
+        "bottleneck_Mbps": bottleneck,
+        "one_way_delay_ms": one_way_ms,
+        "rtt_ms": round(rtt_ms, 3),
+        "bdp_bytes": int(bdp),
+        "window_bytes": window,
+        "iperf_window": format_size(window),
+        # Linux 把 SO_RCVBUF/SO_SNDBUF 请求值翻倍，上限是 rmem_max / wmem_max
+        "rmem_max_needed": window,
+        "tcp_theoretical_Mbps": tcp_theoretical(bottleneck, rtt_ms, window * max(streams, 1)),
+        "udp_theoretical_Mbps": round(bottleneck * UDP_PAYLOAD_RATIO, 3),
+    }
+
+
+def tcp_payload_ratio(mtu=1500):
+    "TCP goodput / link rate at an MTU (TCP_PAYLOAD_RATIO for 1500)."
+    return (mtu - TCP_HEADERS) / (mtu + ETH_HEADER)
+
+
+def tcp_theoretical(bw, rtt_ms, window_bytes):
+    "Best TCP goodput (Mbit/s): link goodput, or window / RTT if that is lower."
+    link = bw * TCP_PAYLOAD_RATIO
+    if not window_bytes or not rtt_ms:
+        return round(link, 3)
+    return round(min(link, window_bytes * 8 / (rtt_ms / 1e3) / 1e6), 3)
+
+
+def resolve_window(value, bw, delays=None, streams=1, profile=None):
+    """
+    iperf -w for --window: None (kernel autotuning), a size like '2M', or
+    'auto' (from the plan of the network built with that link profile).
+    """
+    if value in (None, '', 'default'):
+        return None
+    if value != 'auto':
+        parse_size(value)   # 早点报错
+        return value
+    plan = plan_path(bw, delays, streams=streams, profile=profile)
+    print(f"[PLAN] h1 -> h20: bottleneck {plan['bottleneck_Mbps']:g} Mbit/s, RTT {plan['rtt_ms']:.1f} ms, "
+          f"BDP {plan['bdp_bytes'] / 1024:.0f} KB "
+          f"-> iperf -w {plan['iperf_window']} per stream")
+    return plan["iperf_window"]
+
+
+def _root_sysctl(key, value=None):
+    "Read (or set, then read) a sysctl of the root namespace; None if it cannot be read."
+    if value is not None:
+        subprocess.run(['sysctl', '-q', '-w', f'{key}={value}'], capture_output=True)
+    out = subprocess.run(['sysctl', '-n', key], capture_output=True, text=True).stdout.strip()
+    return int(out) if out.isdigit() else None
+
+
+def ensure_socket_buffers(hosts, window):
+    """
+    Raise net.core.rmem_max / wmem_max for the hosts if they would cap an
+    iperf -w window; returns the smallest limit in effect (bytes, None
+    without a window).  Kernels where these sysctls are not per network
+    namespace do not have them in the hosts: the root namespace's value is
+    the one the hosts' sockets get, so it is raised there instead.
+    """
+    if not window:
+        return None
+    need = parse_size(window)
+    effective = need
+    for host in hosts:
+        for key in ('net.core.rmem_max', 'net.core.wmem_max'):
+            cur = host.cmd(f'sysctl -n {key}').strip()
+            if cur.isdigit():
+                if int(cur) < need:
+                    host.cmd(f'sysctl -w {key}={need}')
+                    print(f"[PLAN] {host.name}: {key} {cur} -> {need}")
+                new = host.cmd(f'sysctl -n {key}').strip()
+                limit = int(new) if new.isdigit() else int(cur)
+            else:
+                # 不是 per-netns 的 sysctl：host 里读不到，用 root namespace 的
+                cur = _root_sysctl(key)
+                limit = cur
+                if cur is not None and cur < need:
+                    limit = _root_sysctl(key, need)
+                    if limit is not None and limit > cur:
+                        print(f"[PLAN] {key} (root namespace) {cur} -> {limit}")
+            if limit is None:
+                print(f"[WARN] {host.name}: cannot read {key}, iperf -w {window} may be capped")
+            elif limit < need:
+                print(f"[WARN] {host.name}: {key} is {limit}, iperf -w {window} is capped at {limit} bytes")
+                effective = min(effective, limit)
+    return effective
+
+
+def efficiency(metrics, exp_key, bw, delays=None, window=None, streams=1, profile=None,
+               socket_buffer_max=None):
+    """
+    Observed vs theoretical throughput of the TCP / UDP tests of one
+    experiment; socket_buffer_max (ensure_socket_buffers() of the run)
+    caps the window the kernel actually granted.
+    """
+    plan = plan_path(bw, delays, streams=streams, profile=profile)
+    granted = None
+    if window:
+        granted = parse_size(window)
+        if socket_buffer_max:
+            granted = min(granted, socket_buffer_max)
+    rows = []
+    for proto, theo in (("TCP", None), ("UDP", plan["udp_theoretical_Mbps"])):
+        if proto == "TCP":
+            # 没有 -w 时内核 autotuning，理论上限就是 link goodput
+            win = granted * max(streams, 1) if granted else None
+            theo = tcp_theoretical(plan["bottleneck_Mbps"], plan["rtt_ms"], win)
+        observed = metrics[exp_key][proto]["throughput_Mbps"]
+        rows.append({
+            "exp": exp_key,
+            "protocol": proto,
+            "rtt_ms": plan["rtt_ms"],
+            "bdp_bytes": plan["bdp_bytes"],
+            "window": window if proto == "TCP" else None,
+            "effective_window_bytes": granted if proto == "TCP" else None,
+            "theoretical_Mbps": theo,
+            "observed_Mbps": observed,
+            "efficiency": (observed / theo if theo and not math.isnan(observed) else math.nan),
+        })
+    return rows
+
+
+def print_plan(exp, plan):
+    print(f"exp{exp}: {' -> '.join(plan['path'])}")
+    print(f"  bottleneck {plan['bottleneck_Mbps']:g} Mbit/s, RTT {plan['rtt_ms']:.1f} ms, "
+          f"BDP {plan['bdp_bytes'] / 1024:.1f} KB")
+    print(f"  iperf -w {plan['iperf_window']} (needs net.core.rmem_max/wmem_max >= {plan['rmem_max_needed']}), "
+          f"TCP <= {plan['tcp_theoretical_Mbps']:.1f} Mbit/s, UDP <= {plan['udp_theoretical_Mbps']:.1f} Mbit/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Path RTT / BDP / window planner and efficiency report")
+    parser.add_argument('--bw', type=int, choices=(10, 500), default=10)
+    parser.add_argument('--exp', type=int, nargs='+', choices=(1, 2, 3), default=[1, 2, 3])
+    parser.add_argument('--streams', type=int, default=1)
+    parser.add_argument('--profile', default=None, metavar='NAME|FILE',
+                        help=f"link profile ({', '.join(sorted(LINK_PROFILES))} or a JSON file); "
+                             "with --log-dir each run's own profile is used")
+    parser.add_argument('--src', default='h1', choices=sorted(HOST_SWITCH))
+    parser.add_argument('--dst', default='h20', choices=sorted(HOST_SWITCH))
+    parser.add_argument('--log-dir', default=None,
+                        help="campaign directory: also report observed vs theoretical throughput")
+    args = parser.parse_args(argv)
+
+    profile = load_profile(args.profile)
+    plans = {}
+    for exp in args.exp:
+        plans[f"exp{exp}"] = plan_path(args.bw, EXP_DELAYS[exp], args.src, args.dst, streams=args.streams,
+                                       profile=profile)
+        print_plan(exp, plans[f"exp{exp}"])
+    result = {"bw_Mbps": args.bw, "streams": args.streams, "profile": profile, "plans": plans}
+
+    if args.log_dir:
+        from analyze_logs import collect_metrics, load_run_meta
+        metrics = collect_metrics(args.log_dir)
+        meta = load_run_meta(args.log_dir)
+        rows = []
+        for exp in args.exp:
+            m = meta.get(f"exp{exp}", {})
+            # meta 里记的是实际建网用的 profile（旧的 run 没有 → 全部 bw）
+            run_profile = m.get("link_profile", {}).get("profile") if m else profile
+            rows += efficiency(metrics, f"exp{exp}", m.get("bw_Mbps", args.bw), EXP_DELAYS[exp],
+                               m.get("window"), m.get("streams") or 1, run_profile,
+                               m.get("socket_buffer_max"))
+        print(f"\n{'exp':<5} {'proto':<5} {'window':>8} {'theory':>9} {'observed':>9} {'eff':>6}")
+        for r in rows:
+            print(f"{r['exp']:<5} {r['protocol']:<5} {r['window'] or '-':>8} {r['theoretical_Mbps']:>9.2f} "
+                  f"{r['observed_Mbps']:>9.2f} {r['efficiency']:>6.2f}")
+        result["efficiency"] = rows
+        out_file = os.path.join(args.log_dir, "planner.json")
+    else:
+        out_file = f"planner_B{args.bw}M.json"
+
+    with open(out_file, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"[INFO] Saved plan: {out_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+PID-tracked background processes of the experiment scripts.
+
+Servers, ping probes and background iperf clients are started in the
+background on the Mininet hosts.  The scripts used to clean up with
+`pkill iperf` / `pkill -INT ping` on every host between phases: two
+blocking shell round-trips per host, and since the hosts share one PID
+namespace, a pkill on one host also hits the processes of the others.
+Procs keeps the PID of everything it starts and, at the end of a phase:
+- signals the clients and probes with one `kill` (SIGINT by default, so
+  iperf clients and ping still print their summary),
+- waits until they are gone, then does the same for the servers (after
+  the clients, so UDP clients still get their server report), with
+  SIGKILL for anything still alive after `grace` s,
+- checks with `ss` that the server ports are free on their hosts, so the
+  next phase's servers can bind,
+and records how long the teardown took.
+
+    procs = Procs()
+    procs.start(h20, 'iperf -s -u > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')
+    procs.start(h1, f'ping -D -c 50 {ip} > {log}', name='ping h1->h20')
+    ...
+    procs.stop(label='exp1_udp')   # {"procs": 2, "killed": 0, "seconds": 0.08, ...}
+"""
+import math
+import re
+import threading
+import time
+
+# iperf2 的默认端口（TCP 和 UDP server 都是 5001）
+IPERF_PORT = 5001
+
+POLL_S = 0.05
+
+_PID_RE = re.compile(r'pid=(\d+)')
+_PS_RE = re.compile(r'^\s*(\d+)\s+(\S+)', re.M)
+
+
+class Procs(object):
+    """
+    Background processes started through start(), as dicts with the host,
+    PID, name, group, server port (None for clients) and stop signal.
+    Thread-safe, so a background.Replayer can start its clients while the
+    main thread runs the test.
+    """
+
+    def __init__(self, grace=2.0, port_timeout=2.0):
+        self.grace = grace
+        self.port_timeout = port_timeout
+        self.running = []
+        self.teardowns = []
+        self._lock = threading.Lock()
+
+    def start(self, host, cmd, name=None, group=None, port=None, sig='INT'):
+        """
+        Run `cmd` (including its own output redirect) in the background on
+        host and return its PID.  port: TCP/UDP port a server binds, checked
+        on stop(); sig: signal stop() sends first.
+        """
+        out = host.cmd(f'{cmd} & echo "pid=$!"')
+        m = _PID_RE.search(out)
+        if not m:
+            print(f"[WARN] No PID for '{cmd}' on {host.name}: {out.strip()!r}")
+            return None
+        proc = dict(host=host, pid=int(m.group(1)), name=name or cmd.split(' >')[0],
+                    group=group, port=port, sig=sig, started=time.time())
+        with self._lock:
+            self.running.append(proc)
+        return proc["pid"]
+
+    def _select(self, group):
+        with self._lock:
+            return [p for p in self.running if group is None or p["group"] == group]
+
+    @staticmethod
+    def _alive(shell, procs):
+        "The processes of procs still running (zombies count as gone), one `ps` for all."
+        if not procs:
+            return []
+        out = shell.cmd(f'ps -o pid=,stat= -p {",".join(str(p["pid"]) for p in procs)}')
+        running = {int(pid) for pid, stat in _PS_RE.findall(out) if not stat.startswith('Z')}
+        return [p for p in procs if p["pid"] in running]
+
+    @staticmethod
+    def _signal(shell, procs, sig=None):
+        "One shell command that sends every process its signal (or `sig`)."
+        by_sig = {}
+        for p in procs:
+            by_sig.setdefault(sig or p["sig"], []).append(str(p["pid"]))
+        shell.cmd('; '.join(f'kill -{s} {" ".join(pids)} 2>/dev/null' for s, pids in by_sig.items()))
+
+    def _wait(self, shell, procs, deadline):
+        "Poll until procs exited or the deadline passed; returns the ones still alive."
+        alive = self._alive(shell, procs)
+        while alive and time.time() < deadline:
+            time.sleep(POLL_S)
+            alive = self._alive(shell, alive)
+        return alive
+
+    def _end(self, shell, procs):
+        "Signal procs, wait, SIGKILL the rest; returns (exited before, killed)."
+        alive = self._alive(shell, procs)
+        exited = len(procs) - len(alive)
+        if not alive:
+            return exited, 0
+        self._signal(shell, alive)
+        alive = self._wait(shell, alive, time.time() + self.grace)
+        if alive:
+            print(f"[WARN] Still running after {self.grace} s, killing: "
+                  f"{', '.join(p['name'] for p in alive)}")
+            self._signal(shell, alive, 'KILL')
+            self._wait(shell, alive, time.time() + self.grace)
+        return exited, len(alive)
+
+    def _ports_free(self, procs, deadline):
+        "True once no server port of procs is bound on its host any more."
+        busy = list({(p["host"].name, p["port"]): p for p in procs if p["port"]}.values())
+        while busy:
+            busy = [p for p in busy if p["host"].cmd(f'ss -Hltun "sport = :{p["port"]}"').strip()]
+            if not busy or time.time() >= deadline:
+                break
+            time.sleep(POLL_S)
+        for p in busy:
+            print(f"[WARN] Port {p['port']} still bound on {p['host'].name} after teardown")
+        return not busy
+
+    def wait(self, group=None, timeout=None):
+        "Wait for the processes of `group` (None = all) to exit on their own; True if they all did."
+        procs = self._select(group)
+        if not procs:
+            return True
+        deadline = time.time() + timeout if timeout is not None else math.inf
+        return not self._wait(procs[0]["host"], procs, deadline)
+
+    def stop(self, group=None, label=None):
+        """
+        End the processes of `group` (None = all): clients and probes first,
+        then the servers, then wait for their ports.  Returns the teardown
+        record (also kept in self.teardowns), None if nothing was running.
+        """
+        t0 = time.time()
+        with self._lock:
+            procs = [p for p in self.running if group is None or p["group"] == group]
+            self.running = [p for p in self.running if p not in procs]
+        if not procs:
+            return None
+        # host 之间共享 PID namespace，所有 kill / ps 都从一个 shell 发出
+        shell = procs[0]["host"]
+        exited, killed = self._end(shell, [p for p in procs if not p["port"]])
+        s_exited, s_killed = self._end(shell, [p for p in procs if p["port"]])
+        record = dict(label=label or group or 'all', procs=len(procs), exited=exited + s_exited,
+                      killed=killed + s_killed,
+                      ports_free=self._ports_free(procs, time.time() + self.port_timeout),
+                      seconds=round(time.time() - t0, 3))
+        self.teardowns.append(record)
+        print(f"[INFO] Teardown {record['label']}: {record['procs']} processes "
+              f"({record['exited']} had exited, {record['killed']} killed) in {record['seconds']:.2f} s")
+        return record
+
+    def summary(self):
+        "Teardown totals for the run metadata."
+        seconds = [t["seconds"] for t in self.teardowns]
+        return {
+            "teardowns": len(self.teardowns),
+            "total_s": round(sum(seconds), 3),
+            "max_s": max(seconds, default=0.0),
+            "killed": sum(t["killed"] for t in self.teardowns),
+            "ports_busy": sum(not t["ports_free"] for t in self.teardowns),
+            "phases": self.teardowns,
+        }
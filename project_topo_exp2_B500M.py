@@ -1,90 +1,45 @@
-from mininet.net import Mininet
-from mininet.node import OVSSwitch
+import argparse
+import time
+
 from mininet.cli import CLI
-from mininet.link import TCLink
 from mininet.log import setLogLevel
 
-def create_network():
-    "Create the 20-host, 5-switch topology (standalone switches)."
-    # 使用 TCLink 作为默认 link 类型
-    net = Mininet(controller=None, link=TCLink, switch=OVSSwitch)
-
-    print("*** Creating switches (standalone mode)")
-    s1 = net.addSwitch('s1', failMode='standalone')
-    s2 = net.addSwitch('s2', failMode='standalone')
-    s3 = net.addSwitch('s3', failMode='standalone')
-    s4 = net.addSwitch('s4', failMode='standalone')
-    s5 = net.addSwitch('s5', failMode='standalone')
-
-    print("*** Creating hosts")
-    h1 = net.addHost('h1')
-    h2 = net.addHost('h2')
-    h3 = net.addHost('h3')
-    h4 = net.addHost('h4')
-    h5 = net.addHost('h5')
-    h6 = net.addHost('h6')
-    h7 = net.addHost('h7')
-    h8 = net.addHost('h8')
-    h9 = net.addHost('h9')
-    h10 = net.addHost('h10')
-    h11 = net.addHost('h11')
-    h12 = net.addHost('h12')
-    h13 = net.addHost('h13')
-    h14 = net.addHost('h14')
-    h15 = net.addHost('h15')
-    h16 = net.addHost('h16')
-    h17 = net.addHost('h17')
-    h18 = net.addHost('h18')
-    h19 = net.addHost('h19')
-    h20 = net.addHost('h20')
-
-   
-    linkopts = dict(bw=500)   # bw 单位是 Mbit/s
-
-    print("*** Creating links host<->switch")
-    net.addLink(h1, s1, **linkopts)
-    net.addLink(h2, s1, **linkopts)
-    net.addLink(h3, s1, **linkopts)
-    net.addLink(h4, s1, **linkopts)
-
-    net.addLink(h5, s2, **linkopts)
-    net.addLink(h6, s2, **linkopts)
-    net.addLink(h7, s2, **linkopts)
-    net.addLink(h8, s2, **linkopts)
-
-    net.addLink(h9, s3, **linkopts)
-    net.addLink(h10, s3, **linkopts)
-    net.addLink(h11, s3, **linkopts)
-    net.addLink(h12, s3, **linkopts)
-
-    net.addLink(h13, s4, **linkopts)
-    net.addLink(h14, s4, **linkopts)
-    net.addLink(h15, s4, **linkopts)
-    net.addLink(h16, s4, **linkopts)
-
-    net.addLink(h17, s5, **linkopts)
-    net.addLink(h18, s5, **linkopts)
-    net.addLink(h19, s5, **linkopts)
-    net.addLink(h20, s5, **linkopts)
-
-    print("*** Creating links between switches")
-    # 这里也用同样的带宽（你也可以单独定义 core_linkopts）
-    net.addLink(s1, s4, **linkopts)
-    net.addLink(s3, s5, **linkopts)
-    net.addLink(s1, s2, **linkopts)
-    net.addLink(s2, s3, **linkopts)
-
-    print("*** Starting network")
-    net.start()
-    return net
-
-
-def run_experiment_2(net):
+from adaptive import adaptive_from_args, run_test
+from archive import compress_run, new_run_dir
+from background import add_background_args, background_from_args
+from calibrate import add_calibration_args, calibration_from_args
+from exp_common import (PHASES, add_run_args, event_log, log_path, probe_cmd,
+                        resolve_duration, tcp_client_cmd, tcp_server_cmd, write_run_meta)
+from hops import start_hop_probes
+from live import live_from_args
+from planner import ensure_socket_buffers, resolve_window
+from procs import IPERF_PORT, Procs
+from topology import build_network, load_profile, profile_info
+
+def create_network(isolation=None, profile=None):
+    "Create the 20-host, 5-switch topology (standalone switches, optional CPU isolation and link profile)."
+    return build_network(bw=500, isolation=isolation, profile=profile)
+
+
+def run_experiment_2(net, cc=None, streams=1, duration=10, adaptive=None, live=None,
+                     log_dir='.', phases=PHASES, probe='default', window=None,
+                     hop_probes=False, background=None, procs=None):
     """
     Experiment 2 (high-load / congested):
     - Main measured flow: h1 -> h20
     - Background flows to create congestion: h4 -> h3, h6 -> h5
     - 对 TCP / UDP: throughput 来自 iperf，RTT / loss 来自并发 ping
+    - cc / streams: congestion control and parallel streams of the main TCP flow
+    - duration: length of the TCP phase in s (the concurrent ping is sized to match)
+    - adaptive: adaptive.Adaptive to stop each test once its metric converged
+    - live: live.Live to print rolling metrics and abort unhealthy tests
+    - probe: rate of the concurrent ping, see exp_common.PROBE_MODES
+    - window: iperf -w of the TCP phase (None = kernel autotuning)
+    - hop_probes: also ping a host on every switch of the path (see hops.py)
+    - background: background.Background that replaces the two constant
+      background flows (None = h4 -> h3, h6 -> h5 as below)
+    - procs: procs.Procs that tracks the background processes (new one if None)
+    - phases: subset of ('tcp', 'udp', 'icmp') to run
     """
     # 现在主测量端点是 h1 和 h20
     h1, h20, h3, h4, h5, h6 = net.get('h1', 'h20', 'h3', 'h4', 'h5', 'h6')
@@ -94,112 +49,188 @@ def run_experiment_2(net):
     bkg2_ip = h5.IP()
     print(f"\n[Info] h20 IP = {server_ip}, h3 IP = {bkg1_ip}, h5 IP = {bkg2_ip}")
 
-    def kill_all():
-        "Kill any leftover iperf/ping in these hosts."
-        for h in [h1, h20, h3, h4, h5, h6]:
-            h.cmd('pkill iperf')
-            h.cmd('pkill ping')
+    # flow start/stop times, merged with ping -D timestamps by timeline.py
+    events = event_log(log_dir, 'exp2')
+
+    # every server / probe / background client is tracked by PID (procs.py)
+    procs = procs if procs is not None else Procs()
+
+    def kill_all(phase):
+        "End the servers, probes and background flows of a phase and wait for their ports."
+        events.stop_all()
+        procs.stop(label=f'exp2_{phase}')
 
     # ========================
     # 1) TCP under high load + concurrent ping
     # ========================
-    print("\n=== Experiment 2 (High-load): TCP h1 -> h20 with background traffic + ping ===")
-    kill_all()
-
-    # Start TCP servers
-    h20.cmd('iperf -s &')   # main flow server
-    h3.cmd('iperf -s &')    # background server 1
-    h5.cmd('iperf -s &')    # background server 2
-
-    # Start background TCP clients (longer duration, high load)
-    # h4 -> h3, h6 -> h5
-    h4.cmd(f'iperf -c {bkg1_ip} -t 20 &')
-    h6.cmd(f'iperf -c {bkg2_ip} -t 20 &')
-
-    # Start ping concurrently from h1 to h20 (RTT/loss during TCP flow)
-    h1.cmd(f'ping -i 0.2 -c 50 {server_ip} > exp2_ping_during_tcp_h1_h20.log &')
-
-    # Main TCP measurement (h1 -> h20)
-    tcp_output = h1.cmd(f'iperf -c {server_ip} -t 10')
-
-    kill_all()
-
-    print("--- TCP raw output (exp2) ---")
-    print(tcp_output)
-    with open('exp2_tcp_h1_h20.log', 'w') as f:
-        f.write(tcp_output)
-    print("Saved TCP log to exp2_tcp_h1_h20.log")
-    print("Saved ping-during-TCP log to exp2_ping_during_tcp_h1_h20.log")
+    if 'tcp' in phases:
+        print(f"\n=== Experiment 2 (High-load): TCP h1 -> h20 with background traffic + ping (cc={cc or 'default'}, P={streams}) ===")
+        # Start TCP servers
+        procs.start(h20, f'{tcp_server_cmd(window)} > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')   # main flow server
+        bg = None
+        if background is None:
+            procs.start(h3, 'iperf -s > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')    # background server 1
+            procs.start(h5, 'iperf -s > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')    # background server 2
+
+            # Start background TCP clients (longer duration, high load)
+            # h4 -> h3, h6 -> h5
+            bkg1_log = log_path(log_dir, 'exp2_tcp_bg_h4_h3.log')
+            bkg2_log = log_path(log_dir, 'exp2_tcp_bg_h6_h5.log')
+            procs.start(h4, f'iperf -c {bkg1_ip} -t 20 -i 1 > {bkg1_log} 2>&1', name='iperf h4->h3')
+            procs.start(h6, f'iperf -c {bkg2_ip} -t 20 -i 1 > {bkg2_log} 2>&1', name='iperf h6->h5')
+            events.start('h4->h3', kind='background', proto='tcp', phase='tcp')
+            events.start('h6->h5', kind='background', proto='tcp', phase='tcp')
+        else:
+            bg = background.start(net, 'tcp', 20, log_dir, 'exp2', 'tcp', events, procs)
+
+        # Start ping concurrently from h1 to h20 (RTT/loss during TCP flow)
+        ping_log = log_path(log_dir, 'exp2_ping_during_tcp_h1_h20.log')
+        procs.start(h1, f'{probe_cmd(server_ip, duration, adaptive, probe)} > {ping_log}', name='ping h1->h20')
+        if hop_probes:
+            start_hop_probes(net, 'exp2', 'tcp', log_dir, duration, adaptive, probe, procs)
+
+        # Main TCP measurement (h1 -> h20)
+        events.start('h1->h20', kind='main', proto='tcp', phase='tcp')
+        tcp_output = run_test(h1, tcp_client_cmd(server_ip, duration, cc, streams, window=window),
+                              adaptive, 'exp2_tcp', duration, streams, log_dir,
+                              live, ping_log)
+        events.stop('h1->h20')
+        if bg is not None:
+            bg.stop()
+
+        kill_all('tcp')
+
+        print("--- TCP raw output (exp2) ---")
+        print(tcp_output)
+        tcp_log = log_path(log_dir, 'exp2_tcp_h1_h20.log')
+        with open(tcp_log, 'w') as f:
+            f.write(tcp_output)
+        print(f"Saved TCP log to {tcp_log}")
+        print(f"Saved ping-during-TCP log to {ping_log}")
 
     # ========================
     # 2) UDP under high load + concurrent ping
     # ========================
-    print("\n=== Experiment 2 (High-load): UDP h1 -> h20 with background traffic + ping ===")
-    kill_all()
-
-    # Start UDP servers
-    h20.cmd('iperf -s -u &')
-    h3.cmd('iperf -s -u &')
-    h5.cmd('iperf -s -u &')
-
-    # Background UDP clients with higher rate
-    h4.cmd(f'iperf -c {bkg1_ip} -u -b 1000M -t 20 &')
-    h6.cmd(f'iperf -c {bkg2_ip} -u -b 1000M -t 20 &')
-
-    # Ping during UDP flow (h1 -> h20)
-    h1.cmd(f'ping -i 0.2 -c 50 {server_ip} > exp2_ping_during_udp_h1_h20.log &')
-
-    # Main UDP measurement (h1 -> h20)
- 
-    udp_output = h1.cmd(f'iperf -c {server_ip} -u -b 500M -t 10')
-
-    kill_all()
-
-    print("--- UDP raw output (exp2) ---")
-    print(udp_output)
-    with open('exp2_udp_h1_h20.log', 'w') as f:
-        f.write(udp_output)
-    print("Saved UDP log to exp2_udp_h1_h20.log")
-    print("Saved ping-during-UDP log to exp2_ping_during_udp_h1_h20.log")
+    if 'udp' in phases:
+        print("\n=== Experiment 2 (High-load): UDP h1 -> h20 with background traffic + ping ===")
+        # Start UDP servers
+        procs.start(h20, 'iperf -s -u > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')
+        bg = None
+        if background is None:
+            procs.start(h3, 'iperf -s -u > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')
+            procs.start(h5, 'iperf -s -u > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')
+
+            # Background UDP clients with higher rate
+            bkg1_log = log_path(log_dir, 'exp2_udp_bg_h4_h3.log')
+            bkg2_log = log_path(log_dir, 'exp2_udp_bg_h6_h5.log')
+            procs.start(h4, f'iperf -c {bkg1_ip} -u -b 1000M -t 20 -i 1 > {bkg1_log} 2>&1', name='iperf h4->h3')
+            procs.start(h6, f'iperf -c {bkg2_ip} -u -b 1000M -t 20 -i 1 > {bkg2_log} 2>&1', name='iperf h6->h5')
+            events.start('h4->h3', kind='background', proto='udp', phase='udp')
+            events.start('h6->h5', kind='background', proto='udp', phase='udp')
+        else:
+            bg = background.start(net, 'udp', 20, log_dir, 'exp2', 'udp', events, procs)
+
+        # Ping during UDP flow (h1 -> h20)
+        ping_log = log_path(log_dir, 'exp2_ping_during_udp_h1_h20.log')
+        procs.start(h1, f'{probe_cmd(server_ip, 10, adaptive, probe)} > {ping_log}', name='ping h1->h20')
+        if hop_probes:
+            start_hop_probes(net, 'exp2', 'udp', log_dir, 10, adaptive, probe, procs)
+
+        # Main UDP measurement (h1 -> h20)
+        events.start('h1->h20', kind='main', proto='udp', phase='udp')
+        udp_output = run_test(h1, f'iperf -c {server_ip} -u -b 500M -t 10 -i 1',
+                              adaptive, 'exp2_udp', 10, log_dir=log_dir,
+                              live=live, probe_log=ping_log)
+        events.stop('h1->h20')
+        if bg is not None:
+            bg.stop()
+
+        kill_all('udp')
+
+        print("--- UDP raw output (exp2) ---")
+        print(udp_output)
+        udp_log = log_path(log_dir, 'exp2_udp_h1_h20.log')
+        with open(udp_log, 'w') as f:
+            f.write(udp_output)
+        print(f"Saved UDP log to {udp_log}")
+        print(f"Saved ping-during-UDP log to {ping_log}")
 
     # ==============================
     # 3) ICMP ping-only under high load
     # ==============================
-    print("\n=== Experiment 2 (High-load): ICMP ping-only h1 -> h20 with background traffic ===")
-    kill_all()
-
-    # Use background UDP flows to create load while we only ping
-    h3.cmd('iperf -s -u &')
-    h5.cmd('iperf -s -u &')
-    h4.cmd(f'iperf -c {bkg1_ip} -u -b 500M -t 20 &')
-    h6.cmd(f'iperf -c {bkg2_ip} -u -b 500M -t 20 &')
-
-    # Ping under high load (no main iperf from h1)
-    ping_output = h1.cmd(f'ping -c 20 {server_ip}')
-
-    kill_all()
-
-    print("--- Ping-only raw output (exp2) ---")
-    print(ping_output)
-    with open('exp2_ping_h1_h20.log', 'w') as f:
-        f.write(ping_output)
-    print("Saved ping-only-under-load log to exp2_ping_h1_h20.log")
-
-
-
-def main():
+    if 'icmp' in phases:
+        print("\n=== Experiment 2 (High-load): ICMP ping-only h1 -> h20 with background traffic ===")
+        # Use background UDP flows to create load while we only ping
+        bg = None
+        if background is None:
+            procs.start(h3, 'iperf -s -u > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')
+            procs.start(h5, 'iperf -s -u > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')
+            bkg1_log = log_path(log_dir, 'exp2_icmp_bg_h4_h3.log')
+            bkg2_log = log_path(log_dir, 'exp2_icmp_bg_h6_h5.log')
+            procs.start(h4, f'iperf -c {bkg1_ip} -u -b 500M -t 20 -i 1 > {bkg1_log} 2>&1', name='iperf h4->h3')
+            procs.start(h6, f'iperf -c {bkg2_ip} -u -b 500M -t 20 -i 1 > {bkg2_log} 2>&1', name='iperf h6->h5')
+            events.start('h4->h3', kind='background', proto='udp', phase='icmp')
+            events.start('h6->h5', kind='background', proto='udp', phase='icmp')
+        else:
+            bg = background.start(net, 'udp', 20, log_dir, 'exp2', 'icmp', events, procs)
+
+        # Ping under high load (no main iperf from h1)
+        ping_output = run_test(h1, f'ping -D -c 20 {server_ip}',
+                               adaptive, 'exp2_ping', 20, log_dir=log_dir, live=live)
+        if bg is not None:
+            bg.stop()
+
+        kill_all('icmp')
+
+        print("--- Ping-only raw output (exp2) ---")
+        print(ping_output)
+        ping_log = log_path(log_dir, 'exp2_ping_h1_h20.log')
+        with open(ping_log, 'w') as f:
+            f.write(ping_output)
+        print(f"Saved ping-only-under-load log to {ping_log}")
+
+
+
+def main(argv=None):
+    args = add_calibration_args(add_background_args(add_run_args(argparse.ArgumentParser()))).parse_args(argv)
     net = None
     try:
-        net = create_network()
+        profile = load_profile(args.profile)
+        net = create_network(args.isolation, profile)
         # Optional sanity check
         print("\n*** Quick pingall (optional sanity check)")
         net.pingAll()
+        # per-link pre-flight check (cached per topology and machine, see calibrate.py)
+        calibration = calibration_from_args(args, net, 500, None)
 
         # Run high-load / congested experiment
-        run_experiment_2(net)
-
-        print("\n*** Entering Mininet CLI (you can inspect hosts/logs)")
-        CLI(net)
+        duration = resolve_duration(args.tcp_duration, 'exp2', args.log_dir)
+        window = resolve_window(args.window, 500, None, args.streams, profile)
+        socket_buffer_max = ensure_socket_buffers(net.get('h1', 'h20'), window)
+        log_dir = new_run_dir(args.archive, 'exp2', 500) if args.archive else args.log_dir
+        # 和固定的 background 一样：UDP phase 1000M，ICMP phase 500M
+        background = background_from_args(args, udp_rate={'udp': 1000, 'icmp': 500})
+        procs = Procs()
+        started = time.time()
+        run_experiment_2(net, cc=args.cc, streams=args.streams, duration=duration,
+                         adaptive=adaptive_from_args(args), live=live_from_args(args),
+                         log_dir=log_dir, phases=args.phases, probe=args.probe,
+                         window=window, hop_probes=args.hop_probes, procs=procs,
+                         background=background)
+        write_run_meta(log_dir, 'exp2', 500, started, time.time(),
+                       cc=args.cc, streams=args.streams, tcp_duration_s=duration,
+                       adaptive=args.adaptive, phases=args.phases, probe=args.probe,
+                       isolation=args.isolation, window=window, socket_buffer_max=socket_buffer_max,
+                       hop_probes=args.hop_probes, teardown=procs.summary(),
+                       calibration=calibration,
+                       link_profile=dict(profile_info(500, profile, None), name=args.profile),
+                       background=background.describe() if background else None)
+        if args.archive:
+            compress_run(log_dir, args.codec)
+
+        if not args.no_cli:
+            print("\n*** Entering Mininet CLI (you can inspect hosts/logs)")
+            CLI(net)
     finally:
         if net is not None:
             net.stop()
@@ -207,4 +238,3 @@ def main():
 if __name__ == '__main__':
     setLogLevel('info')
     main()
-
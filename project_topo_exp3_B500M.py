@@ -1,152 +1,153 @@
-from mininet.net import Mininet
-from mininet.node import OVSSwitch
+import argparse
+import time
+
 from mininet.cli import CLI
-from mininet.link import TCLink
 from mininet.log import setLogLevel
 
-def create_network():
-    "Create the 20-host, 5-switch topology (standalone switches)."
-    net = Mininet(controller=None, link=TCLink, switch=OVSSwitch)
-
-    print("*** Creating switches (standalone mode)")
-    s1 = net.addSwitch('s1', failMode='standalone')
-    s2 = net.addSwitch('s2', failMode='standalone')
-    s3 = net.addSwitch('s3', failMode='standalone')
-    s4 = net.addSwitch('s4', failMode='standalone')
-    s5 = net.addSwitch('s5', failMode='standalone')
-
-    print("*** Creating hosts")
-    h1 = net.addHost('h1')
-    h2 = net.addHost('h2')
-    h3 = net.addHost('h3')
-    h4 = net.addHost('h4')
-    h5 = net.addHost('h5')
-    h6 = net.addHost('h6')
-    h7 = net.addHost('h7')
-    h8 = net.addHost('h8')
-    h9 = net.addHost('h9')
-    h10 = net.addHost('h10')
-    h11 = net.addHost('h11')
-    h12 = net.addHost('h12')
-    h13 = net.addHost('h13')
-    h14 = net.addHost('h14')
-    h15 = net.addHost('h15')
-    h16 = net.addHost('h16')
-    h17 = net.addHost('h17')
-    h18 = net.addHost('h18')
-    h19 = net.addHost('h19')
-    h20 = net.addHost('h20')
-    # 统一带宽配置：10 Mbit/s
-    linkopts = dict(bw=500)   # bw 单位是 Mbit/s
-    
-    print("*** Creating links host<->switch")
-    net.addLink(h1, s1, **linkopts)
-    net.addLink(h2, s1, **linkopts)
-    net.addLink(h3, s1, **linkopts)
-    net.addLink(h4, s1, **linkopts)
-
-    net.addLink(h5, s2, **linkopts)
-    net.addLink(h6, s2, **linkopts)
-    net.addLink(h7, s2, **linkopts)
-    net.addLink(h8, s2, **linkopts)
-
-    net.addLink(h9, s3, **linkopts)
-    net.addLink(h10, s3, **linkopts)
-    net.addLink(h11, s3, **linkopts)
-    net.addLink(h12, s3, **linkopts)
-
-    net.addLink(h13, s4, **linkopts)
-    net.addLink(h14, s4, **linkopts)
-    net.addLink(h15, s4, **linkopts)
-    net.addLink(h16, s4, **linkopts)
-
-    net.addLink(h17, s5, **linkopts)
-    net.addLink(h18, s5, **linkopts)
-    net.addLink(h19, s5, **linkopts)
-    net.addLink(h20, s5, **linkopts)
-
-    print("*** Creating links between switches")
-    net.addLink(s1, s4, **linkopts)
-    net.addLink(s3, s5, **linkopts, delay='20ms')
-    net.addLink(s1, s2, **linkopts, delay='20ms')
-    net.addLink(s2, s3, **linkopts)
-
-    print("*** Starting network")
-    net.start()
-    return net
-
-def run_experiment_3(net):
-    "Experiment 3 (delay topology): TCP, UDP, ICMP between h1 and h20."
+from adaptive import adaptive_from_args, run_test
+from archive import compress_run, new_run_dir
+from calibrate import add_calibration_args, calibration_from_args
+from exp_common import (PHASES, add_run_args, event_log, log_path, probe_cmd,
+                        resolve_duration, tcp_client_cmd, tcp_server_cmd, write_run_meta)
+from hops import start_hop_probes
+from live import live_from_args
+from planner import ensure_socket_buffers, resolve_window
+from procs import IPERF_PORT, Procs
+from topology import EXP3_DELAYS, build_network, load_profile, profile_info
+
+def create_network(isolation=None, profile=None):
+    "Create the 20-host, 5-switch topology (standalone switches, optional CPU isolation and link profile)."
+    # s1-s2 和 s3-s5 加 20ms delay
+    return build_network(bw=500, delays=EXP3_DELAYS, isolation=isolation, profile=profile)
+
+def run_experiment_3(net, cc=None, streams=1, duration=10, adaptive=None, live=None,
+                     log_dir='.', phases=PHASES, probe='default', window=None,
+                     hop_probes=False, procs=None):
+    """
+    Experiment 3 (delay topology): TCP, UDP, ICMP between h1 and h20.
+    - cc / streams: congestion control and parallel streams of the TCP phase
+    - duration: length of the TCP phase in s (the concurrent ping is sized to match)
+    - adaptive: adaptive.Adaptive to stop each test once its metric converged
+    - live: live.Live to print rolling metrics and abort unhealthy tests
+    - probe: rate of the concurrent ping, see exp_common.PROBE_MODES
+    - window: iperf -w of the TCP phase (None = kernel autotuning)
+    - hop_probes: also ping a host on every switch of the path (see hops.py)
+    - procs: procs.Procs that tracks the background processes (new one if None)
+    - phases: subset of ('tcp', 'udp', 'icmp') to run
+    """
     h1 = net.get('h1')
     h20 = net.get('h20')
 
     server_ip = h20.IP()
     print(f"\n[Info] h20 IP address = {server_ip}")
 
-    # Helper: kill old iperf/ping
-    h1.cmd('pkill iperf'); h1.cmd('pkill ping')
-    h20.cmd('pkill iperf'); h20.cmd('pkill ping')
+    # servers and probes are tracked by PID and ended at the end of each phase
+    procs = procs if procs is not None else Procs()
+
+    # flow start/stop times, merged with ping -D timestamps by timeline.py
+    events = event_log(log_dir, 'exp3')
 
     # ===== TCP + ping (RTT/loss during TCP flow, under delay topology) =====
-    print("\n=== Experiment 3 (delay): TCP h1 -> h20 (with concurrent ping) ===")
-    h20.cmd('iperf -s &')   # server on h20
-    h1.cmd(f'ping -i 0.2 -c 50 {server_ip} > exp3_ping_during_tcp_h1_h20.log &')
-
-    # TCP client on h1
-    tcp_output = h1.cmd(f'iperf -c {server_ip} -t 10')
-    h20.cmd('pkill iperf')
-    h1.cmd('pkill ping')
-
-    print("--- TCP raw output (exp3) ---")
-    print(tcp_output)
-    with open('exp3_tcp_h1_h20.log', 'w') as f:
-        f.write(tcp_output)
-    print("Saved TCP log to exp3_tcp_h1_h20.log")
-    print("Saved ping-during-TCP log to exp3_ping_during_tcp_h1_h20.log")
+    if 'tcp' in phases:
+        print(f"\n=== Experiment 3 (delay): TCP h1 -> h20 (with concurrent ping, cc={cc or 'default'}, P={streams}) ===")
+        procs.start(h20, f'{tcp_server_cmd(window)} > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')   # server on h20
+        ping_log = log_path(log_dir, 'exp3_ping_during_tcp_h1_h20.log')
+        procs.start(h1, f'{probe_cmd(server_ip, duration, adaptive, probe)} > {ping_log}', name='ping h1->h20')
+        if hop_probes:
+            start_hop_probes(net, 'exp3', 'tcp', log_dir, duration, adaptive, probe, procs)
+
+        # TCP client on h1
+        events.start('h1->h20', kind='main', proto='tcp', phase='tcp')
+        tcp_output = run_test(h1, tcp_client_cmd(server_ip, duration, cc, streams, window=window),
+                              adaptive, 'exp3_tcp', duration, streams, log_dir,
+                              live, ping_log)
+        events.stop('h1->h20')
+        procs.stop(label='exp3_tcp')
+
+        print("--- TCP raw output (exp3) ---")
+        print(tcp_output)
+        tcp_log = log_path(log_dir, 'exp3_tcp_h1_h20.log')
+        with open(tcp_log, 'w') as f:
+            f.write(tcp_output)
+        print(f"Saved TCP log to {tcp_log}")
+        print(f"Saved ping-during-TCP log to {ping_log}")
 
     # ===== UDP + ping (RTT/loss during UDP flow, under delay topology) =====
-    print("\n=== Experiment 3 (delay): UDP h1 -> h20 (with concurrent ping) ===")
-    h20.cmd('pkill iperf'); h1.cmd('pkill iperf'); h1.cmd('pkill ping')
-    h20.cmd('iperf -s -u &')  # UDP server on h20
-
-    h1.cmd(f'ping -i 0.2 -c 50 {server_ip} > exp3_ping_during_udp_h1_h20.log &')
-
-    # 这里还是 5M，如果之后你统一想改大一点可以再调
-    udp_output = h1.cmd(f'iperf -c {server_ip} -u -b 500M -t 10')
-    h20.cmd('pkill iperf')
-    h1.cmd('pkill ping')
-
-    print("--- UDP raw output (exp3) ---")
-    print(udp_output)
-    with open('exp3_udp_h1_h20.log', 'w') as f:
-        f.write(udp_output)
-    print("Saved UDP log to exp3_udp_h1_h20.log")
-    print("Saved ping-during-UDP log to exp3_ping_during_udp_h1_h20.log")
+    if 'udp' in phases:
+        print("\n=== Experiment 3 (delay): UDP h1 -> h20 (with concurrent ping) ===")
+        procs.start(h20, 'iperf -s -u > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')  # UDP server on h20
+
+        ping_log = log_path(log_dir, 'exp3_ping_during_udp_h1_h20.log')
+        procs.start(h1, f'{probe_cmd(server_ip, 10, adaptive, probe)} > {ping_log}', name='ping h1->h20')
+        if hop_probes:
+            start_hop_probes(net, 'exp3', 'udp', log_dir, 10, adaptive, probe, procs)
+
+        # 这里还是 5M，如果之后你统一想改大一点可以再调
+        events.start('h1->h20', kind='main', proto='udp', phase='udp')
+        udp_output = run_test(h1, f'iperf -c {server_ip} -u -b 500M -t 10',
+                              adaptive, 'exp3_udp', 10, log_dir=log_dir,
+                              live=live, probe_log=ping_log)
+        events.stop('h1->h20')
+        procs.stop(label='exp3_udp')
+
+        print("--- UDP raw output (exp3) ---")
+        print(udp_output)
+        udp_log = log_path(log_dir, 'exp3_udp_h1_h20.log')
+        with open(udp_log, 'w') as f:
+            f.write(udp_output)
+        print(f"Saved UDP log to {udp_log}")
+        print(f"Saved ping-during-UDP log to {ping_log}")
 
     # ===== 纯 ICMP baseline under delay topology =====
-    print("\n=== Experiment 3 (delay): ICMP ping-only h1 -> h20 ===")
-    ping_output = h1.cmd(f'ping -c 20 {server_ip}')
-    print("--- Ping-only raw output (exp3) ---")
-    print(ping_output)
-    with open('exp3_ping_h1_h20.log', 'w') as f:
-        f.write(ping_output)
-    print("Saved ping-only log to exp3_ping_h1_h20.log")
+    if 'icmp' in phases:
+        print("\n=== Experiment 3 (delay): ICMP ping-only h1 -> h20 ===")
+        ping_output = run_test(h1, f'ping -D -c 20 {server_ip}',
+                               adaptive, 'exp3_ping', 20, log_dir=log_dir, live=live)
+        print("--- Ping-only raw output (exp3) ---")
+        print(ping_output)
+        ping_log = log_path(log_dir, 'exp3_ping_h1_h20.log')
+        with open(ping_log, 'w') as f:
+            f.write(ping_output)
+        print(f"Saved ping-only log to {ping_log}")
 
 
 
-def main():
+def main(argv=None):
+    args = add_calibration_args(add_run_args(argparse.ArgumentParser())).parse_args(argv)
     net = None
     try:
-        net = create_network()
+        profile = load_profile(args.profile)
+        net = create_network(args.isolation, profile)
         # Optional: quick connectivity sanity check
         print("\n*** Quick pingall (optional sanity check)")
         net.pingAll()
+        # per-link pre-flight check (cached per topology and machine, see calibrate.py)
+        calibration = calibration_from_args(args, net, 500, EXP3_DELAYS)
 
         # Run your baseline measurements
-        run_experiment_3(net)
-
-        print("\n*** Entering Mininet CLI (you can inspect hosts/logs)")
-        CLI(net)
+        duration = resolve_duration(args.tcp_duration, 'exp3', args.log_dir)
+        window = resolve_window(args.window, 500, EXP3_DELAYS, args.streams, profile)
+        socket_buffer_max = ensure_socket_buffers(net.get('h1', 'h20'), window)
+        log_dir = new_run_dir(args.archive, 'exp3', 500) if args.archive else args.log_dir
+        procs = Procs()
+        started = time.time()
+        run_experiment_3(net, cc=args.cc, streams=args.streams, duration=duration,
+                         adaptive=adaptive_from_args(args), live=live_from_args(args),
+                         log_dir=log_dir, phases=args.phases, probe=args.probe,
+                         window=window, hop_probes=args.hop_probes, procs=procs)
+        write_run_meta(log_dir, 'exp3', 500, started, time.time(),
+                       cc=args.cc, streams=args.streams, tcp_duration_s=duration,
+                       adaptive=args.adaptive, phases=args.phases, probe=args.probe,
+                       isolation=args.isolation, window=window, socket_buffer_max=socket_buffer_max,
+                       hop_probes=args.hop_probes, teardown=procs.summary(),
+                       calibration=calibration,
+                       link_profile=dict(profile_info(500, profile, EXP3_DELAYS), name=args.profile))
+        if args.archive:
+            compress_run(log_dir, args.codec)
+
+        if not args.no_cli:
+            print("\n*** Entering Mininet CLI (you can inspect hosts/logs)")
+            CLI(net)
     finally:
         if net is not None:
             net.stop()
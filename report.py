@@ -0,0 +1,264 @@
+"""
+Campaign report: one JSON summary and one self-contained HTML page.
+
+A campaign is one log directory (the exp1-3 logs of one bandwidth).  The
+report collects the metrics analyze_logs.py computes, the run metadata
+the experiment scripts write (expN_run_meta.json) and, when present, the
+steady-state / adaptive / TCP-matrix results, and embeds the plots as
+base64 PNGs so the HTML file can be mailed around on its own.
+
+Rebuilding is incremental: report_cache.json stores the size/mtime of
+every input file and the metrics they produced.  If nothing changed the
+cached report is reused as is; plots are only redrawn for the metrics
+whose values changed.
+
+    python3 report.py --log-dir runs/B500 --tag B500
+"""
+import argparse
+import base64
+import html
+import json
+import math
+import os
+import time
+
+from analyze_logs import (PLOTS, collect_metrics, default_tag, experiments, load_run_meta,
+                          plot_filename, protocols, scenario_labels)
+
+CACHE_FILE = "report_cache.json"
+CACHE_VERSION = 1
+
+# optional results of the other tools, shown when they exist in the campaign dir
+EXTRA_RESULTS = {
+    "steady_state": "steady_state.json",
+    "adaptive": "adaptive_savings.json",
+    "planner": "planner.json",
+    "fairness": "fairness.json",
+}
+
+
+def _clean(obj):
+    "NaN -> None recursively, so the summary is valid JSON."
+    if isinstance(obj, float) and math.isnan(obj):
+        return None
+    if isinstance(obj, dict):
+        return {k: _clean(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_clean(v) for v in obj]
+    return obj
+
+
+def input_files(log_dir):
+    "Every file the report depends on."
+    names = sorted(f for f in os.listdir(log_dir)
+                   if f.startswith("exp") and f.endswith((".log", ".log.gz", ".log.zst", ".json")))
+    names += [n for n in EXTRA_RESULTS.values() if os.path.exists(os.path.join(log_dir, n))]
+    names += [n for n in os.listdir(log_dir) if n.startswith("tcp_matrix_") and n.endswith(".json")]
+    return names
+
+
+def fingerprint(log_dir):
+    "{file: [size, mtime_ns]} of the inputs, cheap to compute and compare."
+    fp = {}
+    for name in input_files(log_dir):
+        st = os.stat(os.path.join(log_dir, name))
+        fp[name] = [st.st_size, st.st_mtime_ns]
+    return fp
+
+
+def load_cache(log_dir):
+    path = os.path.join(log_dir, CACHE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        cache = json.load(f)
+    return cache if cache.get("version") == CACHE_VERSION else {}
+
+
+def save_cache(log_dir, cache):
+    cache["version"] = CACHE_VERSION
+    with open(os.path.join(log_dir, CACHE_FILE), 'w') as f:
+        json.dump(cache, f)
+
+
+def load_extras(log_dir):
+    extras = {}
+    for key, name in EXTRA_RESULTS.items():
+        path = os.path.join(log_dir, name)
+        if os.path.exists(path):
+            with open(path) as f:
+                extras[key] = json.load(f)
+    for name in sorted(os.listdir(log_dir)):
+        if name.startswith("tcp_matrix_") and name.endswith(".json"):
+            with open(os.path.join(log_dir, name)) as f:
+                extras.setdefault("tcp_matrix", []).extend(json.load(f))
+    if "adaptive" in extras:
+        from adaptive import savings_summary
+        extras["adaptive_summary"] = savings_summary(extras["adaptive"])
+    return extras
+
+
+def _metric_values(metrics, key):
+    return [[metrics[exp][p][key] for p in protocols] for exp in experiments]
+
+
+def update_plots(metrics, old_metrics, out_dir, tag):
+    "Redraw only the plots whose metric values changed; returns {key: png path}."
+    pngs = {}
+    for key, ylabel, title, prefix in PLOTS:
+        path = plot_filename(prefix, out_dir, tag)
+        pngs[key] = path
+        unchanged = (old_metrics is not None and os.path.exists(path)
+                     and _clean(_metric_values(metrics, key)) == _clean(_metric_values(old_metrics, key)))
+        if unchanged:
+            continue
+        # matplotlib 很慢，只在真的要重画时才加载
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        from analyze_logs import plot_metric
+        plot_metric(metrics, key, ylabel, title, path)
+        plt.close("all")
+    return pngs
+
+
+def build_summary(log_dir, metrics, tag):
+    return _clean({
+        "campaign": os.path.basename(os.path.abspath(log_dir)),
+        "tag": tag,
+        "generated": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "run_meta": load_run_meta(log_dir),
+        "metrics": metrics,
+        "extras": load_extras(log_dir),
+    })
+
+
+def _fmt(v, digits=2):
+    if v is None:
+        return "-"
+    if isinstance(v, float):
+        return f"{v:.{digits}f}"
+    return html.escape(str(v))
+
+
+def _table(header, rows):
+    out = ["<table><tr>" + "".join(f"<th>{html.escape(str(h))}</th>" for h in header) + "</tr>"]
+    for row in rows:
+        out.append("<tr>" + "".join(f"<td>{_fmt(v)}</td>" for v in row) + "</tr>")
+    out.append("</table>")
+    return "\n".join(out)
+
+
+def render_html(summary, pngs):
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>",
+        f"<title>Campaign report {html.escape(summary['campaign'])}</title>",
+        "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin:1em 0}"
+        "td,th{border:1px solid #ccc;padding:3px 8px;text-align:right}th{background:#eee}"
+        "img{max-width:48%;margin:4px}</style></head><body>",
+        f"<h1>Campaign {html.escape(summary['campaign'])} {html.escape(summary['tag'])}</h1>",
+        f"<p>Generated {summary['generated']}</p>",
+    ]
+
+    meta = summary["run_meta"]
+    if meta:
+        keys = ["bw_Mbps", "kernel", "ovs_version", "iperf_version", "cc", "streams",
+                "tcp_duration_s", "window", "adaptive", "probe", "isolation", "duration_s"]
+        parts.append("<h2>Run metadata</h2>")
+        parts.append(_table(["exp"] + keys, [[exp] + [meta[exp].get(k) for k in keys] for exp in meta]))
+
+    parts.append("<h2>Metrics</h2>")
+    rows = []
+    for exp, label in zip(experiments, scenario_labels):
+        for p in protocols:
+            m = summary["metrics"][exp][p]
+            rows.append([label, p, m["throughput_Mbps"], m["rtt_ms"], m.get("rtt_p99_ms"),
+                         m["loss_pct"], m["jitter_ms"]])
+    parts.append(_table(["scenario", "protocol", "throughput Mbps", "RTT ms", "RTT p99 ms", "loss %",
+                         "jitter ms"], rows))
+
+    extras = summary["extras"]
+    if "steady_state" in extras:
+        parts.append("<h2>Steady state (TCP)</h2>")
+        parts.append(_table(["exp", "whole-run Mbps", "steady Mbps", "steady std", "warm-up s", "stable after s"],
+                            [[exp, r["whole_mean_Mbps"], r["steady_mean_Mbps"], r["steady_std_Mbps"],
+                              r["warmup_s"], r["recommended_duration_s"]]
+                             for exp, r in extras["steady_state"].items()]))
+    if "adaptive_summary" in extras:
+        s = extras["adaptive_summary"]
+        parts.append("<h2>Adaptive durations</h2>")
+        parts.append(_table(["tests", "stopped early", "fixed s", "actual s", "saved s", "saved %"],
+                            [[s["tests"], s["stopped_early"], s["fixed_s"], s["actual_s"],
+                              s["saved_s"], s["saved_pct"]]]))
+    if "planner" in extras and "efficiency" in extras["planner"]:
+        parts.append("<h2>Expected vs observed (planner)</h2>")
+        parts.append(_table(["exp", "protocol", "RTT ms", "BDP bytes", "window", "theoretical Mbps",
+                             "observed Mbps", "efficiency"],
+                            [[r["exp"], r["protocol"], r["rtt_ms"], r["bdp_bytes"], r["window"],
+                              r["theoretical_Mbps"], r["observed_Mbps"], r["efficiency"]]
+                             for r in extras["planner"]["efficiency"]]))
+    if "fairness" in extras:
+        parts.append("<h2>Bandwidth sharing (fairness)</h2>")
+        parts.append(_table(["exp", "phase", "flows", "bottleneck", "main Mbps", "main share",
+                             "of link", "Jain (bottleneck)", "Jain (all)"],
+                            [[r["exp"], r["phase"], len(r["flows_Mbps"]), r["bottleneck"],
+                              r["flows_Mbps"].get("h1->h20"), r["main_share"], r["main_link_share"],
+                              r["jain_bottleneck"], r["jain_all"]] for r in extras["fairness"]]))
+    if "tcp_matrix" in extras:
+        parts.append("<h2>TCP congestion-control matrix</h2>")
+        parts.append(_table(["exp", "cc", "streams", "Mbps", "RTT ms", "RTT inflation", "Jain"],
+                            [[r["exp"], r["cc"], r["streams"], r["throughput_Mbps"], r["rtt_ms"],
+                              r["rtt_inflation"], r["jain_index"]] for r in extras["tcp_matrix"]]))
+
+    parts.append("<h2>Plots</h2>")
+    for key, path in pngs.items():
+        with open(path, 'rb') as f:
+            data = base64.b64encode(f.read()).decode()
+        parts.append(f"<img alt='{key}' src='data:image/png;base64,{data}'>")
+
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def build_report(log_dir='.', out_dir=None, tag=None, force=False):
+    "Build <out_dir>/report_<tag>.json/.html; returns (json path, html path)."
+    t0 = time.time()
+    out_dir = out_dir or log_dir
+    tag = default_tag(log_dir) if tag is None else tag
+    name = f"report_{tag}" if tag else "report"
+    json_path = os.path.join(out_dir, f"{name}.json")
+    html_path = os.path.join(out_dir, f"{name}.html")
+
+    cache = load_cache(log_dir)
+    fp = fingerprint(log_dir)
+    if (not force and cache.get("fingerprint") == fp and cache.get("tag") == tag
+            and os.path.exists(json_path) and os.path.exists(html_path)):
+        print(f"[INFO] Report up to date ({time.time() - t0:.3f} s): {html_path}")
+        return json_path, html_path
+
+    metrics = collect_metrics(log_dir)
+    pngs = update_plots(metrics, None if force else cache.get("metrics"), out_dir, tag)
+    summary = build_summary(log_dir, metrics, tag)
+
+    with open(json_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    with open(html_path, 'w') as f:
+        f.write(render_html(summary, pngs))
+
+    save_cache(log_dir, {"fingerprint": fp, "tag": tag, "metrics": _clean(metrics)})
+    print(f"[INFO] Saved report ({time.time() - t0:.3f} s): {json_path}, {html_path}")
+    return json_path, html_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the JSON + HTML report of one campaign")
+    parser.add_argument('--log-dir', default='.')
+    parser.add_argument('--out-dir', default=None)
+    parser.add_argument('--tag', default=None, help="e.g. B500 (default: from the run metadata)")
+    parser.add_argument('--force', action='store_true', help="ignore the cache and redraw everything")
+    args = parser.parse_args(argv)
+    build_report(args.log_dir, args.out_dir, args.tag, args.force)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""
+Short-flow workload: flow completion times (FCT) of many small TCP flows.
+
+Flows run between random pairs of the 20 hosts.  Sizes come from a bounded
+Pareto distribution (heavy-tailed: most flows are a few KB, a few are MBs)
+and start times from a Poisson process.  Every flow is one
+`iperf -c <dst> -n <bytes>` started in the background on its source host;
+the host shell stamps its start / end time into a per-scenario FCT log:
+
+    <id> <src> <dst> <bytes> <start unix s> <end unix s> <iperf exit code>
+
+The workload runs once alone and once next to exp2's bulk background flows
+(h4->h3, h6->h5 UDP) on the exp2 topology, and FCT percentiles are
+reported per flow-size bucket.
+
+    sudo python3 short_flows.py --bw 10 --flows 300 --rate 20
+"""
+import argparse
+import json
+import math
+import random
+import time
+
+from analyze_logs import percentiles
+from archive import open_log, resolve_log
+from exp_common import log_path
+from procs import IPERF_PORT, Procs
+
+# exp2 的 background 速率（ICMP phase 用的那组）
+BULK_BACKGROUND = {10: '20M', 500: '500M'}
+
+# (label, upper bound in bytes) of the flow-size buckets
+SIZE_BUCKETS = [
+    ("<10KB", 10e3),
+    ("10KB-100KB", 100e3),
+    ("100KB-1MB", 1e6),
+    ("1MB-10MB", 10e6),
+    (">=10MB", math.inf),
+]
+
+SCENARIOS = ("alone", "bulk")
+
+
+def bounded_pareto(rng, alpha, low, high):
+    "One sample of a Pareto(alpha) truncated to [low, high] (inverse CDF)."
+    u = rng.random()
+    ratio = (low / high) ** alpha
+    return low / (1 - u * (1 - ratio)) ** (1 / alpha)
+
+
+def generate_flows(hosts, n_flows, rate, alpha=1.2, min_bytes=2000, max_bytes=10000000, seed=1):
+    """
+    Flow schedule: [{id, t, src, dst, bytes}, ...] with Poisson arrivals of
+    `rate` flows/s (t is the offset from the workload start) and bounded
+    Pareto sizes.  The same seed gives the same schedule, so both scenarios
+    see identical flows.
+    """
+    rng = random.Random(seed)
+    flows = []
+    t = 0.0
+    for i in range(n_flows):
+        t += rng.expovariate(rate)
+        src, dst = rng.sample(hosts, 2)
+        flows.append({"id": i, "t": round(t, 6), "src": src, "dst": dst,
+                      "bytes": int(bounded_pareto(rng, alpha, min_bytes, max_bytes))})
+    return flows
+
+
+def size_buckets(max_bytes=None):
+    """
+    SIZE_BUCKETS that flows of at most max_bytes can fall in (all of them
+    for None); the last one takes everything up to max_bytes.
+    """
+    if max_bytes is None:
+        return list(SIZE_BUCKETS)
+    lowers = [0] + [upper for _, upper in SIZE_BUCKETS[:-1]]
+    buckets = [(label, upper) for (label, upper), lower in zip(SIZE_BUCKETS, lowers) if lower < max_bytes]
+    return buckets[:-1] + [(buckets[-1][0], math.inf)]
+
+
+def size_bucket(nbytes, buckets=SIZE_BUCKETS):
+    for label, upper in buckets:
+        if nbytes < upper:
+            return label
+    return buckets[-1][0]
+
+
+def _flow_cmd(flow, dst_ip, fct_log):
+    """
+    Subshell that runs one flow and appends its FCT record (for
+    Procs.start).  A SIGTERM to the subshell ends its iperf, the record
+    is still written, with a non-zero rc.
+    """
+    return (f'( s=$(date +%s.%N); trap \'kill $p 2>/dev/null\' TERM; '
+            f'iperf -c {dst_ip} -n {flow["bytes"]} > /dev/null 2>&1 & p=$!; wait $p; rc=$?; '
+            f'e=$(date +%s.%N); echo "{flow["id"]} {flow["src"]} {flow["dst"]} {flow["bytes"]} '
+            f'$s $e $rc" >> {fct_log} )')
+
+
+def run_workload(net, flows, fct_log, timeout=60.0, procs=None, label='short_flows'):
+    """
+    Start every flow at its arrival time and wait until all of them wrote
+    their FCT record (or `timeout` s after the last arrival).  Then ends
+    the servers, the flows still running and everything else procs
+    tracks (the bulk background).
+    """
+    procs = procs if procs is not None else Procs()
+    open(fct_log, 'w').close()
+    for name in {f["dst"] for f in flows}:
+        procs.start(net.get(name), 'iperf -s > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')
+    time.sleep(0.5)
+
+    t0 = time.time()
+    for flow in flows:
+        delay = t0 + flow["t"] - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        # 实际开始时间由 host shell 记录，这里派发的延迟不影响 FCT
+        procs.start(net.get(flow["src"]), _flow_cmd(flow, net.get(flow["dst"]).IP(), fct_log),
+                    name=f'flow {flow["id"]}', sig='TERM')
+
+    deadline = time.time() + timeout
+    done = 0
+    while time.time() < deadline:
+        with open(fct_log) as f:
+            done = sum(1 for _ in f)
+        if done >= len(flows):
+            break
+        time.sleep(0.2)
+    else:
+        print(f"[WARN] {len(flows) - done} of {len(flows)} flows did not finish within {timeout:.0f} s")
+
+    procs.stop(label=label)
+
+
+def start_bulk_background(net, bw, duration, procs):
+    "exp2's background: UDP h4->h3 and h6->h5 at the exp2 rate of this bandwidth."
+    h3, h4, h5, h6 = net.get('h3', 'h4', 'h5', 'h6')
+    rate = BULK_BACKGROUND[bw]
+    procs.start(h3, 'iperf -s -u > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')
+    procs.start(h5, 'iperf -s -u > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')
+    procs.start(h4, f'iperf -c {h3.IP()} -u -b {rate} -t {int(math.ceil(duration))} > /dev/null 2>&1')
+    procs.start(h6, f'iperf -c {h5.IP()} -u -b {rate} -t {int(math.ceil(duration))} > /dev/null 2>&1')
+    time.sleep(1)  # 让 background 先跑满
+
+
+def parse_fct_log(filepath):
+    "[(bytes, fct_s, ok), ...] from an FCT log."
+    records = []
+    if resolve_log(filepath) is None:
+        print(f"[WARN] File not found: {filepath}")
+        return records
+    with open_log(filepath) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) != 7:
+                continue
+            records.append((int(parts[3]), float(parts[5]) - float(parts[4]), parts[6] == "0"))
+    return records
+
+
+def summarize_fct(records, n_flows=None, max_bytes=None):
+    """
+    FCT count / p50 / p90 / p99 (ms) per size bucket, plus an 'all' row;
+    buckets above max_bytes (the size cap of the workload) are left out.
+    """
+    buckets = size_buckets(max_bytes)
+    groups = {label: [] for label, _ in buckets}
+    failed = 0
+    for nbytes, fct, ok in records:
+        if not ok:
+            failed += 1
+            continue
+        groups[size_bucket(nbytes, buckets)].append(round(fct * 1e3, 3))
+    groups["all"] = [v for label, _ in buckets for v in groups[label]]
+
+    summary = {}
+    for label, fcts in groups.items():
+        if not fcts:
+            continue
+        p50, p90, p99 = percentiles(fcts, (50, 90, 99))
+        summary[label] = {"flows": len(fcts), "fct_p50_ms": round(p50, 3), "fct_p90_ms": round(p90, 3),
+                          "fct_p99_ms": round(p99, 3), "fct_max_ms": max(fcts)}
+    summary["failed"] = failed
+    if n_flows is not None:
+        summary["missing"] = n_flows - len(records)
+    return summary
+
+
+def print_table(results):
+    print(f"\n{'scenario':<8} {'bucket':<11} {'flows':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    for scenario, summary in results.items():
+        for label in [b for b, _ in SIZE_BUCKETS] + ["all"]:
+            if label in summary:
+                s = summary[label]
+                print(f"{scenario:<8} {label:<11} {s['flows']:>6} {s['fct_p50_ms']:>9.2f} "
+                      f"{s['fct_p90_ms']:>9.2f} {s['fct_p99_ms']:>9.2f}")
+        print(f"{scenario:<8} failed {summary['failed']}, missing {summary.get('missing', 0)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Short-flow workload with FCT percentiles per size bucket")
+    parser.add_argument('--bw', type=int, choices=(10, 500), default=10)
+    parser.add_argument('--flows', type=int, default=200, help="number of flows per scenario")
+    parser.add_argument('--rate', type=float, default=20.0, help="Poisson arrival rate (flows/s)")
+    parser.add_argument('--alpha', type=float, default=1.2, help="Pareto shape (smaller = heavier tail)")
+    parser.add_argument('--min-bytes', type=int, default=2000)
+    parser.add_argument('--max-bytes', type=int, default=10000000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--timeout', type=float, default=60.0,
+                        help="wait this long after the last arrival for flows to finish (s)")
+    parser.add_argument('--log-dir', default='short_flows')
+    args = parser.parse_args(argv)
+
+    from mininet.log import setLogLevel
+    from tcp_matrix import load_experiment
+    setLogLevel('info')
+    create_network, _ = load_experiment(2, args.bw)
+
+    results = {}
+    net = None
+    try:
+        net = create_network()
+        hosts = [h.name for h in net.hosts]
+        flows = generate_flows(hosts, args.flows, args.rate, args.alpha,
+                               args.min_bytes, args.max_bytes, args.seed)
+        with open(log_path(args.log_dir, 'short_flows_schedule.json'), 'w') as f:
+            json.dump(flows, f)
+
+        for scenario in args.scenarios:
+            print(f"\n=== Short flows ({scenario}): {len(flows)} flows, {args.rate} flows/s, "
+                  f"{args.bw} Mbit/s links ===")
+            procs = Procs()
+            if scenario == "bulk":
+                start_bulk_background(net, args.bw, flows[-1]["t"] + args.timeout, procs)
+            fct_log = log_path(args.log_dir, f'short_flows_fct_{scenario}.log')
+            run_workload(net, flows, fct_log, args.timeout, procs, f'short_flows_{scenario}')
+            results[scenario] = summarize_fct(parse_fct_log(fct_log), len(flows), args.max_bytes)
+    finally:
+        if net is not None:
+            net.stop()
+
+    print_table(results)
+    out_file = log_path(args.log_dir, f'short_flows_B{args.bw}M.json')
+    with open(out_file, 'w') as f:
+        json.dump({"bw_Mbps": args.bw, "flows": args.flows, "rate": args.rate, "alpha": args.alpha,
+                   "min_bytes": args.min_bytes, "max_bytes": args.max_bytes, "seed": args.seed,
+                   "results": results}, f, indent=2)
+    print(f"[INFO] Saved FCT summary: {out_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Packet-size sweep: packets/s, throughput and RTT against payload size.
+
+Every probe in the experiments uses the default sizes (ping 56 B, iperf
+1470 B datagrams / 128 KB TCP buffers).  Small packets cost OVS and tc
+the same per-packet work for far fewer bytes, so at 500 Mbit/s the
+datapath can run out of packets/s long before it runs out of bandwidth.
+For every size of --sizes this runs, per scenario (exp1 / exp2 with its
+background UDP load / exp3 with the delays):
+- UDP h1 -> h20 at the link rate with iperf -l SIZE, with a concurrent
+  ping -s SIZE probe: received Mbit/s, datagrams/s, loss, RTT
+- TCP h1 -> h20 with iperf -l SIZE (the write size, i.e. syscalls/s)
+
+Each point runs --step s per protocol (default 2 s: six sizes take 24 s
+per scenario, less than the three 10 s phases of an experiment script).
+The "knee" is the largest size at which UDP throughput drops below
+KNEE_FRACTION of the best size; below it the path is packet-rate bound.
+
+    sudo python3 size_sweep.py --bw 500 --exp 1 2 3
+"""
+import argparse
+import json
+import math
+import os
+import time
+
+from analyze_logs import parse_iperf_throughput, parse_iperf_udp_metrics, parse_ping_stats
+from exp_common import PROBE_MODES, log_path, probe_cmd, tcp_client_cmd
+from procs import IPERF_PORT, Procs
+
+# UDP payload sizes; 1470 is iperf's default datagram and fits a 1500 B MTU
+DEFAULT_SIZES = (64, 128, 256, 512, 1024, 1470)
+
+KNEE_FRACTION = 0.9
+
+
+def run_point(net, size, bw, step_s, log_dir, exp, probe='default', procs=None):
+    """
+    UDP and TCP at one payload size; returns the row of that size.  Only
+    the server and probe of the point are stopped (group 'point'), exp2's
+    background load keeps running.
+    """
+    procs = procs if procs is not None else Procs()
+    h1, h20 = net.get('h1', 'h20')
+    server_ip = h20.IP()
+    udp_log = log_path(log_dir, f'exp{exp}_udp_l{size}.log')
+    tcp_log = log_path(log_dir, f'exp{exp}_tcp_l{size}.log')
+    ping_log = log_path(log_dir, f'exp{exp}_ping_s{size}.log')
+
+    procs.start(h20, 'iperf -s -u > /dev/null 2>&1', group='point', port=IPERF_PORT, sig='TERM')
+    procs.start(h1, f'{probe_cmd(server_ip, step_s, mode=probe, size=size)} > {ping_log}',
+                group='point', name='ping h1->h20')
+    h1.cmd(f'iperf -c {server_ip} -u -b {bw}M -l {size} -t {step_s} > {udp_log} 2>&1')
+    procs.stop('point', label=f'exp{exp} udp {size} B')
+
+    procs.start(h20, 'iperf -s > /dev/null 2>&1', group='point', port=IPERF_PORT, sig='TERM')
+    time.sleep(0.5)
+    h1.cmd(f'{tcp_client_cmd(server_ip, step_s, interval=None, length=size)} > {tcp_log} 2>&1')
+    procs.stop('point', label=f'exp{exp} tcp {size} B')
+
+    udp, jitter, loss = parse_iperf_udp_metrics(udp_log)
+    ping = parse_ping_stats(ping_log)
+    return {
+        "size_B": size,
+        "udp_Mbps": udp,
+        "udp_pps": udp * 1e6 / 8 / size if not math.isnan(udp) else math.nan,
+        "offered_pps": bw * 1e6 / 8 / size,
+        "udp_loss_pct": loss,
+        "udp_jitter_ms": jitter,
+        "tcp_Mbps": parse_iperf_throughput(tcp_log),
+        "rtt_avg_ms": ping["rtt_avg_ms"],
+        "rtt_p50_ms": ping["rtt_p50_ms"],
+        "rtt_p99_ms": ping["rtt_p99_ms"],
+    }
+
+
+def sweep_scenario(exp, bw, sizes, step_s, log_dir, probe='default'):
+    "All sizes on one fresh exp network."
+    from tcp_matrix import load_experiment
+    from udp_search import start_background
+    create_network, _run = load_experiment(exp, bw)
+    procs = Procs()
+    net = None
+    try:
+        net = create_network()
+        if exp == 2:
+            start_background(net, bw, len(sizes) * (2 * step_s + 3) + 10, procs)
+            time.sleep(1)
+        rows = []
+        for size in sizes:
+            row = run_point(net, size, bw, step_s, log_dir, exp, probe, procs)
+            print(f"  {size:>5} B: UDP {row['udp_Mbps']:8.2f} Mbit/s {row['udp_pps']:>10.0f} pps "
+                  f"loss {row['udp_loss_pct']:6.2f}%  TCP {row['tcp_Mbps']:8.2f} Mbit/s  "
+                  f"RTT p50 {row['rtt_p50_ms']:.3f} ms")
+            rows.append(row)
+        return rows
+    finally:
+        if net is not None:
+            procs.stop(label=f'exp{exp} size sweep')
+            net.stop()
+
+
+def knee(rows):
+    "Largest size whose UDP throughput is below KNEE_FRACTION of the best, None if none is."
+    valid = [r for r in rows if not math.isnan(r["udp_Mbps"])]
+    if not valid:
+        return None
+    best = max(r["udp_Mbps"] for r in valid)
+    limited = [r["size_B"] for r in valid if r["udp_Mbps"] < KNEE_FRACTION * best]
+    return max(limited) if limited else None
+
+
+def plot_sweep(results, bw, filename):
+    import matplotlib.pyplot as plt
+    fig, axes = plt.subplots(1, 3, figsize=(14, 4))
+    for name, r in results.items():
+        sizes = [row["size_B"] for row in r["rows"]]
+        axes[0].plot(sizes, [row["udp_pps"] for row in r["rows"]], marker='o', label=name)
+        axes[1].plot(sizes, [row["udp_Mbps"] for row in r["rows"]], marker='o', label=f"{name} UDP")
+        axes[1].plot(sizes, [row["tcp_Mbps"] for row in r["rows"]], marker='x', linestyle='--',
+                     label=f"{name} TCP")
+        axes[2].plot(sizes, [row["rtt_p50_ms"] for row in r["rows"]], marker='o', label=name)
+    for ax, ylabel in zip(axes, ("UDP packets/s", "Throughput (Mbps)", "RTT p50 (ms)")):
+        ax.set_xscale('log', base=2)
+        ax.set_xlabel("Payload size (bytes)")
+        ax.set_ylabel(ylabel)
+        ax.grid(True, linestyle='--', alpha=0.4)
+        ax.legend(fontsize='small')
+    fig.suptitle(f"Packet-size sweep at {bw} Mbit/s")
+    fig.tight_layout()
+    fig.savefig(filename)
+    print(f"[INFO] Saved figure: {filename}")
+
+
+def print_table(results):
+    print(f"\n{'scenario':<8} {'size':>5} {'UDP Mbps':>9} {'pps':>10} {'loss %':>7} {'TCP Mbps':>9} {'RTT p50':>8}")
+    for name, r in results.items():
+        for row in r["rows"]:
+            print(f"{name:<8} {row['size_B']:>5} {row['udp_Mbps']:>9.2f} {row['udp_pps']:>10.0f} "
+                  f"{row['udp_loss_pct']:>7.2f} {row['tcp_Mbps']:>9.2f} {row['rtt_p50_ms']:>8.3f}")
+        print(f"{name:<8} knee: {r['knee_B'] or '-'} B, max {r['max_pps']:.0f} pps")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput / packets per second / RTT vs payload size")
+    parser.add_argument('--bw', type=int, choices=(10, 500), default=500)
+    parser.add_argument('--exp', type=int, nargs='+', choices=(1, 2, 3), default=[1, 2, 3])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="payload sizes in bytes (ping -s / iperf -l)")
+    parser.add_argument('--step', type=int, default=2, help="length of each UDP / TCP test (s)")
+    parser.add_argument('--probe', choices=sorted(PROBE_MODES), default='default')
+    parser.add_argument('--log-dir', default='size_sweep')
+    parser.add_argument('--no-plot', action='store_true')
+    args = parser.parse_args(argv)
+
+    from mininet.log import setLogLevel
+    setLogLevel('info')
+
+    results = {}
+    for exp in args.exp:
+        name = f'exp{exp}'
+        print(f"\n=== Packet-size sweep: {name} at {args.bw} Mbit/s, sizes {args.sizes} ===")
+        rows = sweep_scenario(exp, args.bw, sorted(args.sizes), args.step,
+                              os.path.join(args.log_dir, f'{name}_B{args.bw}M'), args.probe)
+        pps = [r["udp_pps"] for r in rows if not math.isnan(r["udp_pps"])]
+        results[name] = {"rows": rows, "knee_B": knee(rows), "max_pps": max(pps) if pps else math.nan}
+
+    print_table(results)
+    if not args.no_plot:
+        plot_sweep(results, args.bw, log_path(args.log_dir, f'size_sweep_B{args.bw}M.png'))
+    out_file = log_path(args.log_dir, f'size_sweep_B{args.bw}M.json')
+    with open(out_file, 'w') as f:
+        json.dump({"bw_Mbps": args.bw, "step_s": args.step, "scenarios": results}, f, indent=2)
+    print(f"[INFO] Saved packet-size sweep: {out_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Warm-up trimming and steady-state detection for the TCP phase.
+
+The TCP clients run with `iperf -i 1`, so every expN_tcp_h1_h20.log has a
+throughput sample per second.  This script finds where slow start ends,
+reports steady-state metrics next to the whole-run average and works out
+the shortest test duration whose running mean is already stable.  The
+result is written to steady_state.json, which the experiment scripts
+read with `--tcp-duration auto`.
+
+    python3 steady_state.py --log-dir . --method window
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+
+from analyze_logs import experiments, parse_iperf_intervals
+
+STEADY_STATE_FILE = "steady_state.json"
+
+
+def _cv(values):
+    "Coefficient of variation (std / mean)."
+    mean = statistics.fmean(values)
+    if mean == 0:
+        return math.inf
+    return statistics.pstdev(values) / mean
+
+
+def warmup_by_window(values, window=3, cv_threshold=0.05):
+    """
+    Moving-window variance test: warm-up ends at the first window whose
+    coefficient of variation is below cv_threshold and whose mean is not
+    far below the mean of everything after it (slow start ramps up).
+    Returns the index of the first steady sample.
+    """
+    for i in range(0, max(len(values) - window + 1, 0)):
+        win = values[i:i + window]
+        rest = values[i:]
+        if _cv(win) <= cv_threshold and statistics.fmean(win) >= 0.9 * statistics.fmean(rest):
+            return i
+    return 0
+
+
+def warmup_by_changepoint(values, min_segment=2):
+    """
+    Single change point in the mean (least squares): the split k that
+    minimizes the summed squared error of values[:k] and values[k:].
+    Only counted as warm-up if the first segment is the slower one.
+    """
+    n = len(values)
+    if n < 2 * min_segment:
+        return 0
+
+    def sse(seg):
+        m = statistics.fmean(seg)
+        return sum((v - m) ** 2 for v in seg)
+
+    total = sse(values)
+    best_k, best_cost = 0, total
+    for k in range(min_segment, n - min_segment + 1):
+        cost = sse(values[:k]) + sse(values[k:])
+        if cost < best_cost:
+            best_k, best_cost = k, cost
+    if best_k and statistics.fmean(values[:best_k]) < statistics.fmean(values[best_k:]):
+        return best_k
+    return 0
+
+
+def min_stable_duration(intervals, start_idx, tol=0.05):
+    """
+    Shortest test length (s) after which the running mean of the steady
+    samples stays within +-tol of the final steady mean.
+    """
+    steady = [mbps for _, _, mbps in intervals[start_idx:]]
+    if not steady:
+        return math.nan
+    final = statistics.fmean(steady)
+    running, stable_from = 0.0, len(steady) - 1
+    means = []
+    for i, v in enumerate(steady):
+        running += v
+        means.append(running / (i + 1))
+    # 从后往前找，最早一个之后全部落在容差内的位置
+    for i in range(len(means) - 1, -1, -1):
+        if abs(means[i] - final) > tol * final:
+            break
+        stable_from = i
+    return intervals[start_idx + stable_from][1]
+
+
+def analyze_intervals(intervals, method="window", window=3, cv_threshold=0.05, tol=0.05):
+    "Whole-run vs steady-state metrics for one list of (start, end, Mbps)."
+    values = [mbps for _, _, mbps in intervals]
+    if not values:
+        return None
+    if method == "changepoint":
+        idx = warmup_by_changepoint(values)
+    else:
+        idx = warmup_by_window(values, window, cv_threshold)
+    steady = values[idx:]
+    return {
+        "whole_mean_Mbps": statistics.fmean(values),
+        "steady_mean_Mbps": statistics.fmean(steady),
+        "steady_std_Mbps": statistics.pstdev(steady),
+        "warmup_s": intervals[idx][0],
+        "n_intervals": len(values),
+        "n_steady": len(steady),
+        "recommended_duration_s": int(math.ceil(min_stable_duration(intervals, idx, tol))),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm-up / steady-state detection of TCP runs")
+    parser.add_argument('--log-dir', default='.')
+    parser.add_argument('--method', choices=("window", "changepoint"), default="window")
+    parser.add_argument('--window', type=int, default=3, help="moving window length (samples)")
+    parser.add_argument('--cv', type=float, default=0.05, help="max coefficient of variation in steady state")
+    parser.add_argument('--tol', type=float, default=0.05, help="running-mean tolerance for the stable duration")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for exp in experiments:
+        intervals = parse_iperf_intervals(os.path.join(args.log_dir, f"{exp}_tcp_h1_h20.log"))
+        res = analyze_intervals(intervals, args.method, args.window, args.cv, args.tol)
+        if res is None:
+            continue
+        results[exp] = res
+        print(f"{exp}: whole-run {res['whole_mean_Mbps']:.2f} Mbps, "
+              f"steady {res['steady_mean_Mbps']:.2f} +- {res['steady_std_Mbps']:.2f} Mbps "
+              f"(warm-up {res['warmup_s']:.1f} s, {res['n_steady']}/{res['n_intervals']} intervals), "
+              f"stable after {res['recommended_duration_s']} s")
+
+    out_file = os.path.join(args.log_dir, STEADY_STATE_FILE)
+    with open(out_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"[INFO] Saved steady-state summary: {out_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""
+Synthetic iperf / ping logs with known ground truth.
+
+Writes logs in the format the tools really print, at any size, and
+returns the values a parser should read back from them:
+- iperf2 TCP client (optionally -P N with [SUM] lines): interval lines
+  and the summary, adaptive K/M/G units, throughput_Mbps = the summary
+- iperf2 UDP client with the server report: throughput (received),
+  jitter and loss = lost / total (iperf pads the total, "0/ 8505", and
+  prints the percentage with %.2g)
+- iputils ping (-D optional) with lost replies, ending with
+  - 'summary':   SIGINT / normal exit, ping's own statistics
+  - 'truncated': killed by pkill (SIGTERM), no summary, and the buffered
+                 output cut off mid-line
+  - 'flood':     ping -f, only the summary
+Files ending in .gz are gzip-compressed (archive.py reads them
+transparently).  bench_parsers.py uses this for correctness checks and
+speed / memory benchmarks of analyze_logs.py.
+
+    python3 synth_logs.py --kind ping --lines 1000000 --ending truncated --out /tmp/ping.log
+"""
+import argparse
+import gzip
+import json
+import math
+import random
+
+KINDS = ('tcp', 'udp', 'ping')
+PING_ENDINGS = ('summary', 'truncated', 'flood')
+
+
+def _open(path):
+    return gzip.open(path, 'wt') if path.endswith('.gz') else open(path, 'w')
+
+
+def _num(value):
+    "iperf2's adaptive number format: 3 significant digits at most."
+    if value < 9.995:
+        return f"{value:4.2f}"
+    if value < 99.95:
+        return f"{value:4.1f}"
+    return f"{value:4.0f}"
+
+
+def fmt_bits(mbps):
+    "iperf2 -f a rate, e.g. '9.44 Mbits/sec'; returns (text, Mbps as printed)."
+    bits = mbps * 1e6
+    for prefix, scale in (('G', 1e9), ('M', 1e6), ('K', 1e3)):
+        if bits >= scale or prefix == 'K':
+            text = _num(bits / scale)
+            return f"{text} {prefix}bits/sec", float(text) * scale / 1e6
+    raise AssertionError("unreachable")
+
+
+def fmt_bytes(nbytes):
+    "iperf2 transfer column, powers of 1024."
+    for prefix, scale in (('G', 1024 ** 3), ('M', 1024 ** 2), ('K', 1024)):
+        if nbytes >= scale:
+            return f"{_num(nbytes / scale)} {prefix}Bytes"
+    return f"{int(nbytes):4d} Bytes"
+
+
+def _interval(sid, start, end, mbps):
+    text, printed = fmt_bits(mbps)
+    sid = f"{sid:>3}" if sid != 'SUM' else 'SUM'
+    return f"[{sid}] {start:4.1f}-{end:4.1f} sec  {fmt_bytes(mbps * 1e6 / 8 * (end - start))}  {text}", printed
+
+
+def iperf_tcp_log(path, mbps=9.5, intervals=10, interval_s=1.0, streams=1, noise=0.05, seed=0):
+    "TCP client log; returns the ground truth."
+    rng = random.Random(seed)
+    lines = ["------------------------------------------------------------",
+             "Client connecting to 10.0.0.20, TCP port 5001",
+             "TCP window size: 85.0 KByte (default)",
+             "------------------------------------------------------------"]
+    for s in range(streams):
+        lines.append(f"[{s + 3:>3}] local 10.0.0.1 port {40000 + s} connected with 10.0.0.20 port 5001")
+    lines.append("[ ID] Interval       Transfer     Bandwidth")
+    per_stream = mbps / streams
+    totals = [0.0] * streams
+    for i in range(intervals):
+        start, end = i * interval_s, (i + 1) * interval_s
+        step = 0.0
+        for s in range(streams):
+            rate = max(per_stream * (1 + rng.gauss(0, noise)), 1e-3)
+            totals[s] += rate
+            step += rate
+            lines.append(_interval(s + 3, start, end, rate)[0])
+        if streams > 1:
+            lines.append(_interval('SUM', start, end, step)[0])
+    t_end = intervals * interval_s
+    summary = None
+    for s in range(streams):
+        line, summary = _interval(s + 3, 0.0, t_end, totals[s] / intervals)
+        lines.append(line)
+    if streams > 1:
+        line, summary = _interval('SUM', 0.0, t_end, sum(totals) / intervals)
+        lines.append(line)
+    with _open(path) as f:
+        f.write("\n".join(lines) + "\n")
+    return {"throughput_Mbps": summary, "lines": len(lines)}
+
+
+def iperf_udp_log(path, mbps=10.0, intervals=10, interval_s=1.0, loss_pct=0.5, jitter_ms=0.02,
+                  datagram=1470, seed=0):
+    "UDP client log with the server report; returns the ground truth."
+    rng = random.Random(seed)
+    lines = ["------------------------------------------------------------",
+             "Client connecting to 10.0.0.20, UDP port 5001",
+             f"Sending {datagram} byte datagrams, IPG target: 1176.00 us (kalman adjust)",
+             "UDP buffer size:  208 KByte (default)",
+             "------------------------------------------------------------",
+             "[  3] local 10.0.0.1 port 41000 connected with 10.0.0.20 port 5001",
+             "[ ID] Interval       Transfer     Bandwidth"]
+    for i in range(intervals):
+        lines.append(_interval(3, i * interval_s, (i + 1) * interval_s, mbps * (1 + rng.gauss(0, 0.002)))[0])
+    t_end = intervals * interval_s
+    total = int(mbps * 1e6 / 8 / datagram * t_end)
+    lost = int(round(total * loss_pct / 100))
+    lines.append(_interval(3, 0.0, t_end, mbps)[0])
+    lines.append(f"[  3] Sent {total} datagrams")
+    lines.append("[  3] Server Report:")
+    recv_line, received = _interval(3, 0.0, t_end, mbps * (total - lost) / total)
+    lines.append(f"{recv_line}  {jitter_ms:6.3f} ms {lost:4d}/{total:5d} ({100.0 * lost / total:.2g}%)")
+    with _open(path) as f:
+        f.write("\n".join(lines) + "\n")
+    return {"throughput_Mbps": received, "jitter_ms": round(jitter_ms, 3),
+            "loss_pct": 100.0 * lost / total, "lines": len(lines)}
+
+
+def fmt_rtt(ms):
+    "iputils time= format (3 significant digits, whole ms from 100 ms)."
+    if ms >= 100:
+        return f"{int(ms)}"
+    if ms >= 10:
+        return f"{ms:.1f}"
+    if ms >= 1:
+        return f"{ms:.2f}"
+    return f"{ms:.3f}"
+
+
+def ping_log(path, replies=20, loss_pct=0.0, rtt_ms=0.05, jitter_ms=0.02, timestamps=True,
+             ending='summary', interval_s=0.2, seed=0):
+    """
+    ping log with `replies` transmitted probes; returns the ground truth
+    (what analyze_logs.parse_ping_stats should report).
+    """
+    rng = random.Random(seed)
+    lines = ["PING 10.0.0.20 (10.0.0.20) 56(84) bytes of data."]
+    t = 1700000000.0
+    rtts = []
+    for seq in range(1, replies + 1):
+        if rng.random() * 100 < loss_pct:
+            continue
+        text = fmt_rtt(rtt_ms + rng.expovariate(1.0 / jitter_ms) if jitter_ms else rtt_ms)
+        rtts.append(float(text))
+        if ending != 'flood':
+            prefix = f"[{t + seq * interval_s:.6f}] " if timestamps else ""
+            lines.append(f"{prefix}64 bytes from 10.0.0.20: icmp_seq={seq} ttl=64 time={text} ms")
+
+    truth = {"count": len(rtts)}
+    if ending == 'truncated':
+        # SIGTERM：stdio buffer 没 flush，最后一行被截断（至少切掉 " ms" 和一位数字），也没有 summary
+        body = "\n".join(lines)
+        cut = len(body) - rng.randint(4, max(len(lines[-1]) - 5, 4)) if len(lines) > 1 else len(body)
+        with _open(path) as f:
+            f.write(body[:cut])
+        complete = rtts[:-1] if len(lines) > 1 else rtts
+        truth.update(count=len(complete), rtt_avg_ms=sum(complete) / len(complete) if complete else math.nan,
+                     loss_pct=0.0 if complete else math.nan)
+        return truth
+
+    n = len(rtts)
+    loss = 100.0 * (replies - n) / replies
+    avg = sum(rtts) / n if n else math.nan
+    mdev = math.sqrt(sum((r - avg) ** 2 for r in rtts) / n) if n else math.nan
+    lines += ["", "--- 10.0.0.20 ping statistics ---",
+              f"{replies} packets transmitted, {n} received, {loss:g}% packet loss, "
+              f"time {int(replies * interval_s * 1000)}ms"]
+    if n:
+        rtt_line = f"rtt min/avg/max/mdev = {min(rtts):.3f}/{avg:.3f}/{max(rtts):.3f}/{mdev:.3f} ms"
+        if ending == 'flood':
+            rtt_line += f", ipg/ewma {interval_s * 1000:.3f}/{avg:.3f} ms"
+        lines.append(rtt_line)
+    with _open(path) as f:
+        f.write("\n".join(lines) + "\n")
+    if ending == 'flood':
+        truth["count"] = 0
+    truth.update(rtt_avg_ms=round(avg, 3) if n else math.nan, loss_pct=float(f"{loss:g}"),
+                 transmitted=replies, received=n)
+    return truth
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic iperf / ping log and print its ground truth")
+    parser.add_argument('--kind', choices=KINDS, default='ping')
+    parser.add_argument('--lines', type=int, default=1000, help="reply / interval lines")
+    parser.add_argument('--rate', type=float, default=9.5, help="iperf rate (Mbit/s)")
+    parser.add_argument('--streams', type=int, default=1, help="TCP: parallel streams")
+    parser.add_argument('--loss', type=float, default=0.5, help="loss (%%)")
+    parser.add_argument('--rtt', type=float, default=0.05, help="ping: base RTT (ms)")
+    parser.add_argument('--ending', choices=PING_ENDINGS, default='summary')
+    parser.add_argument('--no-timestamps', action='store_true', help="ping without -D")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True, help="log file (.gz = compressed)")
+    args = parser.parse_args(argv)
+
+    if args.kind == 'tcp':
+        truth = iperf_tcp_log(args.out, args.rate, max(args.lines // args.streams, 1),
+                              streams=args.streams, seed=args.seed)
+    elif args.kind == 'udp':
+        truth = iperf_udp_log(args.out, args.rate, args.lines, loss_pct=args.loss, seed=args.seed)
+    else:
+        truth = ping_log(args.out, args.lines, args.loss, args.rtt, timestamps=not args.no_timestamps,
+                         ending=args.ending, seed=args.seed)
+    print(json.dumps(truth, indent=2))
+
+
+if __name__ == '__main__':
+    main()
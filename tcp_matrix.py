@@ -0,0 +1,111 @@
+"""
+TCP congestion-control x parallel-stream matrix.
+
+For every experiment / bandwidth given on the command line this builds the
+topology from the matching project_topo_exp*.py script, runs the ICMP phase
+once as the RTT baseline and then the TCP phase for every (cc, streams)
+combination.  Each combination gets its own log directory, so the normal
+analyze_logs parsers can be reused on it.
+
+Example:
+    sudo python3 tcp_matrix.py --exp 1 3 --bw 500 --cc cubic bbr --streams 1 4
+"""
+import argparse
+import importlib
+import json
+import math
+import os
+
+from mininet.log import setLogLevel
+
+from analyze_logs import jain_index, parse_iperf_streams, parse_ping_rtt_loss
+from exp_common import DEFAULT_CC, available_cc
+
+
+def load_experiment(exp, bw):
+    "Return (create_network, run_experiment_N) of project_topo_exp{exp}_B{bw}M."
+    mod = importlib.import_module(f'project_topo_exp{exp}_B{bw}M')
+    return mod.create_network, getattr(mod, f'run_experiment_{exp}')
+
+
+def summarize_combo(exp, log_dir, base_rtt):
+    "Throughput, RTT inflation and fairness of one (cc, streams) run."
+    per_stream, total = parse_iperf_streams(os.path.join(log_dir, f'exp{exp}_tcp_h1_h20.log'))
+    rtt, loss = parse_ping_rtt_loss(os.path.join(log_dir, f'exp{exp}_ping_during_tcp_h1_h20.log'))
+    inflation = rtt / base_rtt if base_rtt and not math.isnan(base_rtt) else math.nan
+    return {
+        "throughput_Mbps": total,
+        "per_stream_Mbps": per_stream,
+        "rtt_ms": rtt,
+        "base_rtt_ms": base_rtt,
+        "rtt_inflation": inflation,
+        "loss_pct": loss,
+        "jain_index": jain_index(per_stream),
+    }
+
+
+def run_matrix(exp, bw, ccs, streams_list, out_dir):
+    "Run all combinations for one experiment; returns a list of result rows."
+    create_network, run_experiment = load_experiment(exp, bw)
+    exp_dir = os.path.join(out_dir, f'exp{exp}_B{bw}M')
+    rows = []
+
+    net = None
+    try:
+        net = create_network()
+        supported = available_cc(net.get('h1'))
+
+        # ping-only phase = RTT without our TCP flow
+        base_dir = os.path.join(exp_dir, 'baseline')
+        run_experiment(net, log_dir=base_dir, phases=('icmp',))
+        base_rtt, _ = parse_ping_rtt_loss(os.path.join(base_dir, f'exp{exp}_ping_h1_h20.log'))
+
+        for cc in ccs:
+            if supported and cc not in supported:
+                print(f"[WARN] cc '{cc}' not available on this kernel ({' '.join(supported)}), skipped")
+                continue
+            for streams in streams_list:
+                combo_dir = os.path.join(exp_dir, f'{cc}_P{streams}')
+                run_experiment(net, cc=cc, streams=streams,
+                               log_dir=combo_dir, phases=('tcp',))
+                row = {"exp": exp, "bw_Mbps": bw, "cc": cc, "streams": streams}
+                row.update(summarize_combo(exp, combo_dir, base_rtt))
+                rows.append(row)
+    finally:
+        if net is not None:
+            net.stop()
+    return rows
+
+
+def print_table(rows):
+    print(f"\n{'exp':>4} {'bw':>5} {'cc':>8} {'P':>3} {'Mbps':>9} {'RTT ms':>8} "
+          f"{'inflate':>8} {'loss %':>7} {'Jain':>6}")
+    for r in rows:
+        print(f"{r['exp']:>4} {r['bw_Mbps']:>5} {r['cc']:>8} {r['streams']:>3} "
+              f"{r['throughput_Mbps']:>9.2f} {r['rtt_ms']:>8.2f} {r['rtt_inflation']:>8.2f} "
+              f"{r['loss_pct']:>7.1f} {r['jain_index']:>6.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TCP congestion-control / parallel-stream matrix")
+    parser.add_argument('--exp', type=int, nargs='+', choices=(1, 2, 3), default=[1, 2, 3])
+    parser.add_argument('--bw', type=int, choices=(10, 500), default=10)
+    parser.add_argument('--cc', nargs='+', default=list(DEFAULT_CC))
+    parser.add_argument('--streams', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--out', default='tcp_matrix')
+    args = parser.parse_args(argv)
+
+    rows = []
+    for exp in args.exp:
+        rows += run_matrix(exp, args.bw, args.cc, args.streams, args.out)
+
+    print_table(rows)
+    out_file = os.path.join(args.out, f'tcp_matrix_B{args.bw}M.json')
+    with open(out_file, 'w') as f:
+        json.dump(rows, f, indent=2)
+    print(f"[INFO] Saved matrix results: {out_file}")
+
+
+if __name__ == '__main__':
+    setLogLevel('info')
+    main()
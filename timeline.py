@@ -0,0 +1,151 @@
+"""
+Time-indexed view of one experiment run.
+
+Merges the `ping -D` samples of every probe log with the flow start/stop
+events written by the experiment scripts (exp*_events.log) into one
+numpy record array sorted by time, and plots RTT over time with the
+background / main flow activity shaded.
+
+    python3 timeline.py --exp exp2 --log-dir .
+"""
+import argparse
+import json
+import math
+import os
+import re
+
+from archive import open_log, resolve_log
+
+# ping -D 行: "[1700000000.123456] 64 bytes from 10.0.0.20: icmp_seq=3 ttl=64 time=0.043 ms"
+_PING_D_RE = re.compile(r'^\[([\d\.]+)\].*icmp_seq=(\d+).*time=([\d\.]+)\s*ms')
+
+# probe 名字 -> 日志文件名（不含 expN_ 前缀）
+PROBE_LOGS = {
+    "ping_during_tcp": "ping_during_tcp_h1_h20.log",
+    "ping_during_udp": "ping_during_udp_h1_h20.log",
+    "ping_only": "ping_h1_h20.log",
+}
+
+TIMELINE_DTYPE = [
+    ("t", "f8"),          # unix time (s)
+    ("kind", "U8"),       # 'rtt' | 'start' | 'stop'
+    ("source", "U32"),    # probe name or flow name (e.g. 'h4->h3')
+    ("seq", "i8"),        # icmp_seq for rtt rows, -1 otherwise
+    ("value", "f8"),      # RTT in ms for rtt rows, nan otherwise
+    ("role", "U12"),      # 'probe' | 'main' | 'background'
+]
+
+
+def parse_ping_timestamps(filepath):
+    "Return [(unix_time, icmp_seq, rtt_ms), ...] from a `ping -D` log."
+    samples = []
+    if resolve_log(filepath) is None:
+        print(f"[WARN] File not found: {filepath}")
+        return samples
+    with open_log(filepath) as f:
+        for line in f:
+            m = _PING_D_RE.match(line)
+            if m:
+                samples.append((float(m.group(1)), int(m.group(2)), float(m.group(3))))
+    if not samples:
+        print(f"[WARN] No timestamped samples in {filepath} (was ping run with -D?)")
+    return samples
+
+
+def parse_events(filepath):
+    "Return the list of flow events (dicts) written by exp_common.EventLog."
+    events = []
+    if resolve_log(filepath) is None:
+        print(f"[WARN] File not found: {filepath}")
+        return events
+    with open_log(filepath) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                events.append(json.loads(line))
+    return events
+
+
+def build_timeline(exp, log_dir='.'):
+    "Merge probe samples and flow events of `exp` into one sorted record array."
+    # numpy / matplotlib 只在建 timeline / 画图时才加载，只用 parser 的模块不用付这个启动时间
+    import numpy as np
+    rows = []
+    for probe, name in PROBE_LOGS.items():
+        for t, seq, rtt in parse_ping_timestamps(os.path.join(log_dir, f"{exp}_{name}")):
+            rows.append((t, "rtt", probe, seq, rtt, "probe"))
+    for ev in parse_events(os.path.join(log_dir, f"{exp}_events.log")):
+        rows.append((ev["t"], ev["event"], ev["flow"], -1, math.nan, ev.get("kind", "main")))
+
+    timeline = np.array(rows, dtype=TIMELINE_DTYPE)
+    timeline.sort(order="t")
+    return timeline
+
+
+def flow_intervals(timeline):
+    "Pair start/stop rows into [(flow, role, t_start, t_stop), ...]."
+    open_flows = {}
+    intervals = []
+    for row in timeline[timeline["kind"] != "rtt"]:
+        key = (row["source"], row["role"])
+        if row["kind"] == "start":
+            open_flows[key] = row["t"]
+        elif key in open_flows:
+            intervals.append((row["source"], row["role"], open_flows.pop(key), row["t"]))
+    # flows that never got a stop event run until the end of the timeline
+    t_end = timeline["t"][-1] if len(timeline) else 0.0
+    for (flow, role), t0 in open_flows.items():
+        intervals.append((flow, role, t0, t_end))
+    return intervals
+
+
+def plot_timeline(timeline, title, filename):
+    import matplotlib.pyplot as plt
+    if len(timeline) == 0:
+        print(f"[WARN] Empty timeline, nothing to plot for {filename}")
+        return
+    t0 = timeline["t"][0]
+
+    plt.figure(figsize=(10, 4))
+    colors = {"background": "tab:red", "main": "tab:green"}
+    labelled = set()
+    for flow, role, start, stop in flow_intervals(timeline):
+        label = f"{role} flow" if role not in labelled else None
+        labelled.add(role)
+        plt.axvspan(start - t0, stop - t0, color=colors.get(role, "tab:gray"), alpha=0.12, label=label)
+
+    rtt = timeline[timeline["kind"] == "rtt"]
+    for probe in PROBE_LOGS:
+        sel = rtt[rtt["source"] == probe]
+        if len(sel):
+            plt.plot(sel["t"] - t0, sel["value"], marker='.', linestyle='-', linewidth=0.6, label=probe)
+
+    plt.xlabel("Time since first event (s)")
+    plt.ylabel("RTT (ms)")
+    plt.title(title)
+    plt.legend()
+    plt.grid(True, linestyle='--', alpha=0.4)
+    plt.tight_layout()
+    plt.savefig(filename)
+    print(f"[INFO] Saved figure: {filename}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RTT / flow-event timeline of one experiment")
+    parser.add_argument('--exp', default='exp2', help="experiment prefix, e.g. exp2")
+    parser.add_argument('--log-dir', default='.')
+    parser.add_argument('--out', default=None, help="output PNG (default: <exp>_timeline.png)")
+    args = parser.parse_args(argv)
+    import numpy as np
+    import matplotlib.pyplot as plt
+
+    timeline = build_timeline(args.exp, args.log_dir)
+    print(f"[INFO] {args.exp}: {len(timeline)} timeline rows "
+          f"({np.count_nonzero(timeline['kind'] == 'rtt')} RTT samples)")
+    plot_timeline(timeline, f"RTT and flow activity ({args.exp})",
+                  args.out or os.path.join(args.log_dir, f"{args.exp}_timeline.png"))
+    plt.show()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,465 @@
+"""
+The 20-host / 5-switch topology of the experiments, as data.
+
+          s4 --- s1 --- s2 --- s3 --- s5
+                 h1-h4  h5-h8  h9-h12  h17-h20     (h13-h16 on s4)
+
+build_network() creates it in Mininet the same way the experiment scripts
+always did (standalone OVS switches, TCLink with one bandwidth for every
+link), plus the options the newer tools need:
+- delays: per core link netem delay (exp3: 20 ms on s1-s2 and s3-s5)
+- redundant: extra core links ('ring', 'mesh') that give s2-s3 a backup path
+- controller: 'standalone' (default), 'ref' (Mininet's default controller)
+  or 'remote' (an OpenFlow controller at controller_ip:controller_port);
+  'file' takes the controllers of a spec (see below)
+- loop_protection: 'stp' / 'rstp' on the switches; needed as soon as the
+  core has a loop, so the redundant variants turn on STP by default
+- isolation: 'limit' caps every host's CPU share (CPULimitedHost, cgroups);
+  'pin' gives OVS core 0 and the iperf hosts their own cores (cpuset),
+  so a 500 Mbit/s run does not depend on what else the box is doing
+- spec: build another topology instead, e.g. a MiniEdit file loaded with
+  mn_loader.load_mn(); default_spec() is the one above
+- mtu: MTU of every host and switch interface (e.g. 9000 for jumbo frames)
+- profile: link profile per link class and per link, see below
+
+Link profiles.  By default every link gets the same bw, so each edge
+switch is 2:1 to 4:1 oversubscribed (4 hosts at bw behind one or two
+core links at bw).  A
+profile sets TCLink parameters (bw, delay, jitter, loss, max_queue_size)
+per link class and per link:
+    {"edge": {...}, "core": {...}, "links": {"s1-s2": {...}, "h1-s1": {...}}}
+"edge" are the host links, "core" the switch-switch links.  A bw of
+'4x' is 4 times the experiment's bw.  "up" / "down" hold the parameters
+of one direction only (asymmetric links): up is host -> switch on a host
+link and first -> second switch on a core link.  Precedence: the class
+profile, then the link's own opts in the spec (exp3 delays, .mn link
+opts), then the per-link profile.  LINK_PROFILES has named presets;
+oversubscription() gives the resulting ratio per edge switch.  TCLink
+cannot shape more than TCLINK_MAX_BW: a higher bw would leave the link
+unshaped, so it is capped there (with a warning, and listed under
+"capped_links" of the built spec).
+"""
+import atexit
+import json
+import math
+import os
+import subprocess
+from collections import deque
+
+SWITCHES = ('s1', 's2', 's3', 's4', 's5')
+HOSTS = tuple(f'h{i}' for i in range(1, 21))
+
+# host -> edge switch (4 hosts per switch, h1-h4 on s1 ... h17-h20 on s5)
+HOST_SWITCH = {h: f's{(i // 4) + 1}' for i, h in enumerate(HOSTS)}
+
+# switch-switch links, in the order the scripts create them (keeps the sN-ethM names)
+CORE_LINKS = (('s1', 's4'), ('s3', 's5'), ('s1', 's2'), ('s2', 's3'))
+
+# exp3 的 delay topology
+EXP3_DELAYS = {('s3', 's5'): '20ms', ('s1', 's2'): '20ms'}
+
+# extra core links of the redundant variants
+REDUNDANT = {
+    'none': (),
+    'ring': (('s4', 's5'),),                              # s4-s1-s2-s3-s5-s4
+    'mesh': (('s4', 's5'), ('s1', 's3'), ('s2', 's5')),
+}
+
+# TCLink 不 shape 超过 1000 Mbit/s 的 bw（会变成不限速的 veth），所以 profile 的 bw 封顶在这里
+TCLINK_MAX_BW = 1000
+
+# named link profiles (see the module docstring), bw relative to the experiment's bw;
+# at 500 Mbit/s the '4x' cores are capped to 1000 (2x)
+LINK_PROFILES = {
+    'uniform': {},                                          # 2:1 - 4:1, what the scripts always ran
+    'core-2x': {"core": {"bw": '2x'}},                      # 1:1 - 2:1
+    'fast-core': {"core": {"bw": '4x'}},                    # <= 1:1, the core is never the bottleneck
+    'asym-edge': {"edge": {"up": {"bw": '0.25x'}}, "core": {"bw": '4x'}},   # slow uploads
+    'lossy-edge': {"edge": {"loss": 0.1, "max_queue_size": 100},
+                   "core": {"bw": '4x', "max_queue_size": 1000}},
+}
+
+# TCLink parameters a profile can set
+PROFILE_KEYS = ('bw', 'delay', 'jitter', 'loss', 'max_queue_size')
+
+CONTROLLER_MODES = ('standalone', 'ref', 'remote')
+
+ISOLATION_MODES = ('none', 'limit', 'pin')
+
+# hosts that run iperf in exp1-3 (main flow h1 -> h20, exp2 background h4 -> h3, h6 -> h5)
+ACTIVE_HOSTS = ('h1', 'h20', 'h3', 'h4', 'h5', 'h6')
+
+
+def core_links(redundant='none'):
+    "Core links of a variant: the original four plus the redundant ones."
+    return CORE_LINKS + REDUNDANT[redundant]
+
+
+def link_key(a, b):
+    "Order-independent key of a switch-switch link."
+    return tuple(sorted((a, b)))
+
+
+def neighbors(redundant='none', spec=None):
+    "Adjacency {node: [node, ...]} of hosts and switches (of spec if given, else of the variant)."
+    spec = spec or default_spec(redundant)
+    adj = {n: [] for n in list(spec["switches"]) + list(spec["hosts"])}
+    for a, b, _opts in list(spec["host_links"]) + list(spec["core_links"]):
+        adj[a].append(b)
+        adj[b].append(a)
+    return adj
+
+
+def shortest_path(src, dst, redundant='none', spec=None):
+    """
+    Node list of a shortest (fewest hops) path src -> dst, e.g. ['h1', 's1',
+    ..., 'h20'], in spec if given (what standalone / STP switches use
+    without loops), else in the variant.
+    """
+    adj = neighbors(redundant, spec)
+    prev = {src: None}
+    queue = deque([src])
+    while queue:
+        node = queue.popleft()
+        if node == dst:
+            break
+        for nxt in adj[node]:
+            if nxt not in prev:
+                prev[nxt] = node
+                queue.append(nxt)
+    if dst not in prev:
+        return []
+    path = [dst]
+    while prev[path[-1]] is not None:
+        path.append(prev[path[-1]])
+    return path[::-1]
+
+
+def default_spec(redundant='none', delays=None):
+    """
+    The topology as a spec for build_network():
+    {"switches": [...], "hosts": [...], "host_links": [(h, s, opts)],
+     "core_links": [(sA, sB, opts)], "controllers": {}, "switch_controllers": {}}
+    opts are extra TCLink parameters of that link (delay, loss, bw, ...).
+    """
+    delays = {link_key(*k): v for k, v in (delays or {}).items()}
+    return {
+        "switches": list(SWITCHES),
+        "hosts": list(HOSTS),
+        "host_links": [(h, HOST_SWITCH[h], {}) for h in HOSTS],
+        "core_links": [(a, b, {'delay': delays[link_key(a, b)]} if link_key(a, b) in delays else {})
+                       for a, b in core_links(redundant)],
+        "controllers": {},
+        "switch_controllers": {},
+    }
+
+
+def has_loop(spec):
+    "True if the switch graph of spec has a cycle (needs STP)."
+    parent = {s: s for s in spec["switches"]}
+
+    def find(s):
+        while parent[s] != s:
+            s = parent[s]
+        return s
+
+    for a, b, _opts in spec["core_links"]:
+        ra, rb = find(a), find(b)
+        if ra == rb:
+            return True
+        parent[ra] = rb
+    return False
+
+
+def load_profile(value):
+    "Link profile of a LINK_PROFILES name or a JSON file (None / '' = none)."
+    if not value:
+        return None
+    if value in LINK_PROFILES:
+        return LINK_PROFILES[value]
+    if not os.path.exists(value):
+        raise ValueError(f"unknown link profile {value!r} (presets: {', '.join(sorted(LINK_PROFILES))})")
+    with open(value) as f:
+        return json.load(f)
+
+
+def _resolve(opts, bw, capped, name):
+    """
+    Copy of link opts with relative bandwidths ('4x') in Mbit/s, capped at
+    TCLINK_MAX_BW; capped[name] gets the bw that was asked for.
+    """
+    out = {}
+    for k, v in opts.items():
+        if k in ('up', 'down'):
+            out[k] = _resolve(v, bw, capped, f'{name} {k}')
+        elif k not in PROFILE_KEYS:
+            raise ValueError(f"unknown link parameter {k!r} (use {', '.join(PROFILE_KEYS)}, up, down)")
+        elif k == 'bw':
+            v = float(v[:-1]) * bw if isinstance(v, str) and v.endswith('x') else v
+            if float(v) > TCLINK_MAX_BW:
+                capped[name] = v
+                v = TCLINK_MAX_BW
+            out[k] = v
+        else:
+            out[k] = v
+    return out
+
+
+def _merge(*layers):
+    "Link opts of several layers, later ones win (up / down merged key by key)."
+    out = {}
+    for opts in layers:
+        for k, v in opts.items():
+            out[k] = dict(out.get(k, {}), **v) if k in ('up', 'down') else v
+    return out
+
+
+def apply_profile(spec, profile, bw):
+    """
+    Copy of spec where every link's opts are the full TCLink parameters of
+    that link: bw, then the class profile, the spec's own opts and the
+    per-link profile.  profile None keeps the spec's own opts.  Links
+    whose bw was capped at TCLINK_MAX_BW are in "capped_links".
+    """
+    profile = profile or {}
+    per_link = profile.get("links", {})
+    capped = {}
+
+    def link_opts(a, b, opts, cls):
+        own = per_link.get(f'{a}-{b}') or per_link.get(f'{b}-{a}') or {}
+        return _resolve(_merge({'bw': bw}, profile.get(cls, {}), opts, own), bw, capped, f'{a}-{b}')
+
+    return dict(spec,
+                host_links=[(h, sw, link_opts(h, sw, opts, 'edge')) for h, sw, opts in spec["host_links"]],
+                core_links=[(a, b, link_opts(a, b, opts, 'core')) for a, b, opts in spec["core_links"]],
+                capped_links=capped)
+
+
+def link_params(opts):
+    """
+    addLink() parameters of link opts: the opts themselves, or params1 /
+    params2 (first / second node's interface, i.e. the up / down
+    direction) when they differ per direction.
+    """
+    if 'up' not in opts and 'down' not in opts:
+        return dict(opts)
+    both = {k: v for k, v in opts.items() if k not in ('up', 'down')}
+    # Link() 会把公共参数盖到 params1/params2 上，所以不能再单独传
+    return dict(params1=dict(both, **opts.get('up', {})), params2=dict(both, **opts.get('down', {})))
+
+
+def direction_bw(opts, direction):
+    "Mbit/s of link opts in one direction ('up' / 'down'), opts resolved by apply_profile()."
+    return float(opts.get(direction, {}).get('bw', opts['bw']))
+
+
+def path_links(spec, path):
+    "[(opts, direction), ...] of the links along a node path in a profiled spec."
+    links = {}
+    for x, y, opts in spec["host_links"] + spec["core_links"]:
+        links[(x, y)] = (opts, 'up')
+        links[(y, x)] = (opts, 'down')
+    try:
+        return [links[(a, b)] for a, b in zip(path, path[1:])]
+    except KeyError as e:
+        raise KeyError(f"no link {'-'.join(e.args[0])}") from None
+
+
+def oversubscription(spec):
+    """
+    Per edge switch of a profiled spec (apply_profile): host upload
+    capacity against the capacity of its core links out of the switch,
+    {switch: {"hosts", "host_Mbps", "core_Mbps", "ratio"}}.
+    """
+    out = {}
+    for h, sw, opts in spec["host_links"]:
+        r = out.setdefault(sw, {"hosts": 0, "host_Mbps": 0.0, "core_Mbps": 0.0})
+        r["hosts"] += 1
+        r["host_Mbps"] += direction_bw(opts, 'up')
+    for a, b, opts in spec["core_links"]:
+        for sw, direction in ((a, 'up'), (b, 'down')):
+            if sw in out:
+                out[sw]["core_Mbps"] += direction_bw(opts, direction)
+    for r in out.values():
+        r["ratio"] = round(r["host_Mbps"] / r["core_Mbps"], 3) if r["core_Mbps"] else math.inf
+    return out
+
+
+def profile_info(bw, profile=None, delays=None, spec=None):
+    "Link profile of a run and the edge oversubscription it gives, for the run metadata."
+    built = apply_profile(spec or default_spec(delays=delays), profile, bw)
+    return {
+        "profile": profile,
+        "oversubscription": {sw: r["ratio"] for sw, r in sorted(oversubscription(built).items())},
+        "capped_links": built["capped_links"],
+    }
+
+
+def host_cpu_params(isolation, ncpu=None, cpu=None, hosts=HOSTS):
+    """
+    addHost() parameters per host for an isolation mode, and the cores
+    for OVS (None = leave OVS alone).
+    - limit: every host capped at `cpu` of the machine (default one core's worth)
+    - pin: core 0 for OVS, the active hosts round-robin over the other
+      cores, the idle hosts share the last core
+    """
+    ncpu = ncpu or os.cpu_count() or 1
+    if isolation == 'pin' and ncpu < 2:
+        print("[WARN] CPU pinning needs at least 2 cores, falling back to 'limit'")
+        isolation = 'limit'
+    if isolation == 'limit':
+        share = cpu or 1.0 / ncpu
+        return {h: dict(cpu=share) for h in hosts}, None
+    if isolation == 'pin':
+        cores = list(range(1, ncpu))
+        params = {h: dict(cpu=-1, cores=str(cores[-1])) for h in hosts}
+        for i, h in enumerate(h for h in ACTIVE_HOSTS if h in params):
+            params[h] = dict(cpu=-1, cores=str(cores[i % len(cores)]))
+        return params, '0'
+    return {h: {} for h in hosts}, None
+
+
+def pin_ovs(cores):
+    "Pin all ovs-vswitchd threads to `cores`; the old affinity is restored at exit."
+    pid = subprocess.run(['pidof', 'ovs-vswitchd'], stdout=subprocess.PIPE,
+                         universal_newlines=True).stdout.split()
+    if not pid:
+        print("[WARN] ovs-vswitchd not running, OVS not pinned")
+        return
+    old = subprocess.run(['taskset', '-p', '-c', pid[0]], stdout=subprocess.PIPE,
+                         universal_newlines=True).stdout.split(':')[-1].strip()
+    subprocess.run(['taskset', '-a', '-p', '-c', cores, pid[0]], stdout=subprocess.DEVNULL)
+    print(f"*** ovs-vswitchd pinned to cores {cores} (was {old})")
+    if old:
+        atexit.register(subprocess.run, ['taskset', '-a', '-p', '-c', old, pid[0]],
+                        stdout=subprocess.DEVNULL)
+
+
+def _add_controllers(net, spec):
+    "Controllers of a spec (controller='file'); returns {name: controller}."
+    from mininet.node import Controller, RemoteController
+    ctrls = {}
+    for name, c in spec["controllers"].items():
+        if c.get('type') == 'remote':
+            ctrls[name] = net.addController(name, controller=RemoteController,
+                                            ip=c.get('ip', '127.0.0.1'), port=c.get('port', 6653))
+        else:
+            ctrls[name] = net.addController(name, controller=Controller, port=c.get('port', 6653))
+    return ctrls
+
+
+def _rstp_switch():
+    """
+    OVSSwitch with RSTP on from the start: rstp_enable goes into the same
+    ovs-vsctl transaction that creates the bridge and adds its ports (like
+    Mininet's stp=True), so a loop never forwards before RSTP is active.
+    """
+    from mininet.node import OVSSwitch
+
+    class RSTPSwitch(OVSSwitch):
+        def bridgeOpts(self):
+            return OVSSwitch.bridgeOpts(self) + ' rstp_enable=true'
+
+    return RSTPSwitch
+
+
+def build_network(bw, delays=None, redundant='none', controller='standalone',
+                  loop_protection=None, controller_ip='127.0.0.1', controller_port=6653,
+                  isolation='none', cpu=None, spec=None, mtu=None, profile=None):
+    """
+    Create and start the topology; returns the Mininet object.
+    - bw: bandwidth of every link (Mbit/s), a link's own opts override it
+    - delays: {(sA, sB): '20ms'} for core links (either order)
+    - cpu: per-host CPU fraction for isolation='limit'
+    - spec: topology to build (default_spec(redundant, delays) if None);
+      controller='file' uses the spec's controllers, per switch
+    - mtu: interface MTU (None = the 1500 Mininet creates them with)
+    - profile: link profile (dict, see LINK_PROFILES); None uses the
+      spec's own profile if it has one (.mn "linkProfiles"), else bw everywhere
+    """
+    # Mininet 只在真的建网时才需要，planner 等只用上面的数据
+    from mininet.link import TCLink
+    from mininet.net import Mininet
+    from mininet.node import CPULimitedHost, DefaultController, Host, OVSSwitch, RemoteController
+
+    spec = spec or default_spec(redundant, delays)
+    spec = apply_profile(spec, profile if profile is not None else spec.get("profile"), bw)
+    if loop_protection is None and has_loop(spec):
+        loop_protection = 'stp'   # 有环必须开 STP，否则 broadcast storm
+    isolation = isolation or 'none'
+    host_params, ovs_cores = host_cpu_params(isolation, cpu=cpu, hosts=spec["hosts"])
+    host_cls = Host if isolation == 'none' else CPULimitedHost
+
+    ctrls = {}
+    if controller in ('standalone', 'file'):
+        net = Mininet(controller=None, host=host_cls, link=TCLink, switch=OVSSwitch)
+        if controller == 'file':
+            ctrls = _add_controllers(net, spec)
+    elif controller == 'ref':
+        net = Mininet(controller=DefaultController, host=host_cls, link=TCLink, switch=OVSSwitch)
+    else:
+        net = Mininet(controller=None, host=host_cls, link=TCLink, switch=OVSSwitch)
+        net.addController('c0', controller=RemoteController, ip=controller_ip, port=controller_port)
+
+    fail_mode = 'standalone' if controller == 'standalone' else 'secure'
+    print(f"*** Creating switches ({fail_mode} mode"
+          f"{', ' + loop_protection if loop_protection else ''})")
+    switch_cls = _rstp_switch() if loop_protection == 'rstp' else OVSSwitch
+    for name in spec["switches"]:
+        net.addSwitch(name, cls=switch_cls, failMode=fail_mode, stp=(loop_protection == 'stp'))
+
+    print("*** Creating hosts" + (f" (CPU isolation: {isolation})" if isolation != 'none' else ""))
+    for name in spec["hosts"]:
+        net.addHost(name, **host_params[name])
+
+    # opts 已经是完整的 TCLink 参数（bw 单位是 Mbit/s），见 apply_profile()
+    print("*** Creating links host<->switch")
+    for h, sw, opts in spec["host_links"]:
+        net.addLink(net.get(h), net.get(sw), **link_params(opts))
+
+    print("*** Creating links between switches")
+    for a, b, opts in spec["core_links"]:
+        net.addLink(net.get(a), net.get(b), **link_params(opts))
+    if spec["capped_links"]:
+        print(f"[WARN] TCLink cannot shape more than {TCLINK_MAX_BW} Mbit/s, capped: "
+              f"{', '.join(f'{l} ({v:g})' for l, v in spec['capped_links'].items())}")
+    ratios = {sw: r["ratio"] for sw, r in oversubscription(spec).items()}
+    print(f"*** Edge oversubscription: {', '.join(f'{sw} {r:g}:1' for sw, r in sorted(ratios.items()))}")
+
+    print("*** Starting network")
+    if ctrls:
+        # MiniEdit 的方式：每个 switch 只连自己的 controller
+        net.build()
+        for c in ctrls.values():
+            c.start()
+        for name in spec["switches"]:
+            names = spec["switch_controllers"].get(name) or list(ctrls)
+            net.get(name).start([ctrls[c] for c in names])
+    else:
+        net.start()
+    if ovs_cores is not None:
+        pin_ovs(ovs_cores)
+    if mtu:
+        set_mtu(net, mtu)
+    return net
+
+
+def set_mtu(net, mtu):
+    """
+    Set the MTU of every host and switch interface (not lo), one shell
+    command per node; returns {node: {intf: mtu read back}} of the
+    interfaces that did not take it.
+    """
+    print(f"*** Setting MTU {mtu} on all host and switch interfaces")
+    failed = {}
+    for node in net.hosts + net.switches:
+        intfs = [i.name for i in node.intfList() if i.name != 'lo']
+        out = node.cmd('; '.join(f'ip link set dev {i} mtu {mtu} 2>/dev/null; echo "{i} $(cat /sys/class/net/{i}/mtu)"'
+                                 for i in intfs))
+        got = dict(line.split() for line in out.splitlines() if len(line.split()) == 2)
+        bad = {i: got.get(i) for i in intfs if got.get(i) != str(mtu)}
+        if bad:
+            failed[node.name] = bad
+    if failed:
+        print(f"[WARN] MTU {mtu} not set on: {failed}")
+    return failed
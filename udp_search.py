@@ -0,0 +1,182 @@
+"""
+Maximum lossless UDP rate of h1 -> h20 (RFC 2544-style throughput search).
+
+The experiment scripts send UDP at one fixed rate (-b 10M / -b 500M),
+which gives the loss at that load but not the capacity of the path.
+This searches the offered rate instead: a short UDP trial (--step s) at
+rate R passes if the receiver-side loss is <= --loss, and the search
+looks for the highest passing R, down to --resolution Mbit/s.
+
+Each search starts warm: from --start, else from the result the same
+scenario got last time (the JSON of an earlier run), else from the
+previous scenario of this run, else from the planner's theoretical UDP
+rate.  From there it gallops (step doubles) until it has a passing and
+a failing rate, then bisects.  When the start is close, this takes a few
+steps instead of log2(bw / resolution).
+
+Scenarios are those of the experiments: exp1 (idle path), exp2 (the
+background UDP flows h4 -> h3, h6 -> h5 at the script's rate) and exp3
+(20 ms delays).
+
+    sudo python3 udp_search.py --bw 10 --exp 1 2 3 --loss 0.1
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import time
+
+from analyze_logs import parse_iperf_udp_metrics
+from exp_common import log_path
+from planner import UDP_PAYLOAD_RATIO
+from procs import IPERF_PORT, Procs
+
+# exp2 的 background UDP rate，和脚本里一样
+EXP2_BACKGROUND = {10: '20M', 500: '1000M'}
+
+
+def search_rate(trial, start, max_rate, resolution, max_steps=20):
+    """
+    Highest rate (Mbit/s) in (0, max_rate] for which trial(rate) passes.
+    trial(rate) -> (passed, info); returns (best rate or None, [step, ...]).
+    """
+    steps = []
+    ok, fail = 0.0, None
+    rate = min(max(start, resolution), max_rate)
+    delta = resolution
+
+    while len(steps) < max_steps:
+        passed, info = trial(rate)
+        steps.append(dict(info, rate_Mbps=round(rate, 3), passed=passed))
+        if passed:
+            ok = rate
+        else:
+            fail = rate
+        if fail is None:
+            # 只有 pass：往上跳，步长翻倍
+            if ok >= max_rate:
+                break
+            rate, delta = min(ok + delta, max_rate), delta * 2
+        elif not ok:
+            # 只有 fail：往下跳
+            if fail <= resolution:
+                break
+            rate, delta = max(fail - delta, resolution), delta * 2
+        elif fail - ok <= resolution:
+            break
+        else:
+            rate = (ok + fail) / 2
+    return (ok or None), steps
+
+
+def udp_trial(h1, server_ip, rate, step_s, log_file):
+    "One short UDP test at rate Mbit/s; returns (received Mbps, jitter ms, loss %)."
+    h1.cmd(f'iperf -c {server_ip} -u -b {rate:.3f}M -t {step_s} > {log_file} 2>&1')
+    return parse_iperf_udp_metrics(log_file)
+
+
+def start_background(net, bw, seconds, procs):
+    "exp2's background UDP flows h4 -> h3 and h6 -> h5 for `seconds`, tracked by procs (group 'background')."
+    h3, h4, h5, h6 = net.get('h3', 'h4', 'h5', 'h6')
+    procs.start(h3, 'iperf -s -u > /dev/null 2>&1', group='background', port=IPERF_PORT, sig='TERM')
+    procs.start(h5, 'iperf -s -u > /dev/null 2>&1', group='background', port=IPERF_PORT, sig='TERM')
+    procs.start(h4, f'iperf -c {h3.IP()} -u -b {EXP2_BACKGROUND[bw]} -t {seconds} > /dev/null 2>&1',
+                group='background')
+    procs.start(h6, f'iperf -c {h5.IP()} -u -b {EXP2_BACKGROUND[bw]} -t {seconds} > /dev/null 2>&1',
+                group='background')
+
+
+def search_scenario(exp, bw, start, loss_target, resolution, step_s, log_dir, max_steps=20):
+    "Build the exp network, start its background load and run the search."
+    from tcp_matrix import load_experiment
+    create_network, _run = load_experiment(exp, bw)
+    procs = Procs()
+    net = None
+    try:
+        net = create_network()
+        h1, h20 = net.get('h1', 'h20')
+        server_ip = h20.IP()
+        procs.start(h20, 'iperf -s -u > /dev/null 2>&1', port=IPERF_PORT, sig='TERM')
+        if exp == 2:
+            # 后台流跑满整个 search
+            start_background(net, bw, max_steps * (step_s + 2) + 10, procs)
+        time.sleep(1)
+        counter = itertools.count(1)
+
+        def trial(rate):
+            log_file = log_path(log_dir, f'exp{exp}_udp_search_{next(counter):02d}_{rate:.1f}M.log')
+            received, jitter, loss = udp_trial(h1, server_ip, rate, step_s, log_file)
+            passed = not math.isnan(loss) and loss <= loss_target
+            print(f"  offered {rate:8.2f} Mbit/s -> received {received:8.2f}, loss {loss:6.2f}% "
+                  f"{'PASS' if passed else 'FAIL'}")
+            time.sleep(0.5)   # 让队列清空
+            return passed, {"received_Mbps": received, "jitter_ms": jitter, "loss_pct": loss}
+
+        return search_rate(trial, start, bw, resolution, max_steps)
+    finally:
+        if net is not None:
+            procs.stop(label=f'exp{exp} udp search')
+            net.stop()
+
+
+def load_previous(out_file):
+    "Results of an earlier search ({scenario: {...}}), {} if none."
+    if not os.path.exists(out_file):
+        return {}
+    with open(out_file) as f:
+        return json.load(f).get("scenarios", {})
+
+
+def print_table(results):
+    print(f"\n{'scenario':<8} {'start':>8} {'max rate':>9} {'received':>9} {'loss %':>7} {'steps':>5}")
+    for name, r in results.items():
+        best = r["max_rate_Mbps"]
+        at = next((s for s in reversed(r["steps"]) if s["passed"] and s["rate_Mbps"] == best), {})
+        print(f"{name:<8} {r['start_Mbps']:>8.2f} {best if best is not None else math.nan:>9.2f} "
+              f"{at.get('received_Mbps', math.nan):>9.2f} {at.get('loss_pct', math.nan):>7.2f} "
+              f"{len(r['steps']):>5}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Binary search for the highest UDP rate meeting a loss target")
+    parser.add_argument('--bw', type=int, choices=(10, 500), default=10)
+    parser.add_argument('--exp', type=int, nargs='+', choices=(1, 2, 3), default=[1, 2, 3])
+    parser.add_argument('--loss', type=float, default=0.0, help="loss target in %% (RFC 2544: 0)")
+    parser.add_argument('--resolution', type=float, default=None,
+                        help="stop when the bracket is this narrow, Mbit/s (default 2%% of bw)")
+    parser.add_argument('--step', type=int, default=2, help="length of one trial (s)")
+    parser.add_argument('--max-steps', type=int, default=20)
+    parser.add_argument('--start', type=float, default=None, help="first rate to try (Mbit/s)")
+    parser.add_argument('--log-dir', default='udp_search')
+    args = parser.parse_args(argv)
+
+    from mininet.log import setLogLevel
+    setLogLevel('info')
+
+    resolution = args.resolution or 0.02 * args.bw
+    out_file = log_path(args.log_dir, f'udp_search_B{args.bw}M.json')
+    previous = load_previous(out_file)
+    last = None
+    results = {}
+    for exp in args.exp:
+        name = f'exp{exp}'
+        start = (args.start or (previous.get(name) or {}).get("max_rate_Mbps") or last
+                 or args.bw * UDP_PAYLOAD_RATIO)
+        print(f"\n=== UDP rate search: {name} at {args.bw} Mbit/s, loss <= {args.loss}%, "
+              f"start {start:.2f} Mbit/s ===")
+        best, steps = search_scenario(exp, args.bw, start, args.loss, resolution, args.step,
+                                      os.path.join(args.log_dir, f'{name}_B{args.bw}M'), args.max_steps)
+        results[name] = {"start_Mbps": round(start, 3), "max_rate_Mbps": best and round(best, 3),
+                         "steps": steps}
+        last = best or last
+
+    print_table(results)
+    with open(out_file, 'w') as f:
+        json.dump({"bw_Mbps": args.bw, "loss_target_pct": args.loss, "resolution_Mbps": resolution,
+                   "step_s": args.step, "scenarios": dict(previous, **results)}, f, indent=2)
+    print(f"[INFO] Saved UDP rate search: {out_file}")
+
+
+if __name__ == '__main__':
+    main()